@@ -0,0 +1,70 @@
+# ========== GO FISH! ACHIEVEMENT ENGINE ==========
+# Achievements indexed by the stat they depend on, thresholds kept sorted
+
+from bisect import bisect_right
+from typing import Any, Callable, Container, Dict, Iterable, List, Optional, Tuple
+
+# Maps an achievement to (stat it depends on, threshold)
+Requirement = Callable[[Dict[str, Any]], Tuple[str, float]]
+
+
+def requirement_count(achievement: Dict[str, Any]) -> Tuple[str, float]:
+    """{"requirement": {"type": stat, "count"|"size": n}} as used by the achievement catalogs"""
+    req = achievement["requirement"]
+    return req["type"], req.get("count", req.get("size", 1))
+
+
+class AchievementIndex:
+    """One evaluator shared by every achievement system.
+
+    Achievements are grouped per stat with their thresholds in ascending
+    order, so a check only looks at the stats a change touched, finds the
+    met thresholds with a binary search and the next unlock in O(log n).
+    """
+
+    def __init__(self, achievements: Iterable[Dict[str, Any]], requirement: Requirement = requirement_count):
+        grouped: Dict[str, List[Tuple[float, Dict[str, Any]]]] = {}
+        for achievement in achievements:
+            stat, threshold = requirement(achievement)
+            grouped.setdefault(stat, []).append((threshold, achievement))
+
+        self._thresholds: Dict[str, List[float]] = {}
+        self._achievements: Dict[str, List[Dict[str, Any]]] = {}
+        for stat, entries in grouped.items():
+            entries.sort(key=lambda entry: entry[0])
+            self._thresholds[stat] = [threshold for threshold, _ in entries]
+            self._achievements[stat] = [achievement for _, achievement in entries]
+
+    @property
+    def stats(self) -> List[str]:
+        return list(self._thresholds)
+
+    def depends_on(self, stat: str) -> bool:
+        return stat in self._thresholds
+
+    def pending_stats(self, unlocked: Container[str], stats: Optional[Iterable[str]] = None) -> List[str]:
+        """Stats (of `stats`, default all) that still have a locked achievement"""
+        candidates = self._thresholds if stats is None else [s for s in stats if s in self._thresholds]
+        return [s for s in candidates if any(a["id"] not in unlocked for a in self._achievements[s])]
+
+    def unlockable(self, values: Dict[str, float], unlocked: Container[str],
+                   stats: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Locked achievements whose threshold is met, looking only at `stats` (default all)"""
+        found = []
+        for stat in (self._thresholds if stats is None else stats):
+            thresholds = self._thresholds.get(stat)
+            if not thresholds:
+                continue
+            met = bisect_right(thresholds, values.get(stat, 0) or 0)
+            found.extend(a for a in self._achievements[stat][:met] if a["id"] not in unlocked)
+        return found
+
+    def next_unlock(self, stat: str, value: float) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """(threshold, achievement) of the next achievement above `value` for a stat"""
+        thresholds = self._thresholds.get(stat)
+        if not thresholds:
+            return None
+        index = bisect_right(thresholds, value or 0)
+        if index == len(thresholds):
+            return None
+        return thresholds[index], self._achievements[stat][index]
@@ -3,19 +3,30 @@
 # ~450+ lines of backend polish
 
 from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import db, register_indexes
+from pymongo import IndexModel, ReturnDocument, ASCENDING
 from datetime import datetime, timezone, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable
 from pydantic import BaseModel, Field
+from achievement_engine import AchievementIndex
+import asyncio
 import uuid
-import os
 
 router = APIRouter(prefix="/api/achievements", tags=["achievements"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("achievement_progress", [
+    IndexModel([("user_id", ASCENDING)]),
+])
+
+register_indexes("daily_rewards", [
+    IndexModel([("user_id", ASCENDING)]),
+])
+
+register_indexes("player_titles", [
+    IndexModel([("user_id", ASCENDING)]),
+])
 
 
 # ========== ACHIEVEMENT DEFINITIONS ==========
@@ -459,55 +470,58 @@ async def get_player_progress(user_id: str) -> dict:
     return progress
 
 
-async def check_and_unlock_achievements(user_id: str) -> List[dict]:
-    """Check all achievements and unlock any that qualify"""
-    progress = await get_player_progress(user_id)
+async def _player_level(user_id: str) -> int:
     user = await db.users.find_one({"id": user_id}, {"_id": 0, "level": 1})
+    return user.get("level", 1) if user else 1
+
+
+async def _guild_joined(user_id: str) -> int:
+    return 1 if await db.guild_members.find_one({"user_id": user_id}, {"_id": 1}) else 0
+
+
+async def _guild_created(user_id: str) -> int:
+    return 1 if await db.guilds.find_one({"leader_id": user_id}, {"_id": 1}) else 0
+
+
+async def _special_breeds(user_id: str) -> int:
+    lab = await db.breeding_lab.find_one({"user_id": user_id}, {"_id": 0, "rare_discoveries": 1})
+    return len(lab.get("rare_discoveries", [])) if lab else 0
+
+
+# Requirements that live outside achievement_progress.stats; each is only
+# queried while an achievement depending on it is still locked
+EXTERNAL_STATS = {
+    "level": _player_level,
+    "guild_joined": _guild_joined,
+    "guild_created": _guild_created,
+    "special_breed": _special_breeds,
+}
+
+ACHIEVEMENT_INDEX = AchievementIndex(ACHIEVEMENTS.values())
+
+
+async def check_and_unlock_achievements(user_id: str, touched: Optional[Iterable[str]] = None,
+                                        progress: Optional[dict] = None) -> List[dict]:
+    """Unlock qualifying achievements, looking only at the `touched` stats (default: all)"""
+    if progress is None:
+        progress = await get_player_progress(user_id)
+    unlocked = set(progress.get("unlocked_achievements", []))
     
-    newly_unlocked = []
+    stats = ACHIEVEMENT_INDEX.pending_stats(unlocked, touched)
+    values = dict(progress.get("stats", {}))
+    external = [stat for stat in stats if stat in EXTERNAL_STATS]
+    if external:
+        loaded = await asyncio.gather(*(EXTERNAL_STATS[stat](user_id) for stat in external))
+        values.update(zip(external, loaded))
     
-    for ach_id, achievement in ACHIEVEMENTS.items():
-        if ach_id in progress.get("unlocked_achievements", []):
-            continue
-        
-        req = achievement["requirement"]
-        req_type = req["type"]
-        req_count = req["count"]
-        
-        # Check stat-based requirements
-        if req_type in progress.get("stats", {}):
-            current = progress["stats"].get(req_type, 0)
-            if current >= req_count:
-                newly_unlocked.append(achievement)
-        
-        # Check level requirement
-        elif req_type == "level":
-            if user and user.get("level", 1) >= req_count:
-                newly_unlocked.append(achievement)
-        
-        # Check guild requirements
-        elif req_type == "guild_joined":
-            guild_member = await db.guild_members.find_one({"user_id": user_id})
-            if guild_member:
-                newly_unlocked.append(achievement)
-        
-        elif req_type == "guild_created":
-            guild = await db.guilds.find_one({"leader_id": user_id})
-            if guild:
-                newly_unlocked.append(achievement)
-        
-        # Check special breed
-        elif req_type == "special_breed":
-            lab = await db.breeding_lab.find_one({"user_id": user_id}, {"_id": 0})
-            if lab and len(lab.get("rare_discoveries", [])) >= req_count:
-                newly_unlocked.append(achievement)
+    newly_unlocked = ACHIEVEMENT_INDEX.unlockable(values, unlocked, stats)
     
     # Unlock achievements
     if newly_unlocked:
         unlock_ids = [a["id"] for a in newly_unlocked]
         await db.achievement_progress.update_one(
             {"user_id": user_id},
-            {"$push": {"unlocked_achievements": {"$each": unlock_ids}}}
+            {"$addToSet": {"unlocked_achievements": {"$each": unlock_ids}}}
         )
     
     return newly_unlocked
@@ -562,6 +576,13 @@ async def get_achievement_progress(user_id: str):
         
         achievements.append(ach_copy)
     
+    # Next achievement per tracked stat
+    next_unlocks = {}
+    for stat, value in progress.get("stats", {}).items():
+        upcoming = ACHIEVEMENT_INDEX.next_unlock(stat, value)
+        if upcoming:
+            next_unlocks[stat] = {"achievement_id": upcoming[1]["id"], "current": value, "target": upcoming[0]}
+    
     return {
         "stats": {
             "total": total,
@@ -571,6 +592,7 @@ async def get_achievement_progress(user_id: str):
         },
         "achievements": achievements,
         "progress_stats": progress.get("stats", {}),
+        "next_unlocks": next_unlocks,
     }
 
 
@@ -658,21 +680,15 @@ async def update_stat_progress(request: UpdateProgressRequest):
         raise HTTPException(status_code=400, detail=f"Invalid stat type. Use: {valid_stats}")
     
     # Handle max_combo differently (it's a max, not a sum)
-    if request.stat_type == "max_combo":
-        await db.achievement_progress.update_one(
-            {"user_id": request.user_id},
-            {"$max": {f"stats.{request.stat_type}": request.amount}},
-            upsert=True
-        )
-    else:
-        await db.achievement_progress.update_one(
-            {"user_id": request.user_id},
-            {"$inc": {f"stats.{request.stat_type}": request.amount}},
-            upsert=True
-        )
+    op = "$max" if request.stat_type == "max_combo" else "$inc"
+    progress = await db.achievement_progress.find_one_and_update(
+        {"user_id": request.user_id},
+        {op: {f"stats.{request.stat_type}": request.amount}},
+        projection={"_id": 0}, upsert=True, return_document=ReturnDocument.AFTER
+    )
     
-    # Check for newly unlocked achievements
-    newly_unlocked = await check_and_unlock_achievements(request.user_id)
+    # Check for newly unlocked achievements (only the ones this stat can unlock)
+    newly_unlocked = await check_and_unlock_achievements(request.user_id, [request.stat_type], progress)
     
     return {
         "success": True,
@@ -681,6 +697,25 @@ async def update_stat_progress(request: UpdateProgressRequest):
     }
 
 
+async def record_catch_stats(user_id: str, increments: Dict[str, int], max_combo: int = 0) -> List[dict]:
+    """Apply all stat changes from a catch in one write, then check unlocks"""
+    update_ops: Dict[str, Dict[str, int]] = {}
+    if increments:
+        update_ops["$inc"] = {f"stats.{stat}": amount for stat, amount in increments.items()}
+    if max_combo:
+        update_ops["$max"] = {"stats.max_combo": max_combo}
+    if not update_ops:
+        return []
+    progress = await db.achievement_progress.find_one_and_update(
+        {"user_id": user_id}, update_ops,
+        projection={"_id": 0}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    
+    # Catch XP can level the player up, so level achievements are checked too
+    touched = [*increments, "level"] + (["max_combo"] if max_combo else [])
+    return await check_and_unlock_achievements(user_id, touched, progress)
+
+
 # ========== DAILY REWARDS ENDPOINTS ==========
 
 @router.get("/daily/status/{user_id}")
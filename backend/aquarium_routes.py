@@ -3,20 +3,26 @@
 # ~400+ lines of backend polish
 
 from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import db, register_indexes
+from catalog_cache import static_catalog
+from pymongo import IndexModel, ASCENDING
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 import uuid
-import os
 import random
 
 router = APIRouter(prefix="/api/aquarium", tags=["aquarium"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("player_aquarium", [
+    IndexModel([("user_id", ASCENDING)]),
+])
+
+register_indexes("aquarium_likes", [
+    IndexModel([("owner_id", ASCENDING), ("liker_id", ASCENDING), ("date", ASCENDING)]),
+])
 
 
 # ========== AQUARIUM CONFIGURATION ==========
@@ -225,12 +231,14 @@ async def get_tank(user_id: str, tank_id: str):
 
 
 @router.get("/tanks/available")
+@static_catalog
 async def get_available_tanks():
     """Get all tank types"""
     return {"tanks": list(AQUARIUM_TANKS.values())}
 
 
 @router.get("/decorations/available")
+@static_catalog
 async def get_available_decorations():
     """Get all decorations"""
     categories = {}
@@ -244,6 +252,7 @@ async def get_available_decorations():
 
 
 @router.get("/themes")
+@static_catalog
 async def get_themes():
     """Get all themes"""
     return {"themes": THEMES}
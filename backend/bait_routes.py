@@ -3,20 +3,27 @@
 # ~400+ lines of backend polish
 
 from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import db, register_indexes
+from catalog_cache import static_catalog
+from write_behind import stat_writer
+from pymongo import IndexModel, ASCENDING
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 import uuid
-import os
 import random
 
 router = APIRouter(prefix="/api/fishing", tags=["fishing"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("player_bait", [
+    IndexModel([("user_id", ASCENDING)]),
+])
+
+register_indexes("player_spots", [
+    IndexModel([("user_id", ASCENDING)]),
+])
 
 
 # ========== BAIT TYPES ==========
@@ -341,6 +348,7 @@ def calculate_catch_bonuses(bait_data: dict, spot_data: dict, conditions: dict)
 # ========== BAIT ENDPOINTS ==========
 
 @router.get("/bait/types")
+@static_catalog
 async def get_bait_types():
     """Get all bait types"""
     return {"baits": list(BAIT_TYPES.values())}
@@ -480,6 +488,7 @@ async def use_bait(request: UseBaitRequest):
 # ========== FISHING SPOTS ENDPOINTS ==========
 
 @router.get("/spots/all")
+@static_catalog
 async def get_all_spots():
     """Get all fishing spots"""
     return {"spots": list(FISHING_SPOTS.values())}
@@ -568,20 +577,18 @@ async def select_spot(request: SelectSpotRequest):
 @router.post("/spots/record-catch/{user_id}/{spot_id}")
 async def record_spot_catch(user_id: str, spot_id: str, fish_type: str):
     """Record a catch at a spot (for statistics)"""
-    await db.player_spots.update_one(
-        {"user_id": user_id},
-        {
-            "$inc": {
-                f"spot_stats.{spot_id}.fish_caught": 1,
-                f"spot_stats.{spot_id}.fish_types.{fish_type}": 1
-            }
-        },
-        upsert=True
-    )
-    
+    queue_spot_catch(user_id, spot_id, fish_type)
     return {"success": True}
 
 
+def queue_spot_catch(user_id: str, spot_id: str, fish_type: str, count: int = 1):
+    """Buffer spot catch counters; they are flushed in bulk by the stat writer"""
+    stat_writer.inc("player_spots", user_id, {
+        f"spot_stats.{spot_id}.fish_caught": count,
+        f"spot_stats.{spot_id}.fish_types.{fish_type}": count
+    })
+
+
 @router.get("/bonuses/{user_id}")
 async def get_current_fishing_bonuses(user_id: str, is_night: bool = False, is_storm: bool = False):
     """Get all current fishing bonuses"""
@@ -0,0 +1,84 @@
+"""
+Catch sampling benchmark for sea voyage fishing.
+
+Compares the original per-haul loop (roll every species for every fish, then
+pick uniformly among the hits) with the per-stage alias tables, drawn one by
+one with random.Random and, when NumPy is installed, in one batched call.
+
+Usage:
+    python bench_catch.py              # default 2000 hauls per net size
+    python bench_catch.py --hauls 500 --stage 50 --seed 7
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT_DIR = Path(__file__).parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from catch_sampler import np  # noqa: E402
+from sea_voyage_routes import BOATS, SEA_FISH, STAGES, stage_catch_table  # noqa: E402
+
+NET_MULTIPLIERS = {"small": 1, "medium": 2, "large": 3}
+
+
+# ========== SAMPLERS ==========
+
+def legacy_haul(stage: Dict[str, Any], count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """The original attempt_fishing loop"""
+    available_fish = [f for f in SEA_FISH if f["min_stage"] <= stage["id"]]
+    caught = []
+    for _ in range(count):
+        fish_pool = [f for f in available_fish
+                     if rng.random() < f["rarity"] * stage["rewards"]["rare_fish_chance"] * 10]
+        if fish_pool:
+            caught.append(rng.choice(fish_pool))
+    return caught
+
+
+def alias_haul(stage: Dict[str, Any], count: int, rng) -> List[Dict[str, Any]]:
+    return stage_catch_table(stage).sample(count, rng)
+
+
+def measure(haul: Callable, stage: Dict[str, Any], count: int, hauls: int, rng) -> float:
+    """Hauls per second"""
+    haul(stage, count, rng)  # warm-up
+    started = time.perf_counter()
+    for _ in range(hauls):
+        haul(stage, count, rng)
+    return hauls / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sea voyage catch sampling benchmark")
+    parser.add_argument("--hauls", type=int, default=2000, help="hauls per net size and sampler")
+    parser.add_argument("--stage", type=int, default=100, help="stage id (1-100)")
+    parser.add_argument("--seed", type=int, default=1725, help="RNG seed")
+    args = parser.parse_args()
+
+    stage = next(s for s in STAGES if s["id"] == args.stage)
+    capacity = max(b["fishing_capacity"] for b in BOATS)
+    print(f"stage {stage['id']}, boat capacity {capacity}, {args.hauls} hauls, "
+          f"numpy: {'yes' if np is not None else 'not installed'}\n")
+
+    header = f"{'net':<8}{'fish':>6}{'legacy/s':>12}{'alias/s':>12}{'speedup':>10}"
+    if np is not None:
+        header += f"{'batched/s':>12}{'speedup':>10}"
+    print(header)
+    for net, multiplier in NET_MULTIPLIERS.items():
+        count = int(capacity * multiplier / 10 * 1.5)  # largest haul the net allows
+        before = measure(legacy_haul, stage, count, args.hauls, random.Random(args.seed))
+        after = measure(alias_haul, stage, count, args.hauls, random.Random(args.seed))
+        row = f"{net:<8}{count:>6}{before:>12.0f}{after:>12.0f}{after / before:>9.1f}x"
+        if np is not None:
+            batched = measure(alias_haul, stage, count, args.hauls, np.random.default_rng(args.seed))
+            row += f"{batched:>12.0f}{batched / before:>9.1f}x"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+JSON encoding benchmark for the GO FISH! backend.
+
+Compares the default FastAPI path (jsonable_encoder + stdlib json, what a
+route returning a plain dict pays) against FastJSONResponse on the largest
+payloads we serve.
+
+Usage:
+    python bench_json.py              # default 200 rounds per payload
+    python bench_json.py --rounds 50
+"""
+
+import argparse
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+ROOT_DIR = Path(__file__).parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from fast_json import FastJSONResponse, orjson  # noqa: E402
+
+
+# ========== PAYLOADS ==========
+
+def tacklebox_payload(count: int = 1000) -> Dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    fish = [{
+        "id": str(uuid.uuid4()),
+        "user_id": "bench-user",
+        "name": f"Fish {i}",
+        "size": 20 + i % 80,
+        "points": 10 * (i % 25),
+        "color": "#3A7BD5",
+        "caught_at": (now - timedelta(minutes=i)).isoformat(),
+    } for i in range(count)]
+    return {"fish": fish, "count": len(fish), "next_cursor": None}
+
+
+def timeline_payload(count: int = 500) -> Dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    timeline: Dict[str, list] = {}
+    for i in range(count):
+        created = now - timedelta(hours=i * 3)
+        timeline.setdefault(created.date().isoformat(), []).append({
+            "entry_id": str(uuid.uuid4()),
+            "user_id": "bench-user",
+            "title": f"Log entry {i}",
+            "content": "Caught a fine fish near the old lighthouse. " * 4,
+            "log_type": "catch",
+            "importance": "normal",
+            "related_entities": ["fish_bass", "stage_12"],
+            "tags": ["catch", "bass"],
+            "created_at": created.isoformat(),
+            "is_auto_generated": True,
+            "is_pinned": False,
+        })
+    return {"timeline": timeline, "next_cursor": None}
+
+
+def stages_payload() -> Dict[str, Any]:
+    from sea_voyage_routes import STAGES
+    return {"stages": STAGES, "total": len(STAGES)}
+
+
+def encyclopedia_payload() -> Dict[str, Any]:
+    from encyclopedia_routes import FISH_DATABASE
+    fish = list(FISH_DATABASE.values())
+    return {"fish": fish, "total": len(fish)}
+
+
+# ========== ENCODERS ==========
+
+def encode_default(content: Any) -> bytes:
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def encode_fast(content: Any) -> bytes:
+    return FastJSONResponse(content).body
+
+
+def measure(encode: Callable[[Any], bytes], content: Any, rounds: int) -> float:
+    """Responses per second"""
+    encode(content)  # warm-up
+    started = time.perf_counter()
+    for _ in range(rounds):
+        encode(content)
+    return rounds / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON response encoding benchmark")
+    parser.add_argument("--rounds", type=int, default=200, help="encodes per payload and encoder")
+    args = parser.parse_args()
+
+    payloads = {
+        "tacklebox (1000 fish)": tacklebox_payload(),
+        "timeline (500 entries)": timeline_payload(),
+        "sea voyage stages": stages_payload(),
+        "encyclopedia fish": encyclopedia_payload(),
+    }
+
+    print(f"encoder: {'orjson' if orjson else 'stdlib json (orjson not installed)'}, {args.rounds} rounds\n")
+    print(f"{'payload':<26}{'bytes':>10}{'default/s':>12}{'fast/s':>12}{'speedup':>10}")
+    for name, content in payloads.items():
+        size = len(encode_fast(content))
+        before = measure(encode_default, content, args.rounds)
+        after = measure(encode_fast, content, args.rounds)
+        print(f"{name:<26}{size:>10}{before:>12.0f}{after:>12.0f}{after / before:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
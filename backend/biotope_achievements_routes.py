@@ -3,12 +3,17 @@
 # ~500+ lines of backend code
 
 from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import db, register_indexes
+from catalog_cache import static_catalog
+from write_behind import stat_writer
+from achievement_engine import AchievementIndex
+from pymongo import IndexModel, ASCENDING
 from datetime import datetime, timezone
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Tuple
 from pydantic import BaseModel
+from itertools import product
+from types import MappingProxyType
 import uuid
-import os
 
 # Import all fish databases
 from fish_saltwater import SALTWATER_FISH
@@ -18,10 +23,11 @@ from fish_river import RIVER_FISH
 
 router = APIRouter(prefix="/api/biotope-fish", tags=["biotope_fish"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("biotope_achievement_progress", [
+    IndexModel([("user_id", ASCENDING)]),
+])
 
 
 # ========== UNIFIED FISH DATABASE ==========
@@ -41,6 +47,77 @@ FISH_BY_BIOTOPE = {
     "river": list(RIVER_FISH.keys())
 }
 
+RARITY_ORDER = ("common", "uncommon", "rare", "epic", "legendary")
+
+
+class BiotopeFishCatalog:
+    """Read-only fish registry with every filter combination precomputed.
+
+    Each fish is indexed under all 8 (biotope, stage, rarity) keys where any
+    field may be None (= no filter), so a filtered listing is one dict lookup.
+    Response payloads are built here once and shared by every request.
+    """
+    
+    FILTERS = ("biotope", "stage", "rarity")
+    
+    def __init__(self, fish: Dict[str, dict], biotope_ids: List[str]):
+        self.fish = MappingProxyType(dict(fish))
+        
+        index: Dict[Tuple, List[dict]] = {}
+        for f in self.fish.values():
+            values = tuple(f.get(field) for field in self.FILTERS)
+            for mask in product((True, False), repeat=len(self.FILTERS)):
+                key = tuple(v if keep else None for v, keep in zip(values, mask))
+                index.setdefault(key, []).append(f)
+        self._index = MappingProxyType({key: tuple(group) for key, group in index.items()})
+        
+        self.count_by_biotope = MappingProxyType({
+            biotope: len(self.filter(biotope=biotope)) for biotope in biotope_ids
+        })
+        
+        by_biotope: Dict[str, int] = {}
+        by_rarity = {rarity: 0 for rarity in RARITY_ORDER}
+        for f in self.fish.values():
+            biotope = f.get("biotope", "unknown")
+            by_biotope[biotope] = by_biotope.get(biotope, 0) + 1
+            rarity = f.get("rarity", "common")
+            if rarity in by_rarity:
+                by_rarity[rarity] += 1
+        self.stats = {"total_fish": len(self.fish), "by_biotope": by_biotope, "by_rarity": by_rarity}
+        
+        self._listings = {key: self._listing(group) for key, group in self._index.items()}
+        self._empty_listing = self._listing(())
+        self._biotopes = {biotope: self._biotope_payload(biotope) for biotope in biotope_ids}
+    
+    def filter(self, biotope: Optional[str] = None, stage: Optional[str] = None,
+               rarity: Optional[str] = None) -> Tuple[dict, ...]:
+        return self._index.get((biotope or None, stage or None, rarity or None), ())
+    
+    def _listing(self, fish: Tuple[dict, ...]) -> dict:
+        return {"fish": list(fish), "total": len(fish), "by_biotope": dict(self.count_by_biotope)}
+    
+    def listing(self, biotope: Optional[str] = None, stage: Optional[str] = None,
+                rarity: Optional[str] = None) -> dict:
+        """Prebuilt payload for GET /all"""
+        return self._listings.get((biotope or None, stage or None, rarity or None), self._empty_listing)
+    
+    def _biotope_payload(self, biotope: str) -> dict:
+        fish = self.filter(biotope=biotope)
+        by_stage: Dict[str, List[dict]] = {}
+        for f in fish:
+            by_stage.setdefault(f.get("stage", "unknown"), []).append(f)
+        return {"biotope": biotope, "total_fish": len(fish), "fish": list(fish), "by_stage": by_stage}
+    
+    def biotope(self, biotope: str) -> dict:
+        """Prebuilt payload for GET /biotope/{biotope_id}"""
+        payload = self._biotopes.get(biotope)
+        if payload is None:
+            return {"biotope": biotope, "total_fish": 0, "fish": [], "by_stage": {}}
+        return payload
+
+
+FISH_CATALOG = BiotopeFishCatalog(ALL_BIOTOPE_FISH, list(FISH_BY_BIOTOPE))
+
 
 # ========== BIOTOPE ACHIEVEMENTS ==========
 
@@ -348,31 +425,16 @@ BIOTOPE_ACHIEVEMENTS = {
     },
 }
 
+BIOTOPE_ACHIEVEMENT_INDEX = AchievementIndex(BIOTOPE_ACHIEVEMENTS.values())
+
 
 # ========== ENDPOINTS ==========
 
 @router.get("/all")
+@static_catalog
 async def get_all_biotope_fish(biotope: Optional[str] = None, stage: Optional[str] = None, rarity: Optional[str] = None):
     """Get all biotope fish with filters"""
-    fish = list(ALL_BIOTOPE_FISH.values())
-    
-    if biotope:
-        fish = [f for f in fish if f.get("biotope") == biotope]
-    if stage:
-        fish = [f for f in fish if f.get("stage") == stage]
-    if rarity:
-        fish = [f for f in fish if f.get("rarity") == rarity]
-    
-    return {
-        "fish": fish,
-        "total": len(fish),
-        "by_biotope": {
-            "saltwater": len([f for f in ALL_BIOTOPE_FISH.values() if f.get("biotope") == "saltwater"]),
-            "freshwater_lake": len([f for f in ALL_BIOTOPE_FISH.values() if f.get("biotope") == "freshwater_lake"]),
-            "brackish": len([f for f in ALL_BIOTOPE_FISH.values() if f.get("biotope") == "brackish"]),
-            "river": len([f for f in ALL_BIOTOPE_FISH.values() if f.get("biotope") == "river"]),
-        }
-    }
+    return FISH_CATALOG.listing(biotope, stage, rarity)
 
 
 @router.get("/fish/{fish_id}")
@@ -385,28 +447,14 @@ async def get_fish_details(fish_id: str):
 
 
 @router.get("/biotope/{biotope_id}")
+@static_catalog
 async def get_biotope_fish(biotope_id: str):
     """Get all fish for a specific biotope"""
-    fish_ids = FISH_BY_BIOTOPE.get(biotope_id, [])
-    fish = [ALL_BIOTOPE_FISH[fid] for fid in fish_ids if fid in ALL_BIOTOPE_FISH]
-    
-    # Group by stage
-    by_stage = {}
-    for f in fish:
-        stage = f.get("stage", "unknown")
-        if stage not in by_stage:
-            by_stage[stage] = []
-        by_stage[stage].append(f)
-    
-    return {
-        "biotope": biotope_id,
-        "total_fish": len(fish),
-        "fish": fish,
-        "by_stage": by_stage
-    }
+    return FISH_CATALOG.biotope(biotope_id)
 
 
 @router.get("/achievements")
+@static_catalog
 async def get_biotope_achievements():
     """Get all biotope achievements"""
     return {"achievements": list(BIOTOPE_ACHIEVEMENTS.values())}
@@ -424,6 +472,7 @@ async def get_user_biotope_achievements(user_id: str):
             "unlocked": [],
             "claimed": []
         }
+    stat_writer.overlay("biotope_achievement_progress", user_id, progress)
     
     achievements = []
     for ach_id, ach in BIOTOPE_ACHIEVEMENTS.items():
@@ -445,29 +494,25 @@ async def get_user_biotope_achievements(user_id: str):
 @router.post("/achievements/check/{user_id}")
 async def check_biotope_achievements(user_id: str):
     """Check and unlock qualifying achievements"""
+    return await evaluate_biotope_achievements(user_id)
+
+
+async def evaluate_biotope_achievements(user_id: str, touched: Optional[Iterable[str]] = None):
+    """Unlock qualifying achievements, looking only at the `touched` stats (default: all)"""
     progress = await db.biotope_achievement_progress.find_one({"user_id": user_id}, {"_id": 0})
     
     if not progress:
         progress = {"user_id": user_id, "stats": {}, "unlocked": [], "claimed": []}
+    stat_writer.overlay("biotope_achievement_progress", user_id, progress)
     
-    newly_unlocked = []
-    
-    for ach_id, ach in BIOTOPE_ACHIEVEMENTS.items():
-        if ach_id in progress.get("unlocked", []):
-            continue
-        
-        req = ach["requirement"]
-        current = progress.get("stats", {}).get(req["type"], 0)
-        target = req.get("count", req.get("size", 1))
-        
-        if current >= target:
-            newly_unlocked.append(ach)
-            progress.setdefault("unlocked", []).append(ach_id)
+    newly_unlocked = BIOTOPE_ACHIEVEMENT_INDEX.unlockable(
+        progress.get("stats", {}), set(progress.get("unlocked", [])), touched
+    )
     
     if newly_unlocked:
         await db.biotope_achievement_progress.update_one(
             {"user_id": user_id},
-            {"$set": {"unlocked": progress["unlocked"]}},
+            {"$addToSet": {"unlocked": {"$each": [ach["id"] for ach in newly_unlocked]}}},
             upsert=True
         )
     
@@ -515,51 +560,40 @@ async def claim_biotope_achievement(user_id: str, achievement_id: str):
 @router.post("/record-catch/{user_id}")
 async def record_biotope_catch(user_id: str, fish_id: str, biotope: str, stage: str, size: int, rarity: str):
     """Record a catch for achievement tracking"""
+    touched = queue_biotope_catch_stats(user_id, fish_id, biotope, stage, rarity)
+    
+    # Check achievements (sees the buffered stats through the overlay)
+    newly_unlocked = await evaluate_biotope_achievements(user_id, touched)
+    
+    return {"success": True, "newly_unlocked": newly_unlocked.get("newly_unlocked", [])}
+
+
+def biotope_catch_stats(fish_id: str, biotope: str, stage: str, rarity: str, count: int = 1) -> Dict[str, int]:
+    """Achievement stat increments for a catch"""
     stat_updates = {
-        f"{biotope}_catches": 1,
-        f"{stage}_catches": 1,
-        f"{rarity}_catches": 1,
+        f"{biotope}_catches": count,
+        f"{stage}_catches": count,
+        f"{rarity}_catches": count,
     }
     
     # Special stat tracking
     fish = ALL_BIOTOPE_FISH.get(fish_id)
     if fish:
         fish_type = fish.get("id", "").split("_")[0]
-        stat_updates[f"{fish_type}_catches"] = 1
-    
-    # Update stats
-    update_ops = {"$inc": {f"stats.{k}": v for k, v in stat_updates.items()}}
-    
-    await db.biotope_achievement_progress.update_one(
-        {"user_id": user_id},
-        update_ops,
-        upsert=True
-    )
-    
-    # Check achievements
-    newly_unlocked = await check_biotope_achievements(user_id)
-    
-    return {"success": True, "newly_unlocked": newly_unlocked.get("newly_unlocked", [])}
+        stat_updates[f"{fish_type}_catches"] = count
+    return stat_updates
+
+
+def queue_biotope_catch_stats(user_id: str, fish_id: str, biotope: str, stage: str, rarity: str,
+                              count: int = 1) -> List[str]:
+    """Buffer achievement stat counters (flushed in bulk by the stat writer); returns the stats touched"""
+    stat_updates = biotope_catch_stats(fish_id, biotope, stage, rarity, count)
+    stat_writer.inc("biotope_achievement_progress", user_id, {f"stats.{k}": v for k, v in stat_updates.items()})
+    return list(stat_updates)
 
 
 @router.get("/stats")
+@static_catalog
 async def get_biotope_fish_stats():
     """Get statistics about all biotope fish"""
-    stats = {
-        "total_fish": len(ALL_BIOTOPE_FISH),
-        "by_biotope": {},
-        "by_rarity": {"common": 0, "uncommon": 0, "rare": 0, "epic": 0, "legendary": 0},
-    }
-    
-    for fish in ALL_BIOTOPE_FISH.values():
-        biotope = fish.get("biotope", "unknown")
-        rarity = fish.get("rarity", "common")
-        
-        if biotope not in stats["by_biotope"]:
-            stats["by_biotope"][biotope] = 0
-        stats["by_biotope"][biotope] += 1
-        
-        if rarity in stats["by_rarity"]:
-            stats["by_rarity"][rarity] += 1
-    
-    return stats
+    return FISH_CATALOG.stats
@@ -3,20 +3,24 @@
 # ~800+ lines of backend code
 
 from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import db, register_indexes
+from catalog_cache import static_catalog
+from leaderboard_engine import leaderboards
+from user_profiles import attach_usernames
+from pymongo import IndexModel, ASCENDING
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 import uuid
-import os
 import random
 
 router = APIRouter(prefix="/api/biotope", tags=["biotope"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("biotope_progress", [
+    IndexModel([("user_id", ASCENDING)]),
+])
 
 
 # ========== BIOTOPE DEFINITIONS ==========
@@ -464,6 +468,7 @@ def calculate_biotope_bonus(biotope_level: int) -> dict:
 # ========== BIOTOPE ENDPOINTS ==========
 
 @router.get("/all")
+@static_catalog
 async def get_all_biotopes():
     """Get all biotope information"""
     return {
@@ -491,6 +496,7 @@ async def get_biotope_details(biotope_id: str):
 
 
 @router.get("/stages/all")
+@static_catalog
 async def get_all_stages():
     """Get all biotope stages"""
     return {
@@ -689,6 +695,7 @@ async def record_biotope_catch(user_id: str, biotope_id: str, xp_earned: int = 1
             "$inc": {f"fish_caught_by_biotope.{biotope_id}": 1}
         }
     )
+    leaderboards.increment("biotope", biotope_id, user_id, 1, {"level": current_level})
     
     return {
         "success": True,
@@ -713,23 +720,36 @@ async def get_biotope_bonuses(user_id: str, biotope_id: str):
     }
 
 
+async def load_biotope_board(biotope_id: str):
+    """Stream every player's catch count for one biotope into its ranked board"""
+    cursor = db.biotope_progress.find(
+        {},
+        {"_id": 0, "user_id": 1, f"fish_caught_by_biotope.{biotope_id}": 1, f"biotope_level.{biotope_id}": 1}
+    )
+    async for entry in cursor:
+        yield (
+            entry["user_id"],
+            entry.get("fish_caught_by_biotope", {}).get(biotope_id, 0),
+            {"level": entry.get("biotope_level", {}).get(biotope_id, 1)}
+        )
+
+leaderboards.register("biotope", load_biotope_board)
+
+
 @router.get("/leaderboard/{biotope_id}")
 async def get_biotope_leaderboard(biotope_id: str, limit: int = 50):
     """Get leaderboard for a specific biotope"""
-    entries = await db.biotope_progress.find(
-        {},
-        {"_id": 0, "user_id": 1, f"fish_caught_by_biotope.{biotope_id}": 1, f"biotope_level.{biotope_id}": 1}
-    ).sort(f"fish_caught_by_biotope.{biotope_id}", -1).limit(limit).to_list(limit)
-    
-    leaderboard = []
-    for i, entry in enumerate(entries):
-        user = await db.users.find_one({"id": entry["user_id"]}, {"_id": 0, "username": 1})
-        leaderboard.append({
-            "rank": i + 1,
-            "user_id": entry["user_id"],
-            "username": user.get("username", "Unknown") if user else "Unknown",
-            "fish_caught": entry.get("fish_caught_by_biotope", {}).get(biotope_id, 0),
-            "level": entry.get("biotope_level", {}).get(biotope_id, 1)
-        })
+    board = await leaderboards.board("biotope", biotope_id)
+    
+    leaderboard = [
+        {
+            "rank": entry.rank,
+            "user_id": entry.member,
+            "fish_caught": entry.score,
+            "level": entry.data.get("level", 1)
+        }
+        for entry in board.top(limit)
+    ]
+    await attach_usernames(leaderboard)
     
     return {"biotope": biotope_id, "leaderboard": leaderboard}
@@ -3,21 +3,23 @@
 # ~500+ lines of backend polish
 
 from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import db, register_indexes
+from catalog_cache import static_catalog
+from pymongo import IndexModel, ASCENDING
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 import uuid
-import os
 import random
 import hashlib
 
 router = APIRouter(prefix="/api/breeding", tags=["breeding"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("breeding_lab", [
+    IndexModel([("user_id", ASCENDING)]),
+])
 
 
 # ========== FISH GENETICS SYSTEM ==========
@@ -234,6 +236,7 @@ async def get_lab(user_id: str):
 
 
 @router.get("/species")
+@static_catalog
 async def get_breedable_species():
     """Get all breedable fish species"""
     species = []
@@ -250,6 +253,7 @@ async def get_breedable_species():
 
 
 @router.get("/special-breeds")
+@static_catalog
 async def get_special_breeds():
     """Get all discoverable special breeds"""
     return {"special_breeds": SPECIAL_BREEDS}
@@ -13,17 +13,42 @@ Features:
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
-from datetime import datetime, timezone
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
+from datetime import datetime, timedelta, timezone
+from database import db, register_indexes, register_migration, migration_done
+from catalog_cache import static_catalog
+from pagination import paginate, projection_for
+from fast_json import FastJSONResponse
+from search_engine import tokenize
+from pymongo import IndexModel, ReplaceOne, ASCENDING, DESCENDING, TEXT
+import html
+import re
 import uuid
 
 router = APIRouter(prefix="/api/captains-log", tags=["captains_log"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'test_database')]
+# ============================================================================
+# INDEXES
+# ============================================================================
+
+register_indexes("captains_log", [
+    IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("entry_id", DESCENDING)]),
+    IndexModel([("entry_id", ASCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("log_type", ASCENDING), ("created_at", DESCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("importance", ASCENDING), ("created_at", DESCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("is_pinned", ASCENDING), ("created_at", DESCENDING)]),
+    # Typed timestamp for date-range queries (created_at stays the ISO string clients see)
+    IndexModel([("user_id", ASCENDING), ("logged_at", ASCENDING), ("entry_id", ASCENDING)]),
+    # Per-user full-text search; the user_id prefix keeps each query to one player's entries
+    IndexModel(
+        [("user_id", ASCENDING), ("title", TEXT), ("content", TEXT), ("tags", TEXT)],
+        weights={"title": 10, "tags": 5, "content": 1},
+        name="captains_log_text",
+    ),
+])
+
+register_indexes("captains_log_stats", [
+    IndexModel([("user_id", ASCENDING)], unique=True),
+])
 
 # ============================================================================
 # LOG ENTRY TYPES
@@ -166,31 +191,189 @@ class LogFilter(BaseModel):
     date_to: Optional[str] = None
     search_text: Optional[str] = None
 
+# ============================================================================
+# TIMESTAMPS & SEARCH HELPERS
+# ============================================================================
+
+SNIPPET_RADIUS = 80
+_SUFFIXES = ("ing", "ed", "es", "ly", "s")
+
+
+def parse_timestamp(value: str) -> datetime:
+    """Parse an ISO date or datetime; naive values are taken as UTC"""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def entry_doc(entry: "LogEntry") -> Dict[str, Any]:
+    """Stored form of an entry: canonical UTC created_at plus its typed logged_at"""
+    logged_at = parse_timestamp(entry.created_at)
+    doc = entry.model_dump()
+    doc["created_at"] = logged_at.isoformat()
+    doc["logged_at"] = logged_at
+    return doc
+
+
+def date_range(year: Optional[int] = None, month: Optional[int] = None,
+               date_from: Optional[str] = None, date_to: Optional[str] = None,
+               typed: bool = True) -> Dict[str, Any]:
+    """logged_at bounds; a bare `date_to` date includes that whole day.
+
+    With typed=False the same bounds are applied to the ISO created_at
+    string, for databases where backfill_logged_at has not run yet.
+    """
+    bounds = {}
+    if year:
+        start = datetime(year, month or 1, 1, tzinfo=timezone.utc)
+        if month:
+            end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+        else:
+            end = datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+        bounds = {"$gte": start, "$lt": end}
+    if date_from:
+        start = parse_timestamp(date_from)
+        bounds["$gte"] = max(start, bounds.get("$gte", start))
+    if date_to:
+        end = parse_timestamp(date_to)
+        if len(date_to) == 10:
+            end += timedelta(days=1)
+        bounds["$lt"] = min(end, bounds.get("$lt", end))
+    if not bounds:
+        return {}
+    if not typed:
+        return {"created_at": {op: value.isoformat() for op, value in bounds.items()}}
+    return {"logged_at": bounds}
+
+
+async def logged_at_ready() -> bool:
+    """Whether every entry has logged_at (the backfill migration has finished)"""
+    return await migration_done(LOGGED_AT_MIGRATION)
+
+
+def _stem(term: str) -> str:
+    for suffix in _SUFFIXES:
+        if term.endswith(suffix) and len(term) - len(suffix) >= 3:
+            return term[:-len(suffix)]
+    return term
+
+
+def highlight_pattern(query: str) -> Optional[re.Pattern]:
+    """Words matching the positive search terms (Mongo stems, so match by stem prefix)"""
+    words = " ".join(w for w in query.split() if not w.startswith("-"))
+    stems = sorted({_stem(t) for t in tokenize(words)}, key=len, reverse=True)
+    if not stems:
+        return None
+    return re.compile(r"\b(?:" + "|".join(map(re.escape, stems)) + r")\w*", re.IGNORECASE)
+
+
+def highlight(text: str, pattern: Optional[re.Pattern], snippet: bool = False) -> str:
+    """HTML-escaped text with matches wrapped in <mark>, optionally cut to a snippet"""
+    if not text:
+        return ""
+    if pattern is not None and snippet:
+        first = pattern.search(text)
+        if first and len(text) > 2 * SNIPPET_RADIUS:
+            start = max(0, first.start() - SNIPPET_RADIUS)
+            end = min(len(text), first.end() + SNIPPET_RADIUS)
+            text = ("…" if start else "") + text[start:end] + ("…" if end < len(text) else "")
+    elif snippet and len(text) > 2 * SNIPPET_RADIUS:
+        text = text[:2 * SNIPPET_RADIUS] + "…"
+    if pattern is None:
+        return html.escape(text)
+    parts, last = [], 0
+    for match in pattern.finditer(text):
+        parts.append(html.escape(text[last:match.start()]))
+        parts.append(f"<mark>{html.escape(match.group())}</mark>")
+        last = match.end()
+    parts.append(html.escape(text[last:]))
+    return "".join(parts)
+
+# ============================================================================
+# LOG STATISTICS COUNTERS
+# ============================================================================
+# One captains_log_stats document per user, kept in step with every insert
+# and delete so statistics are a single indexed read. Only documents built
+# from the entries (built: true) are incremented; anything else is rebuilt.
+
+async def count_log_entry(user_id: str, log_type: str, importance: str, delta: int = 1):
+    result = await db.captains_log_stats.update_one(
+        {"user_id": user_id, "built": True},
+        {"$inc": {"total": delta, f"by_type.{log_type}": delta, f"by_importance.{importance}": delta}}
+    )
+    if not result.matched_count:
+        # First write for a user with legacy entries: count them all, this one included
+        await rebuild_log_stats(user_id)
+
+
+def empty_stats(user_id: str) -> Dict[str, Any]:
+    return {"user_id": user_id, "built": True, "total": 0, "by_type": {}, "by_importance": {}}
+
+
+def _stats_docs(groups: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    stats: Dict[str, Dict[str, Any]] = {}
+    for group in groups:
+        user_id, count = group["_id"]["user_id"], group["count"]
+        doc = stats.setdefault(user_id, empty_stats(user_id))
+        doc["total"] += count
+        for field, key in (("by_type", "log_type"), ("by_importance", "importance")):
+            value = group["_id"].get(key) or "unknown"
+            doc[field][value] = doc[field].get(value, 0) + count
+    return stats
+
+
+async def rebuild_log_stats(user_id: Optional[str] = None) -> int:
+    """Recompute counters from the entries themselves (one user, or everyone)"""
+    pipeline = [
+        {"$group": {
+            "_id": {"user_id": "$user_id", "log_type": "$log_type", "importance": "$importance"},
+            "count": {"$sum": 1}
+        }}
+    ]
+    if user_id is not None:
+        pipeline.insert(0, {"$match": {"user_id": user_id}})
+    groups = await db.captains_log.aggregate(pipeline).to_list(None)
+    stats = _stats_docs(groups)
+    if user_id is not None and user_id not in stats:
+        stats[user_id] = empty_stats(user_id)
+    if stats:
+        await db.captains_log_stats.bulk_write(
+            [ReplaceOne({"user_id": uid}, doc, upsert=True) for uid, doc in stats.items()],
+            ordered=False
+        )
+    return len(stats)
+
 # ============================================================================
 # API ROUTES
 # ============================================================================
 
 @router.get("/types")
+@static_catalog
 async def get_log_types():
     """Get all log entry types"""
     return LOG_TYPES
 
+LOG_ENTRY_FIELDS = tuple(LogEntry.model_fields)
+
 @router.get("/user/{user_id}")
-async def get_captains_log(user_id: str, limit: int = 50, skip: int = 0):
-    """Get user's captain's log entries"""
-    entries = await db.captains_log.find(
-        {"user_id": user_id},
-        {"_id": 0}
-    ).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+async def get_captains_log(user_id: str, limit: int = 50, cursor: Optional[str] = None, fields: Optional[str] = None):
+    """Get user's captain's log entries, newest first; pass `next_cursor` back to continue"""
+    entries, next_cursor = await paginate(
+        db.captains_log, {"user_id": user_id}, "created_at", "entry_id", limit=limit, cursor=cursor,
+        projection=projection_for(fields, LOG_ENTRY_FIELDS, ("entry_id", "created_at")),
+    )
     
     total = await db.captains_log.count_documents({"user_id": user_id})
     
-    return {
+    return FastJSONResponse({
         "entries": entries,
         "total": total,
-        "page": skip // limit + 1,
-        "pages": (total + limit - 1) // limit
-    }
+        "next_cursor": next_cursor
+    })
 
 @router.get("/user/{user_id}/by-type/{log_type}")
 async def get_log_by_type(user_id: str, log_type: str, limit: int = 50):
@@ -225,7 +408,8 @@ async def get_milestones(user_id: str):
 @router.post("/add")
 async def add_log_entry(entry: LogEntry):
     """Add a new log entry"""
-    await db.captains_log.insert_one(entry.model_dump())
+    await db.captains_log.insert_one(entry_doc(entry))
+    await count_log_entry(entry.user_id, entry.log_type, entry.importance)
     return {"message": "Entry added", "entry_id": entry.entry_id}
 
 @router.post("/personal-note")
@@ -240,7 +424,8 @@ async def add_personal_note(note: PersonalNote):
         tags=note.tags,
         is_auto_generated=False
     )
-    await db.captains_log.insert_one(entry.model_dump())
+    await db.captains_log.insert_one(entry_doc(entry))
+    await count_log_entry(entry.user_id, entry.log_type, entry.importance)
     return {"message": "Personal note added", "entry_id": entry.entry_id}
 
 @router.post("/auto-log/{template_id}")
@@ -264,7 +449,8 @@ async def auto_generate_log(template_id: str, user_id: str, variables: Dict):
         related_entities=list(variables.keys())
     )
     
-    await db.captains_log.insert_one(entry.model_dump())
+    await db.captains_log.insert_one(entry_doc(entry))
+    await count_log_entry(entry.user_id, entry.log_type, entry.importance)
     return {"message": "Auto-log created", "entry": entry.model_dump()}
 
 @router.put("/pin/{entry_id}")
@@ -296,68 +482,78 @@ async def delete_entry(entry_id: str, user_id: str):
     if entry.get("is_auto_generated"):
         raise HTTPException(status_code=400, detail="Cannot delete auto-generated entries")
     
-    await db.captains_log.delete_one({"entry_id": entry_id})
+    result = await db.captains_log.delete_one({"entry_id": entry_id, "user_id": user_id})
+    if result.deleted_count:
+        await count_log_entry(user_id, entry.get("log_type") or "unknown", entry.get("importance") or "unknown", -1)
     return {"message": "Entry deleted"}
 
 @router.get("/user/{user_id}/search")
-async def search_log(user_id: str, query: str, limit: int = 20):
-    """Search log entries"""
+async def search_log(user_id: str, query: str, limit: int = 20, log_type: Optional[str] = None,
+                     date_from: Optional[str] = None, date_to: Optional[str] = None):
+    """Full-text search of log entries, best matches first, with highlighted title/snippet.
+
+    `query` uses Mongo text syntax: words, "exact phrases" and -excluded words.
+    """
+    limit = max(1, min(limit, 100))
+    typed = await logged_at_ready()
+    filters = {"user_id": user_id, "$text": {"$search": query},
+               **date_range(date_from=date_from, date_to=date_to, typed=typed)}
+    if log_type:
+        filters["log_type"] = log_type
+    
     entries = await db.captains_log.find(
-        {
-            "user_id": user_id,
-            "$or": [
-                {"title": {"$regex": query, "$options": "i"}},
-                {"content": {"$regex": query, "$options": "i"}},
-                {"tags": {"$regex": query, "$options": "i"}}
-            ]
-        },
-        {"_id": 0}
-    ).limit(limit).to_list(limit)
+        filters,
+        {"_id": 0, "score": {"$meta": "textScore"}}
+    ).sort([("score", {"$meta": "textScore"})]).limit(limit).to_list(limit)
+    
+    pattern = highlight_pattern(query)
+    for entry in entries:
+        entry["score"] = round(entry["score"], 3)
+        entry["highlights"] = {
+            "title": highlight(entry.get("title", ""), pattern),
+            "content": highlight(entry.get("content", ""), pattern, snippet=True),
+            "tags": [tag for tag in entry.get("tags", []) if pattern is not None and pattern.search(tag)],
+        }
     
-    return {"entries": entries, "query": query}
+    return FastJSONResponse({"entries": entries, "query": query})
 
 @router.get("/user/{user_id}/statistics")
 async def get_log_statistics(user_id: str):
     """Get statistics about user's log"""
-    total = await db.captains_log.count_documents({"user_id": user_id})
-    
-    # Count by type
-    by_type = {}
-    for log_type in LOG_TYPES.keys():
-        count = await db.captains_log.count_documents(
-            {"user_id": user_id, "log_type": log_type}
-        )
-        by_type[log_type] = count
+    stats = await db.captains_log_stats.find_one({"user_id": user_id}, {"_id": 0})
+    if not stats or not stats.get("built"):
+        # Entries written before counters existed: build them once
+        await rebuild_log_stats(user_id)
+        stats = await db.captains_log_stats.find_one({"user_id": user_id}, {"_id": 0}) or {}
     
-    # Count by importance
-    milestones = await db.captains_log.count_documents(
-        {"user_id": user_id, "importance": "milestone"}
-    )
-    legendary = await db.captains_log.count_documents(
-        {"user_id": user_id, "importance": "legendary"}
-    )
+    counted = stats.get("by_type", {})
+    importance = stats.get("by_importance", {})
     
     return {
-        "total_entries": total,
-        "by_type": by_type,
-        "milestones": milestones,
-        "legendary_moments": legendary
+        "total_entries": stats.get("total", 0),
+        "by_type": {log_type: counted.get(log_type, 0) for log_type in LOG_TYPES},
+        "milestones": importance.get("milestone", 0),
+        "legendary_moments": importance.get("legendary", 0)
     }
 
 @router.get("/user/{user_id}/timeline")
-async def get_timeline(user_id: str, year: Optional[int] = None, month: Optional[int] = None):
-    """Get log entries organized by date"""
-    query = {"user_id": user_id}
-    
-    if year:
-        query["created_at"] = {"$regex": f"^{year}"}
-        if month:
-            query["created_at"] = {"$regex": f"^{year}-{month:02d}"}
+async def get_timeline(user_id: str, year: Optional[int] = None, month: Optional[int] = None,
+                       date_from: Optional[str] = None, date_to: Optional[str] = None,
+                       limit: int = 100, cursor: Optional[str] = None, fields: Optional[str] = None):
+    """Get log entries organized by date, oldest first; pass `next_cursor` back to continue"""
+    if month and not year:
+        raise HTTPException(status_code=400, detail="month requires year")
+    if month and not 1 <= month <= 12:
+        raise HTTPException(status_code=400, detail="Invalid month")
+    # Until the backfill has run, legacy entries only have the created_at string
+    typed = await logged_at_ready()
+    query = {"user_id": user_id, **date_range(year, month, date_from, date_to, typed=typed)}
     
-    entries = await db.captains_log.find(
-        query,
-        {"_id": 0}
-    ).sort("created_at", 1).to_list(500)
+    entries, next_cursor = await paginate(
+        db.captains_log, query, "logged_at" if typed else "created_at", "entry_id", limit=limit, cursor=cursor,
+        projection=projection_for(fields, LOG_ENTRY_FIELDS, ("entry_id", "created_at", "logged_at")),
+        descending=False,
+    )
     
     # Group by date
     timeline = {}
@@ -367,4 +563,23 @@ async def get_timeline(user_id: str, year: Optional[int] = None, month: Optional
             timeline[date] = []
         timeline[date].append(entry)
     
-    return {"timeline": timeline}
+    return FastJSONResponse({"timeline": timeline, "next_cursor": next_cursor})
+
+async def backfill_logged_at() -> int:
+    """Give entries written before logged_at existed their typed timestamp.
+
+    A missing or unparseable created_at gets the migration time, so one bad
+    entry cannot fail the whole backfill.
+    """
+    result = await db.captains_log.update_many(
+        {"logged_at": {"$exists": False}},
+        [{"$set": {"logged_at": {"$dateFromString": {
+            "dateString": {"$convert": {"input": "$created_at", "to": "string", "onError": None, "onNull": None}},
+            "onError": "$$NOW", "onNull": "$$NOW"
+        }}}}]
+    )
+    return result.modified_count
+
+LOGGED_AT_MIGRATION = "captains_log_logged_at"
+register_migration(LOGGED_AT_MIGRATION, backfill_logged_at)
+register_migration("captains_log_stats", rebuild_log_stats)
@@ -0,0 +1,111 @@
+# ========== GO FISH! STATIC CATALOG RESPONSES ==========
+# Static game data serialized once, served with ETags and pre-compressed bodies
+
+from fastapi import Request
+from starlette.responses import Response
+from typing import Any, Callable, Dict, List, Optional
+from fast_json import dumps
+import functools
+import gzip
+import hashlib
+import inspect
+import os
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+CATALOG_MAX_AGE = int(os.environ.get('CATALOG_MAX_AGE_SECONDS', 3600))
+CATALOG_CACHE_CONTROL = f"public, max-age={CATALOG_MAX_AGE}, stale-while-revalidate={CATALOG_MAX_AGE * 24}"
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+# Distinct query-parameter combinations cached per endpoint
+MAX_VARIANTS = 64
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = q
+    return accepted
+
+
+class CatalogPayload:
+    """A JSON body encoded once, with its ETag and compressed variants"""
+
+    def __init__(self, payload: Any, cache_control: str = CATALOG_CACHE_CONTROL):
+        self.cache_control = cache_control
+        self.body = dumps(payload)
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        self.variants: Dict[str, bytes] = {}
+        if len(self.body) >= MIN_COMPRESS_BYTES:
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(self.body)
+            self.variants["gzip"] = gzip.compress(self.body, compresslevel=9, mtime=0)
+
+    def not_modified(self, request: Request) -> bool:
+        header = request.headers.get("if-none-match")
+        if not header:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+        return "*" in tags or self.etag in tags
+
+    def respond(self, request: Request, cache_control: Optional[str] = None) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": cache_control or self.cache_control, "Vary": "Accept-Encoding"}
+        if self.not_modified(request):
+            return Response(status_code=304, headers=headers)
+
+        accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        for coding, body in self.variants.items():  # preference order: br, gzip
+            if accepted.get(coding, 0) > 0:
+                headers["Content-Encoding"] = coding
+                return Response(body, media_type="application/json", headers=headers)
+        return Response(self.body, media_type="application/json", headers=headers)
+
+
+_catalogs: List[Callable] = []
+
+
+def static_catalog(func: Callable) -> Callable:
+    """Cache a GET endpoint whose response depends only on its parameters.
+
+    The first call per parameter combination is encoded into a CatalogPayload;
+    later calls return the stored bytes (or 304 when the client's ETag matches).
+    Only for module-level game data: never for per-user or time-based responses.
+    """
+    signature = inspect.signature(func)
+    cache: Dict[tuple, CatalogPayload] = {}
+
+    @functools.wraps(func)
+    async def endpoint(request: Request, **kwargs):
+        key = tuple(sorted(kwargs.items()))
+        payload = cache.get(key)
+        if payload is None:
+            payload = CatalogPayload(await func(**kwargs))
+            if len(cache) < MAX_VARIANTS:
+                cache[key] = payload
+        return payload.respond(request)
+
+    endpoint.__signature__ = signature.replace(parameters=[
+        *signature.parameters.values(),
+        inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+    ])
+    if not signature.parameters:
+        _catalogs.append(endpoint)
+    return endpoint
+
+
+async def warm_catalogs():
+    """Encode every parameterless catalog up front so no request pays for it"""
+    warm_request = Request({"type": "http", "headers": []})
+    for endpoint in _catalogs:
+        await endpoint(request=warm_request)
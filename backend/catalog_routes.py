@@ -0,0 +1,98 @@
+# ========== GO FISH! GAME DATA BUNDLE API ==========
+# All static catalogs in one versioned download, plus a cheap manifest to poll
+
+from fastapi import APIRouter, HTTPException, Request
+from typing import Any, Dict, Optional
+import hashlib
+
+from catalog_cache import CatalogPayload
+from encyclopedia_routes import FISH_DATABASE
+from biotope_achievements_routes import ALL_BIOTOPE_FISH, FISH_BY_BIOTOPE
+from biotope_routes import BIOTOPES, BIOTOPE_STAGES
+from sea_voyage_routes import BOATS, STAGES, SEA_FISH, SUPPLIES, SEA_DANGERS
+from cooking_routes import RECIPES, COOKING_INGREDIENTS
+from crafting_routes import CRAFTING_RECIPES, CRAFTING_MATERIALS
+from equipment_routes import FISHING_RODS, FISHING_LINES, BOBBERS
+from bait_routes import BAIT_TYPES, FISHING_SPOTS
+from expanded_npcs import PORT_NPCS, CITY_NPCS, PIRATE_HAVEN_NPCS
+from world_map import WORLD_SIZE, REGIONS
+
+router = APIRouter(prefix="/api/catalog", tags=["catalog"])
+
+# Versioned bundle URLs never change content, so they may be cached forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# The manifest is revalidated on every poll (a 304 when nothing changed)
+MANIFEST_CACHE_CONTROL = "no-cache"
+
+
+# ========== BUNDLE ==========
+
+def build_sections() -> Dict[str, Any]:
+    return {
+        "fish": FISH_DATABASE,
+        "biotope_fish": ALL_BIOTOPE_FISH,
+        "fish_by_biotope": FISH_BY_BIOTOPE,
+        "biotopes": BIOTOPES,
+        "biotope_stages": BIOTOPE_STAGES,
+        "stages": STAGES,
+        "boats": BOATS,
+        "sea_fish": SEA_FISH,
+        "supplies": SUPPLIES,
+        "dangers": SEA_DANGERS,
+        "recipes": RECIPES,
+        "ingredients": COOKING_INGREDIENTS,
+        "crafting_recipes": CRAFTING_RECIPES,
+        "crafting_materials": CRAFTING_MATERIALS,
+        "equipment": {"rods": FISHING_RODS, "lines": FISHING_LINES, "bobbers": BOBBERS},
+        "baits": BAIT_TYPES,
+        "spots": FISHING_SPOTS,
+        "npcs": {"port": PORT_NPCS, "city": CITY_NPCS, "pirate_haven": PIRATE_HAVEN_NPCS},
+        "world": {"world_size": WORLD_SIZE, "regions": REGIONS},
+    }
+
+
+class GameDataBundle:
+    """Every section encoded once; the version is a hash of the section ETags"""
+
+    def __init__(self, sections: Dict[str, Any]):
+        self.sections = {name: CatalogPayload(data) for name, data in sections.items()}
+        digest = hashlib.sha256("".join(p.etag for p in self.sections.values()).encode())
+        self.version = digest.hexdigest()[:16]
+        self.bundle = CatalogPayload({"version": self.version, "sections": sections})
+        self.manifest = CatalogPayload({
+            "version": self.version,
+            "bundle_url": f"{router.prefix}/bundle?v={self.version}",
+            "bytes": len(self.bundle.body),
+            "compressed_bytes": {coding: len(body) for coding, body in self.bundle.variants.items()},
+            "sections": {
+                name: {"etag": payload.etag, "bytes": len(payload.body)}
+                for name, payload in self.sections.items()
+            },
+        }, cache_control=MANIFEST_CACHE_CONTROL)
+
+
+game_data = GameDataBundle(build_sections())
+
+
+# ========== ENDPOINTS ==========
+
+@router.get("/manifest")
+async def get_catalog_manifest(request: Request):
+    """Current bundle version and per-section hashes"""
+    return game_data.manifest.respond(request)
+
+
+@router.get("/bundle")
+async def get_catalog_bundle(request: Request, v: Optional[str] = None):
+    """All static game data in one response; pass the manifest version as `v`"""
+    cache_control = IMMUTABLE_CACHE_CONTROL if v == game_data.version else None
+    return game_data.bundle.respond(request, cache_control=cache_control)
+
+
+@router.get("/section/{name}")
+async def get_catalog_section(name: str, request: Request):
+    """A single section, for clients that only refresh what changed"""
+    payload = game_data.sections.get(name)
+    if not payload:
+        raise HTTPException(status_code=404, detail="Catalog section not found")
+    return payload.respond(request)
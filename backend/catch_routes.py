@@ -0,0 +1,243 @@
+# ========== GO FISH! CATCH INGESTION API ==========
+# Single entry point for a catch: tacklebox, collection, progression and
+# stat counters are all recorded in one request
+
+from fastapi import APIRouter, HTTPException
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+from datetime import datetime, timezone
+import asyncio
+import logging
+import uuid
+
+from database import db
+from write_behind import stat_writer
+from bait_routes import queue_spot_catch
+from biotope_achievements_routes import queue_biotope_catch_stats, biotope_catch_stats, evaluate_biotope_achievements
+from biotope_routes import record_biotope_catch
+from encyclopedia_routes import FISH_DATABASE, discover_fish
+from quest_routes import apply_quest_progress
+from vip_daily_routes import RecordVIPCatchRequest, record_catch_progress
+from achievement_routes import record_catch_stats
+from letter_bottle_routes import check_for_bottle
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/catch", tags=["catch"])
+
+
+# ========== REQUEST/RESPONSE MODELS ==========
+
+class CatchEvent(BaseModel):
+    user_id: str
+    fish_id: str = ""
+    fish_type: str = ""
+    biotope: Optional[str] = None
+    stage: Optional[str] = None
+    rarity: Optional[str] = None
+    spot_id: Optional[str] = None
+    count: int = 1
+
+
+class CatchEventBatch(BaseModel):
+    events: List[CatchEvent] = Field(default_factory=list)
+
+
+class CatchRecord(CatchEvent):
+    name: str = ""
+    size: int = 50
+    points: int = 0
+    color: Optional[str] = None
+    stage_id: Optional[int] = None  # numeric stage used by quests and bottle rolls
+    rarity_tier: int = 0            # numeric rarity used by quest filters
+    xp: int = 10
+    perfect: bool = False
+    combo: int = 0
+    night: bool = False
+    storm: bool = False
+
+
+class CatchBatch(BaseModel):
+    catches: List[CatchRecord] = Field(default_factory=list)
+
+
+# ========== PIPELINE ==========
+
+def tacklebox_doc(user_id: str, fish: dict) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "name": fish.get("name"),
+        "size": fish.get("size"),
+        "points": fish.get("points"),
+        "color": fish.get("color"),
+        "caught_at": fish.get("caught_at") or datetime.now(timezone.utc).isoformat()
+    }
+
+
+def _quest_actions(catch: CatchRecord) -> list:
+    extra = {
+        "fish_type": catch.fish_type or catch.fish_id,
+        "stage": catch.stage_id,
+        "rarity": catch.rarity_tier,
+        "size": catch.size,
+    }
+    actions = [
+        ("catch_fish", 1, extra),
+        ("catch_type", 1, extra),
+        ("catch_rarity", 1, extra),
+    ]
+    # Peak objectives: the value is this catch's measure, not an increment
+    if catch.size:
+        actions.append(("catch_size", catch.size, extra))
+    if catch.stage_id is not None:
+        actions.append(("catch_stage", 1, extra))
+    if catch.perfect:
+        actions.append(("perfect_catch", 1, extra))
+    if catch.combo:
+        actions.append(("combo", catch.combo, extra))
+    if catch.points:
+        actions.append(("score", catch.points, extra))
+    return actions
+
+
+def _achievement_stats(catch: CatchRecord) -> Dict[str, int]:
+    stats = {"fish_caught": 1}
+    if catch.rarity in ("rare", "epic"):
+        stats["rare_fish"] = 1
+    if catch.rarity == "legendary":
+        stats["legendary_fish"] = 1
+    if catch.perfect:
+        stats["perfect_catches"] = 1
+    if catch.night:
+        stats["night_catches"] = 1
+    if catch.storm:
+        stats["storm_catches"] = 1
+    return stats
+
+
+async def _process_catch(catch: CatchRecord) -> Dict[str, Any]:
+    """Run every subsystem handler for one catch; independent ones run concurrently"""
+    queue_catch_counters(catch)
+
+    handlers = {
+        "quests": apply_quest_progress(catch.user_id, _quest_actions(catch)),
+        "achievements": record_catch_stats(catch.user_id, _achievement_stats(catch), catch.combo),
+        "catch_of_day": record_catch_progress(RecordVIPCatchRequest(
+            user_id=catch.user_id, fish_id=catch.fish_id, fish_name=catch.name or catch.fish_id
+        )),
+        "bottle": check_for_bottle(catch.user_id, catch.stage_id),
+    }
+    if catch.fish_id in FISH_DATABASE:
+        handlers["discovery"] = discover_fish(catch.user_id, catch.fish_id, catch.size)
+    if catch.biotope:
+        handlers["biotope"] = record_biotope_catch(catch.user_id, catch.biotope, catch.xp)
+        if catch.stage and catch.rarity:
+            handlers["biotope_achievements"] = evaluate_biotope_achievements(
+                catch.user_id, biotope_catch_stats(catch.fish_id, catch.biotope, catch.stage, catch.rarity)
+            )
+
+    outcomes = await asyncio.gather(*handlers.values(), return_exceptions=True)
+
+    results, errors = {}, {}
+    for name, outcome in zip(handlers, outcomes):
+        if isinstance(outcome, HTTPException):
+            errors[name] = outcome.detail
+        elif isinstance(outcome, Exception):
+            logger.error(f"Catch pipeline step {name} failed for {catch.user_id}: {outcome}")
+            errors[name] = "internal error"
+        else:
+            results[name] = outcome
+    if errors:
+        results["errors"] = errors
+    return results
+
+
+def _merge_results(catch: CatchRecord, results: Dict[str, Any], merged: Dict[str, Any]):
+    discovery = results.get("discovery")
+    if discovery and discovery.get("is_new_discovery"):
+        merged["new_discoveries"].append(discovery["fish"])
+
+    biotope = results.get("biotope")
+    if biotope and biotope.get("leveled_up"):
+        merged["biotope_level_ups"].append(biotope)
+
+    merged["completed_quests"].extend(results.get("quests", {}).get("completed_quests", []))
+    merged["unlocked_achievements"].extend(results.get("achievements", []))
+    merged["unlocked_achievements"].extend(
+        results.get("biotope_achievements", {}).get("newly_unlocked", [])
+    )
+
+    catch_of_day = results.get("catch_of_day")
+    if catch_of_day and catch_of_day.get("matched"):
+        merged["catch_of_day"] = catch_of_day
+
+    bottle = results.get("bottle")
+    if bottle and bottle.get("found_bottle"):
+        merged["bottles"].append(bottle["bottle"])
+
+    if "errors" in results:
+        merged["errors"].append({"fish_id": catch.fish_id, **results["errors"]})
+
+
+# ========== ENDPOINTS ==========
+
+def queue_catch_counters(event: CatchEvent):
+    """Buffer every counter a catch touches; flushed as one bulk_write per collection"""
+    stat_writer.inc("users", event.user_id, {"total_catches": event.count}, key_field="id", upsert=False)
+
+    if event.spot_id:
+        queue_spot_catch(event.user_id, event.spot_id, event.fish_type or event.fish_id, event.count)
+
+    if event.biotope and event.stage and event.rarity:
+        queue_biotope_catch_stats(
+            event.user_id, event.fish_id, event.biotope, event.stage, event.rarity, event.count
+        )
+
+
+@router.post("/events")
+async def ingest_catch_events(batch: CatchEventBatch):
+    """Record stat counters for one or more catches without waiting on Mongo"""
+    for event in batch.events:
+        queue_catch_counters(event)
+
+    return {"success": True, "accepted": len(batch.events)}
+
+
+@router.post("")
+async def record_catch(catch: CatchRecord):
+    """Record one catch across every subsystem in a single request"""
+    return await _record_catches([catch])
+
+
+@router.post("/batch")
+async def record_catch_batch(batch: CatchBatch):
+    """Record a batch of catches, applied in order"""
+    if not batch.catches:
+        raise HTTPException(status_code=400, detail="No catches to record")
+    return await _record_catches(batch.catches)
+
+
+async def _record_catches(catches: List[CatchRecord]) -> Dict[str, Any]:
+    fish_docs = [tacklebox_doc(catch.user_id, catch.model_dump()) for catch in catches]
+    await db.tacklebox.insert_many(fish_docs)
+
+    merged: Dict[str, Any] = {
+        "success": True,
+        "recorded": len(catches),
+        "tacklebox_ids": [doc["id"] for doc in fish_docs],
+        "new_discoveries": [],
+        "biotope_level_ups": [],
+        "completed_quests": [],
+        "unlocked_achievements": [],
+        "catch_of_day": None,
+        "bottles": [],
+        "errors": [],
+    }
+
+    # Catches are applied in order: several handlers read-modify-write the
+    # same per-player document, so only the steps of one catch run concurrently
+    for catch in catches:
+        _merge_results(catch, await _process_catch(catch), merged)
+
+    return merged
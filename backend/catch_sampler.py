@@ -0,0 +1,133 @@
+# ========== GO FISH! CATCH SAMPLER ==========
+# Alias-table sampling of weighted outcomes, one draw per fish in a haul
+
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+import random
+
+try:
+    import numpy as np
+except ImportError:  # optional: pure-Python draws only
+    np = None
+
+# Hauls at least this large are drawn in one vectorized call when NumPy is available
+BATCH_THRESHOLD = 16
+
+Rng = Union[random.Random, "np.random.Generator"]
+
+
+def pool_pick_probabilities(chances: Sequence[float]) -> Tuple[List[float], float]:
+    """Exact outcome odds of "each item joins a pool with chance p, then one is picked uniformly".
+
+    Returns (probability of picking each item, probability the pool is empty).
+    P(item i) = p_i * E[1 / (1 + number of other items in the pool)], where the
+    count of others follows a Poisson-binomial distribution.
+    """
+    chances = [min(1.0, max(0.0, p)) for p in chances]
+    picks = []
+    for i, p_i in enumerate(chances):
+        others = [1.0]  # others[k] = P(exactly k other items joined)
+        for j, p_j in enumerate(chances):
+            if j == i:
+                continue
+            nxt = [0.0] * (len(others) + 1)
+            for k, prob in enumerate(others):
+                nxt[k] += prob * (1 - p_j)
+                nxt[k + 1] += prob * p_j
+            others = nxt
+        picks.append(p_i * sum(prob / (k + 1) for k, prob in enumerate(others)))
+
+    empty = 1.0
+    for p in chances:
+        empty *= 1 - p
+    return picks, empty
+
+
+def make_rng(seed: Optional[int] = None) -> Rng:
+    """A NumPy Generator when available (enables batched draws), else random.Random"""
+    if np is not None:
+        return np.random.default_rng(seed)
+    return random.Random(seed)
+
+
+def randint(rng: Rng, low: int, high: int) -> int:
+    """Inclusive randint for either kind of RNG"""
+    if np is not None and isinstance(rng, np.random.Generator):
+        return int(rng.integers(low, high + 1))
+    return rng.randint(low, high)
+
+
+class AliasTable:
+    """Walker/Vose alias table: O(n) to build, O(1) per draw"""
+
+    def __init__(self, weights: Sequence[float]):
+        total = float(sum(weights))
+        if not weights or total <= 0:
+            raise ValueError("AliasTable needs at least one positive weight")
+        n = len(weights)
+        scaled = [w * n / total for w in weights]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+
+        small = [i for i, w in enumerate(scaled) if w < 1.0]
+        large = [i for i, w in enumerate(scaled) if w >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s], self.alias[s] = scaled[s], l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Leftovers are 1.0 up to rounding error
+
+        self._np_prob = np.asarray(self.prob) if np is not None else None
+        self._np_alias = np.asarray(self.alias) if np is not None else None
+
+    def __len__(self) -> int:
+        return len(self.prob)
+
+    def draw(self, rng: Rng) -> int:
+        i = int(rng.random() * len(self.prob))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+    def draw_many(self, count: int, rng: Optional[Rng] = None) -> List[int]:
+        """`count` outcome indexes, drawn in one vectorized call for large NumPy hauls"""
+        if np is not None and isinstance(rng, np.random.Generator) and count >= BATCH_THRESHOLD:
+            return self.draw_array(count, rng).tolist()
+        rng = rng or random
+        return [self.draw(rng) for _ in range(count)]
+
+    def draw_array(self, count: int, rng: Optional["np.random.Generator"] = None) -> "np.ndarray":
+        if np is None:
+            raise RuntimeError("NumPy is not installed")
+        rng = rng if rng is not None else np.random.default_rng()
+        columns = rng.integers(0, len(self.prob), size=count)
+        return np.where(rng.random(count) < self._np_prob[columns], columns, self._np_alias[columns])
+
+
+class CatchTable:
+    """Alias table over a fixed set of catchable items plus a miss outcome"""
+
+    def __init__(self, items: Sequence[Any], weights: Sequence[float], miss: float = 0.0):
+        self.items = list(items)
+        self.miss_index = len(self.items)
+        self.table = AliasTable([*weights, miss])
+
+    def sample(self, count: int, rng: Optional[Rng] = None) -> List[Any]:
+        """Items caught in `count` draws (misses are dropped)"""
+        if count <= 0:
+            return []
+        return [self.items[i] for i in self.table.draw_many(count, rng) if i != self.miss_index]
+
+
+class CatchSampler:
+    """Builds each CatchTable once per key and reuses it for every haul"""
+
+    def __init__(self):
+        self._tables: Dict[Hashable, CatchTable] = {}
+
+    def table(self, key: Hashable, build) -> CatchTable:
+        table = self._tables.get(key)
+        if table is None:
+            table = self._tables[key] = build()
+        return table
+
+    def __len__(self) -> int:
+        return len(self._tables)
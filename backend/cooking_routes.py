@@ -2,21 +2,23 @@
 # Fish recipes, cooking mechanics, and culinary achievements
 # ~600+ lines of backend code
 
-from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi import APIRouter, HTTPException, Request
+from database import db, register_indexes
+from catalog_cache import CatalogPayload, static_catalog
+from pymongo import IndexModel, ASCENDING
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
 import uuid
-import os
 import random
 
 router = APIRouter(prefix="/api/cooking", tags=["cooking"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("player_kitchen", [
+    IndexModel([("user_id", ASCENDING)]),
+])
 
 
 # ========== COOKING RECIPES ==========
@@ -471,26 +473,33 @@ async def get_player_kitchen(user_id: str) -> dict:
 
 # ========== COOKING ENDPOINTS ==========
 
+RECIPES_CATALOG = CatalogPayload({"recipes": list(RECIPES.values())})
+
+
 @router.get("/recipes")
-async def get_all_recipes(user_id: Optional[str] = None):
+async def get_all_recipes(request: Request, user_id: Optional[str] = None):
     """Get all cooking recipes"""
-    recipes = list(RECIPES.values())
-    
-    if user_id:
-        kitchen = await get_player_kitchen(user_id)
-        user = await db.users.find_one({"id": user_id}, {"_id": 0, "level": 1})
-        user_level = user.get("level", 1) if user else 1
-        
-        for recipe in recipes:
-            recipe["unlocked"] = (
-                recipe["id"] in kitchen.get("unlocked_recipes", []) or
-                user_level >= recipe["unlock_level"]
-            )
+    if not user_id:
+        return RECIPES_CATALOG.respond(request)
+    
+    # Per-player flags go on copies so the shared catalog stays pristine
+    recipes = [dict(recipe) for recipe in RECIPES.values()]
+    
+    kitchen = await get_player_kitchen(user_id)
+    user = await db.users.find_one({"id": user_id}, {"_id": 0, "level": 1})
+    user_level = user.get("level", 1) if user else 1
+    
+    for recipe in recipes:
+        recipe["unlocked"] = (
+            recipe["id"] in kitchen.get("unlocked_recipes", []) or
+            user_level >= recipe["unlock_level"]
+        )
     
     return {"recipes": recipes}
 
 
 @router.get("/ingredients")
+@static_catalog
 async def get_all_ingredients():
     """Get all cooking ingredients"""
     return {"ingredients": COOKING_INGREDIENTS}
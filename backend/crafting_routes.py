@@ -2,21 +2,27 @@
 # Item crafting, recipes, and workshop management
 # ~450+ lines of backend polish
 
-from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi import APIRouter, HTTPException, Request
+from database import db, register_indexes
+from catalog_cache import CatalogPayload, static_catalog
+from pymongo import IndexModel, ASCENDING
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 import uuid
-import os
 import random
 
 router = APIRouter(prefix="/api/crafting", tags=["crafting"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("player_materials", [
+    IndexModel([("user_id", ASCENDING)]),
+])
+
+register_indexes("player_workshop", [
+    IndexModel([("user_id", ASCENDING)]),
+])
 
 
 # ========== CRAFTING RECIPES ==========
@@ -346,35 +352,42 @@ async def get_player_materials(user_id: str) -> dict:
 
 # ========== CRAFTING ENDPOINTS ==========
 
+RECIPES_CATALOG = CatalogPayload({"recipes": CRAFTING_RECIPES})
+
+
 @router.get("/recipes")
-async def get_crafting_recipes(user_id: Optional[str] = None):
+async def get_crafting_recipes(request: Request, user_id: Optional[str] = None):
     """Get all crafting recipes"""
-    recipes = CRAFTING_RECIPES.copy()
+    if not user_id:
+        return RECIPES_CATALOG.respond(request)
     
-    if user_id:
-        user = await db.users.find_one({"id": user_id}, {"_id": 0, "level": 1})
-        workshop = await get_player_workshop(user_id)
-        materials = await get_player_materials(user_id)
-        
-        user_level = user.get("level", 1) if user else 1
-        unlocked = workshop.get("unlocked_recipes", [])
+    # Per-player flags go on copies so the shared catalog stays pristine
+    recipes = [dict(recipe) for recipe in CRAFTING_RECIPES]
+    
+    user = await db.users.find_one({"id": user_id}, {"_id": 0, "level": 1})
+    workshop = await get_player_workshop(user_id)
+    materials = await get_player_materials(user_id)
+    
+    user_level = user.get("level", 1) if user else 1
+    unlocked = workshop.get("unlocked_recipes", [])
+    
+    for recipe in recipes:
+        recipe["unlocked"] = recipe["id"] in unlocked or user_level >= recipe["unlock_level"]
+        recipe["can_craft"] = recipe["unlocked"]
         
-        for recipe in recipes:
-            recipe["unlocked"] = recipe["id"] in unlocked or user_level >= recipe["unlock_level"]
-            recipe["can_craft"] = recipe["unlocked"]
-            
-            # Check if player has enough materials
-            if recipe["can_craft"]:
-                for ingredient in recipe["ingredients"]:
-                    have = materials.get("materials", {}).get(ingredient["item"], 0)
-                    if have < ingredient["quantity"]:
-                        recipe["can_craft"] = False
-                        break
+        # Check if player has enough materials
+        if recipe["can_craft"]:
+            for ingredient in recipe["ingredients"]:
+                have = materials.get("materials", {}).get(ingredient["item"], 0)
+                if have < ingredient["quantity"]:
+                    recipe["can_craft"] = False
+                    break
     
     return {"recipes": recipes}
 
 
 @router.get("/materials")
+@static_catalog
 async def get_materials_info():
     """Get all crafting materials info"""
     return {"materials": CRAFTING_MATERIALS}
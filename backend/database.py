@@ -0,0 +1,173 @@
+# ========== GO FISH! DATABASE PROVIDER ==========
+# One pooled Mongo client per worker, shared by every route module
+
+from fastapi import FastAPI
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import IndexModel
+from pymongo.errors import DuplicateKeyError
+from dotenv import load_dotenv
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+import asyncio
+import logging
+import os
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+
+# ========== POOL SETTINGS ==========
+# All values can be tuned per deployment through the environment.
+
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.environ.get('DB_NAME', 'test_database')
+
+POOL_SETTINGS = {
+    "maxPoolSize": int(os.environ.get('MONGO_MAX_POOL_SIZE', 50)),
+    "minPoolSize": int(os.environ.get('MONGO_MIN_POOL_SIZE', 0)),
+    "maxIdleTimeMS": int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 60000)),
+    "serverSelectionTimeoutMS": int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+    "connectTimeoutMS": int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 10000)),
+    "waitQueueTimeoutMS": int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 10000)),
+}
+
+# Startup ping attempts, with the backoff doubling after each failure
+CONNECT_RETRIES = max(1, int(os.environ.get('MONGO_CONNECT_RETRIES', 5)))
+CONNECT_BACKOFF_SECONDS = float(os.environ.get('MONGO_CONNECT_BACKOFF_SECONDS', 1))
+
+
+# ========== SHARED CLIENT ==========
+# Motor connects lazily, so creating the client at import time opens no
+# sockets until the first query (or the startup ping below).
+
+client = AsyncIOMotorClient(MONGO_URL, **POOL_SETTINGS)
+db = client[DB_NAME]
+
+
+# ========== INDEX REGISTRY ==========
+# Each route module declares the indexes for the collections it owns with
+# register_indexes(); they are created idempotently on startup.
+
+INDEX_REGISTRY: Dict[str, Dict[str, IndexModel]] = {}
+
+
+def register_indexes(collection: str, indexes: List[IndexModel]):
+    """Declare indexes for a collection (re-registering the same name is a no-op)"""
+    registered = INDEX_REGISTRY.setdefault(collection, {})
+    for index in indexes:
+        registered.setdefault(index.document["name"], index)
+
+
+async def ensure_indexes(database: AsyncIOMotorDatabase = None) -> Dict[str, List[str]]:
+    """Create every registered index; existing identical indexes are left untouched"""
+    database = db if database is None else database
+    created = {}
+    for collection, indexes in INDEX_REGISTRY.items():
+        try:
+            created[collection] = await database[collection].create_indexes(list(indexes.values()))
+        except Exception as e:
+            logger.error(f"Index creation failed for {collection}: {e}")
+    logger.info(
+        "Ensured %d indexes across %d collections",
+        sum(len(names) for names in created.values()), len(created)
+    )
+    return created
+
+
+# ========== MIGRATIONS ==========
+# One-off data migrations declared by route modules with register_migration().
+# Each runs once per database on startup, after the indexes, and is recorded
+# in schema_migrations so other workers and later deploys skip it.
+
+MIGRATIONS: Dict[str, Callable[[], Awaitable[Any]]] = {}
+MIGRATION_LEASE = timedelta(seconds=int(os.environ.get('MONGO_MIGRATION_LEASE_SECONDS', 3600)))
+
+_completed_migrations = set()
+
+
+def register_migration(name: str, migration: Callable[[], Awaitable[Any]]):
+    """Declare a migration (re-registering the same name is a no-op)"""
+    MIGRATIONS.setdefault(name, migration)
+
+
+async def migration_done(name: str) -> bool:
+    """Whether a migration has finished; cached once true"""
+    if name in _completed_migrations:
+        return True
+    if await db.schema_migrations.find_one({"_id": name, "status": "done"}, {"_id": 1}):
+        _completed_migrations.add(name)
+        return True
+    return False
+
+
+async def _claim_migration(name: str) -> bool:
+    """Take the migration for this worker; a crashed run is retaken after the lease"""
+    now = datetime.now(timezone.utc)
+    try:
+        await db.schema_migrations.insert_one({"_id": name, "status": "running", "started_at": now})
+        return True
+    except DuplicateKeyError:
+        stale = await db.schema_migrations.find_one_and_update(
+            {"_id": name, "status": "running", "started_at": {"$lt": now - MIGRATION_LEASE}},
+            {"$set": {"started_at": now}}
+        )
+        return stale is not None
+
+
+async def run_migrations() -> List[str]:
+    """Run every registered migration that has not completed yet"""
+    ran = []
+    for name, migration in MIGRATIONS.items():
+        if await migration_done(name) or not await _claim_migration(name):
+            continue
+        try:
+            result = await migration()
+        except Exception as e:
+            logger.error(f"Migration {name} failed: {e}")
+            await db.schema_migrations.delete_one({"_id": name, "status": "running"})
+            continue
+        await db.schema_migrations.update_one(
+            {"_id": name},
+            {"$set": {"status": "done", "finished_at": datetime.now(timezone.utc), "result": result}}
+        )
+        _completed_migrations.add(name)
+        ran.append(name)
+        logger.info("Migration %s done: %s", name, result)
+    return ran
+
+
+# ========== LIFECYCLE ==========
+
+async def connect_db(app: FastAPI):
+    """Attach the shared handle to app state and verify the server is reachable"""
+    app.state.mongo_client = client
+    app.state.db = db
+    for attempt in range(1, CONNECT_RETRIES + 1):
+        try:
+            await client.admin.command("ping")
+            break
+        except Exception as e:
+            if attempt == CONNECT_RETRIES:
+                # Fail startup rather than serve without indexes and migrations
+                logger.error(f"MongoDB ping failed on startup after {attempt} attempts: {e}")
+                raise
+            delay = CONNECT_BACKOFF_SECONDS * 2 ** (attempt - 1)
+            logger.warning(f"MongoDB ping failed on startup (attempt {attempt}), retrying in {delay}s: {e}")
+            await asyncio.sleep(delay)
+    logger.info(
+        "MongoDB connected (db=%s, maxPoolSize=%s)",
+        DB_NAME, POOL_SETTINGS["maxPoolSize"]
+    )
+    if os.environ.get('MONGO_ENSURE_INDEXES', '1') != '0':
+        await ensure_indexes()
+    if os.environ.get('MONGO_RUN_MIGRATIONS', '1') != '0':
+        await run_migrations()
+
+
+async def close_db(app: FastAPI):
+    """Close the shared client and all of its pooled connections"""
+    client.close()
+    logger.info("MongoDB connection pool closed")
@@ -3,19 +3,23 @@
 # ~400+ lines of backend polish
 
 from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import db, register_indexes
+from catalog_cache import static_catalog
+from search_engine import SearchIndex, MAX_RESULTS
+from idempotency import claim_keys, release_keys, MAX_BATCH_SIZE
+from pymongo import IndexModel, ASCENDING
 from datetime import datetime, timezone
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import uuid
-import os
 
 router = APIRouter(prefix="/api/encyclopedia", tags=["encyclopedia"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("fish_collection", [
+    IndexModel([("user_id", ASCENDING)]),
+])
 
 
 # ========== COMPLETE FISH DATABASE ==========
@@ -429,6 +433,27 @@ FISH_DATABASE = {
 }
 
 
+# ========== REQUEST MODELS ==========
+
+class DiscoverCatch(BaseModel):
+    client_id: str  # idempotency key generated by the client
+    fish_id: str
+    size: int = 50
+
+
+class DiscoverBatch(BaseModel):
+    catches: List[DiscoverCatch] = Field(default_factory=list)
+
+
+# ========== SEARCH INDEX ==========
+
+FISH_SEARCH = SearchIndex()
+for _fish in FISH_DATABASE.values():
+    FISH_SEARCH.add("fish", _fish["id"], _fish["name"], _fish,
+                    [_fish["description"], _fish.get("scientific_name", "")])
+FISH_SEARCH.build()
+
+
 # ========== HELPER FUNCTIONS ==========
 
 async def get_player_collection(user_id: str) -> dict:
@@ -449,6 +474,7 @@ async def get_player_collection(user_id: str) -> dict:
 # ========== ENCYCLOPEDIA ENDPOINTS ==========
 
 @router.get("/fish")
+@static_catalog
 async def get_all_fish(rarity: Optional[str] = None, habitat: Optional[str] = None):
     """Get all fish in the encyclopedia"""
     fish = list(FISH_DATABASE.values())
@@ -572,17 +598,77 @@ async def discover_fish(user_id: str, fish_id: str, size: int = 50):
     }
 
 
+@router.post("/discover/{user_id}/batch")
+async def discover_fish_batch(user_id: str, batch: DiscoverBatch):
+    """Record many catches in one write; replayed client_ids are not counted again"""
+    if len(batch.catches) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch limited to {MAX_BATCH_SIZE} catches")
+    unknown = sorted({c.fish_id for c in batch.catches if c.fish_id not in FISH_DATABASE})
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Fish not found: {', '.join(unknown)}")
+    
+    # A client_id repeated within the batch is still one catch
+    unique = list({c.client_id: c for c in reversed(batch.catches)}.values())[::-1]
+    scope = f"discover:{user_id}"
+    fresh = await claim_keys(scope, (c.client_id for c in unique))
+    catches = [c for c in unique if c.client_id in fresh]
+    if not catches:
+        return {"success": True, "recorded": 0, "new_discoveries": []}
+    
+    now = datetime.now(timezone.utc).isoformat()
+    
+    # $inc/$max/$min merge with concurrent writers instead of overwriting them
+    inc, largest, smallest = {}, {}, {}
+    for c in catches:
+        path = f"fish_stats.{c.fish_id}"
+        inc[f"{path}.caught"] = inc.get(f"{path}.caught", 0) + 1
+        largest[f"{path}.largest"] = max(c.size, largest.get(f"{path}.largest", c.size))
+        smallest[f"{path}.smallest"] = min(c.size, smallest.get(f"{path}.smallest", c.size))
+    
+    try:
+        existing = await db.fish_collection.find_one(
+            {"user_id": user_id}, {"_id": 0, "discovered_fish": 1}
+        )
+        already_discovered = set((existing or {}).get("discovered_fish", []))
+        new_ids = list(dict.fromkeys(c.fish_id for c in catches if c.fish_id not in already_discovered))
+        first_caught = {f"fish_stats.{fish_id}.first_caught": now for fish_id in new_ids}
+        
+        await db.fish_collection.update_one(
+            {"user_id": user_id},
+            {
+                "$addToSet": {"discovered_fish": {"$each": new_ids}},
+                "$inc": inc,
+                "$max": largest,
+                "$min": {**smallest, **first_caught},
+            },
+            upsert=True
+        )
+    except Exception:
+        # Nothing was recorded: let the client's retry through
+        await release_keys(scope, fresh)
+        raise
+    
+    return {
+        "success": True,
+        "recorded": len(catches),
+        "duplicates": len(batch.catches) - len(catches),
+        "new_discoveries": [FISH_DATABASE[fish_id] for fish_id in new_ids],
+    }
+
+
 @router.get("/habitats")
+@static_catalog
 async def get_habitats():
     """Get all fishing habitats"""
     habitats = set()
     for fish in FISH_DATABASE.values():
         habitats.update(fish["habitat"])
     
-    return {"habitats": list(habitats)}
+    return {"habitats": sorted(habitats)}
 
 
 @router.get("/rarities")
+@static_catalog
 async def get_rarities():
     """Get all rarity levels with counts"""
     rarities = {}
@@ -597,18 +683,10 @@ async def get_rarities():
 
 
 @router.get("/search")
-async def search_fish(query: str):
-    """Search fish by name or description"""
-    query = query.lower()
-    results = []
-    
-    for fish in FISH_DATABASE.values():
-        if (query in fish["name"].lower() or 
-            query in fish["description"].lower() or
-            query in fish.get("scientific_name", "").lower()):
-            results.append(fish)
-    
-    return {"results": results, "count": len(results)}
+async def search_fish(query: str, limit: int = 50):
+    """Search fish by name or description (ranked, typo tolerant)"""
+    hits, total = FISH_SEARCH.search(query, limit=max(1, min(limit, MAX_RESULTS)))
+    return {"results": [hit.doc.data for hit in hits], "count": total}
 
 
 @router.get("/stats/{user_id}")
@@ -3,20 +3,22 @@
 # ~400+ lines of backend polish
 
 from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import db, register_indexes
+from catalog_cache import static_catalog
+from pymongo import IndexModel, ReturnDocument, ASCENDING
 from datetime import datetime, timezone, timedelta
 from typing import Optional, Dict, Any
 from pydantic import BaseModel, Field
 import uuid
-import os
 import math
 
 router = APIRouter(prefix="/api/energy", tags=["energy"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("player_energy", [
+    IndexModel([("user_id", ASCENDING)]),
+])
 
 
 # ========== ENERGY CONFIGURATION ==========
@@ -29,6 +31,7 @@ ENERGY_CONFIG = {
     "level_bonus_per_10_levels": 10,
     "vip_bonus_multiplier": 1.5,
     "energy_per_ad": 10,
+    "max_ads_per_day": 10,
     "energy_per_gem": 5,
     "gem_cost_per_refill": 50,
 }
@@ -97,100 +100,192 @@ class ActivateBoosterRequest(BaseModel):
     booster_id: str
 
 
-# ========== HELPER FUNCTIONS ==========
+# ========== ENERGY MODEL ==========
+# A stored record is a checkpoint: (current_energy at last_updated, max_energy,
+# boost/infinite expiry times). Energy at any moment is a pure function of it,
+# so reads never write; every change is one conditional find_one_and_update
+# whose update pipeline applies regen and the change together. current_energy
+# is stored unrounded so partial regen survives each checkpoint.
+
+def _as_datetime(value) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _iso(value) -> Optional[str]:
+    value = _as_datetime(value)
+    return value.isoformat() if value else None
+
+
+def compute_energy(record: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Energy state at `now` derived from a stored checkpoint (no writes)"""
+    now = now or datetime.now(timezone.utc)
+    max_energy = record.get("max_energy") or ENERGY_CONFIG["max_energy"]
+    stored = record.get("current_energy")
+    stored = max_energy if stored is None else stored
+    last = _as_datetime(record.get("last_updated")) or now
+    regen_until = _as_datetime(record.get("regen_multiplier_until"))
+    infinite_until = _as_datetime(record.get("infinite_until"))
+    boost = record.get("regen_multiplier") or 1.0
+
+    minutes = max(0.0, (now - last).total_seconds() / 60)
+    if regen_until and regen_until > last:
+        minutes += max(0.0, (min(now, regen_until) - last).total_seconds() / 60) * (boost - 1)
+    # Regen stops at max but never trims energy granted above it
+    exact = max(stored, min(max_energy, stored + ENERGY_CONFIG["regen_rate_per_minute"] * minutes))
+
+    is_infinite = bool(infinite_until and infinite_until > now)
+    multiplier = boost if regen_until and regen_until > now else 1.0
+    current = max_energy if is_infinite else math.floor(exact)
+    if current < max_energy:
+        minutes_to_full = math.ceil((max_energy - exact) / (ENERGY_CONFIG["regen_rate_per_minute"] * multiplier))
+    else:
+        minutes_to_full = 0
+
+    return {
+        **record,
+        "user_id": record.get("user_id"),
+        "current_energy": current,
+        "max_energy": max_energy,
+        "last_updated": last.isoformat(),
+        "is_infinite": is_infinite,
+        "infinite_until": _iso(infinite_until) if is_infinite else None,
+        "regen_multiplier": multiplier,
+        "regen_multiplier_until": _iso(regen_until) if multiplier != 1.0 else None,
+        "minutes_to_full": minutes_to_full,
+    }
+
+
+def _energy_expr(now: datetime) -> Dict[str, Any]:
+    """Aggregation twin of compute_energy's unrounded energy"""
+    max_energy = ENERGY_CONFIG["max_energy"]
+    return {"$let": {
+        "vars": {
+            "stored": {"$ifNull": ["$current_energy", {"$ifNull": ["$max_energy", max_energy]}]},
+            "cap": {"$ifNull": ["$max_energy", max_energy]},
+            "last": {"$ifNull": [{"$toDate": "$last_updated"}, now]},
+            "until": {"$toDate": "$regen_multiplier_until"},
+        },
+        "in": {"$let": {
+            "vars": {
+                "minutes": {"$add": [
+                    {"$max": [0, {"$divide": [{"$subtract": [now, "$$last"]}, 60000]}]},
+                    {"$multiply": [
+                        {"$max": [0, {"$divide": [
+                            {"$subtract": [{"$min": [now, {"$ifNull": ["$$until", "$$last"]}]}, "$$last"]}, 60000
+                        ]}]},
+                        {"$subtract": [{"$ifNull": ["$regen_multiplier", 1.0]}, 1]},
+                    ]},
+                ]},
+            },
+            "in": {"$max": ["$$stored", {"$min": [
+                "$$cap",
+                {"$add": ["$$stored", {"$multiply": [ENERGY_CONFIG["regen_rate_per_minute"], "$$minutes"]}]},
+            ]}]},
+        }},
+    }}
+
+
+def _infinite_expr(now: datetime) -> Dict[str, Any]:
+    return {"$gt": [{"$ifNull": [{"$toDate": "$infinite_until"}, now]}, now]}
 
-async def get_player_energy(user_id: str) -> dict:
-    """Get or create player energy record with regeneration"""
+
+def _counter(field: str, amount: Any) -> Dict[str, Any]:
+    return {"$add": [{"$ifNull": [f"${field}", 0]}, amount]}
+
+
+async def get_player_energy(user_id: str, now: Optional[datetime] = None) -> dict:
+    """Current energy for a player; a player without a record is at full energy"""
     energy_record = await db.player_energy.find_one({"user_id": user_id}, {"_id": 0})
-    
-    if not energy_record:
-        # Initialize new energy record
-        energy_record = {
-            "user_id": user_id,
-            "current_energy": ENERGY_CONFIG["max_energy"],
-            "max_energy": ENERGY_CONFIG["max_energy"],
-            "last_updated": datetime.now(timezone.utc).isoformat(),
-            "active_boosters": [],
-            "infinite_until": None,
-            "regen_multiplier": 1.0,
-            "regen_multiplier_until": None,
-            "total_energy_spent": 0,
-            "total_energy_restored": 0,
-            "ads_watched_today": 0,
-            "last_ad_watch": None,
-        }
-        await db.player_energy.insert_one(energy_record)
-        return energy_record
-    
-    # Calculate regenerated energy since last update
-    now = datetime.now(timezone.utc)
-    last_update = datetime.fromisoformat(energy_record["last_updated"])
-    time_diff = now - last_update
-    minutes_passed = time_diff.total_seconds() / 60
-    
-    # Check for active regen booster
-    regen_multiplier = 1.0
-    if energy_record.get("regen_multiplier_until"):
-        regen_until = datetime.fromisoformat(energy_record["regen_multiplier_until"])
-        if regen_until > now:
-            regen_multiplier = energy_record.get("regen_multiplier", 1.0)
-        else:
-            # Expired, reset
-            await db.player_energy.update_one(
-                {"user_id": user_id},
-                {"$set": {"regen_multiplier": 1.0, "regen_multiplier_until": None}}
-            )
-    
-    # Calculate energy to regenerate
-    regen_rate = ENERGY_CONFIG["regen_rate_per_minute"] * regen_multiplier
-    energy_to_add = int(minutes_passed * regen_rate)
-    
-    # Check for infinite energy mode
-    if energy_record.get("infinite_until"):
-        infinite_until = datetime.fromisoformat(energy_record["infinite_until"])
-        if infinite_until > now:
-            energy_record["current_energy"] = energy_record["max_energy"]
-            energy_record["is_infinite"] = True
-        else:
-            # Expired
-            await db.player_energy.update_one(
-                {"user_id": user_id},
-                {"$set": {"infinite_until": None}}
-            )
-            energy_record["is_infinite"] = False
-    else:
-        energy_record["is_infinite"] = False
-    
-    if energy_to_add > 0 and not energy_record.get("is_infinite"):
-        new_energy = min(
-            energy_record["current_energy"] + energy_to_add,
-            energy_record["max_energy"]
+    return compute_energy(energy_record or {"user_id": user_id}, now)
+
+
+async def spend_energy(user_id: str, amount: int, now: datetime) -> Optional[dict]:
+    """Atomically regen and deduct `amount`; None when there is not enough energy"""
+    energy, infinite = _energy_expr(now), _infinite_expr(now)
+    for _ in range(2):
+        record = await db.player_energy.find_one_and_update(
+            {"user_id": user_id, "$expr": {"$or": [infinite, {"$gte": [energy, amount]}]}},
+            [{"$set": {
+                "current_energy": {"$cond": [infinite, "$current_energy", {"$subtract": [energy, amount]}]},
+                "last_updated": {"$cond": [infinite, "$last_updated", now]},
+                "total_energy_spent": _counter("total_energy_spent", {"$cond": [infinite, 0, amount]}),
+            }}],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
         )
-        
-        if new_energy != energy_record["current_energy"]:
-            energy_record["current_energy"] = new_energy
-            energy_record["last_updated"] = now.isoformat()
-            
-            await db.player_energy.update_one(
-                {"user_id": user_id},
-                {
-                    "$set": {
-                        "current_energy": new_energy,
-                        "last_updated": now.isoformat()
-                    }
-                }
-            )
-    
-    # Calculate time to full energy
-    if energy_record["current_energy"] < energy_record["max_energy"]:
-        energy_needed = energy_record["max_energy"] - energy_record["current_energy"]
-        minutes_to_full = math.ceil(energy_needed / (ENERGY_CONFIG["regen_rate_per_minute"] * regen_multiplier))
-        energy_record["minutes_to_full"] = minutes_to_full
-    else:
-        energy_record["minutes_to_full"] = 0
-    
-    return energy_record
+        if record is not None:
+            return compute_energy(record, now)
+        # No match: either not enough energy, or no record yet (create it at full energy)
+        created = await db.player_energy.update_one(
+            {"user_id": user_id},
+            {"$setOnInsert": {"current_energy": ENERGY_CONFIG["max_energy"], "last_updated": now}},
+            upsert=True
+        )
+        if created.upserted_id is None:
+            return None
+    return None
+
+
+async def add_energy(user_id: str, amount: float, now: datetime, restored: Optional[int] = None,
+                     set_fields: Optional[Dict[str, Any]] = None, inc_fields: Optional[Dict[str, int]] = None,
+                     computed_fields: Optional[Dict[str, Any]] = None,
+                     condition: Optional[Dict[str, Any]] = None) -> Optional[dict]:
+    """Atomically regen, add `amount` (capped at max) and apply extra field changes.
+
+    `computed_fields` are aggregation expressions over the stored record. With
+    a `condition` (also an expression) nothing is written unless it holds,
+    and None is returned.
+    """
+    energy = _energy_expr(now)
+    stage = {
+        "current_energy": {"$max": [energy, {"$min": [{"$ifNull": ["$max_energy", ENERGY_CONFIG["max_energy"]]}, {"$add": [energy, amount]}]}]},
+        "last_updated": now,
+        "total_energy_restored": _counter("total_energy_restored", amount if restored is None else restored),
+    }
+    for field, value in (set_fields or {}).items():
+        stage[field] = {"$literal": value}
+    for field, value in (inc_fields or {}).items():
+        stage[field] = _counter(field, value)
+    stage.update(computed_fields or {})
+    if condition is None:
+        record = await db.player_energy.find_one_and_update(
+            {"user_id": user_id}, [{"$set": stage}],
+            projection={"_id": 0}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        return compute_energy(record, now)
 
+    for _ in range(2):
+        record = await db.player_energy.find_one_and_update(
+            {"user_id": user_id, "$expr": condition}, [{"$set": stage}],
+            projection={"_id": 0}, return_document=ReturnDocument.AFTER
+        )
+        if record is not None:
+            return compute_energy(record, now)
+        # No match: either the condition fails, or no record yet (create it at full energy)
+        created = await db.player_energy.update_one(
+            {"user_id": user_id},
+            {"$setOnInsert": {"current_energy": ENERGY_CONFIG["max_energy"], "last_updated": now}},
+            upsert=True
+        )
+        if created.upserted_id is None:
+            return None
+    return None
+
+
+def _ads_today_expr(today: str) -> Dict[str, Any]:
+    """Ads watched on `today`; the stored count belongs to the day of last_ad_watch"""
+    return {"$cond": [
+        {"$eq": [{"$substrCP": [{"$ifNull": ["$last_ad_watch", ""]}, 0, 10]}, today]},
+        {"$ifNull": ["$ads_watched_today", 0]},
+        0
+    ]}
+
+
+# ========== HELPER FUNCTIONS ==========
 
 async def get_max_energy_for_user(user_id: str) -> int:
     """Calculate max energy based on level and VIP status"""
@@ -216,16 +311,17 @@ async def get_max_energy_for_user(user_id: str) -> int:
 @router.get("/{user_id}")
 async def get_energy(user_id: str):
     """Get current energy status"""
-    energy = await get_player_energy(user_id)
+    record = await db.player_energy.find_one({"user_id": user_id}, {"_id": 0}) or {"user_id": user_id}
     
-    # Update max energy based on user stats
+    # Update max energy based on user stats (only written when it changes)
     max_energy = await get_max_energy_for_user(user_id)
-    if max_energy != energy.get("max_energy"):
+    if max_energy != record.get("max_energy", ENERGY_CONFIG["max_energy"]):
         await db.player_energy.update_one(
             {"user_id": user_id},
             {"$set": {"max_energy": max_energy}}
         )
-        energy["max_energy"] = max_energy
+        record["max_energy"] = max_energy
+    energy = compute_energy(record)
     
     return {
         "current": energy["current_energy"],
@@ -242,7 +338,17 @@ async def get_energy(user_id: str):
 @router.post("/use")
 async def use_energy(request: UseEnergyRequest):
     """Consume energy for an action"""
-    energy = await get_player_energy(request.user_id)
+    if request.amount < 0:
+        raise HTTPException(status_code=400, detail="Amount must be positive")
+    now = datetime.now(timezone.utc)
+    energy = await spend_energy(request.user_id, request.amount, now)
+    
+    if energy is None:
+        energy = await get_player_energy(request.user_id, now)
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Not enough energy. Have: {energy['current_energy']}, Need: {request.amount}"
+        )
     
     # Check for infinite energy
     if energy.get("is_infinite"):
@@ -253,31 +359,10 @@ async def use_energy(request: UseEnergyRequest):
             "is_infinite": True
         }
     
-    # Check if enough energy
-    if energy["current_energy"] < request.amount:
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Not enough energy. Have: {energy['current_energy']}, Need: {request.amount}"
-        )
-    
-    # Deduct energy
-    new_energy = energy["current_energy"] - request.amount
-    
-    await db.player_energy.update_one(
-        {"user_id": request.user_id},
-        {
-            "$set": {
-                "current_energy": new_energy,
-                "last_updated": datetime.now(timezone.utc).isoformat()
-            },
-            "$inc": {"total_energy_spent": request.amount}
-        }
-    )
-    
     return {
         "success": True,
         "energy_used": request.amount,
-        "current_energy": new_energy,
+        "current_energy": energy["current_energy"],
         "action": request.action
     }
 
@@ -285,77 +370,48 @@ async def use_energy(request: UseEnergyRequest):
 @router.post("/restore")
 async def restore_energy(request: RestoreEnergyRequest):
     """Restore energy via various methods"""
-    energy = await get_player_energy(request.user_id)
     now = datetime.now(timezone.utc)
     
     if request.method == "ad":
-        # Check daily ad limit
-        today = now.strftime("%Y-%m-%d")
-        if energy.get("last_ad_watch") and energy["last_ad_watch"].startswith(today):
-            if energy.get("ads_watched_today", 0) >= 10:
-                raise HTTPException(status_code=400, detail="Daily ad limit reached")
-        else:
-            # New day, reset counter
-            energy["ads_watched_today"] = 0
-        
-        # Add energy from ad
+        # Daily ad limit is checked and counted in the same write
+        ads_today = _ads_today_expr(now.strftime("%Y-%m-%d"))
         energy_to_add = ENERGY_CONFIG["energy_per_ad"]
-        new_energy = min(energy["current_energy"] + energy_to_add, energy["max_energy"])
-        
-        await db.player_energy.update_one(
-            {"user_id": request.user_id},
-            {
-                "$set": {
-                    "current_energy": new_energy,
-                    "last_ad_watch": now.isoformat(),
-                    "last_updated": now.isoformat()
-                },
-                "$inc": {
-                    "ads_watched_today": 1,
-                    "total_energy_restored": energy_to_add
-                }
-            }
+        energy = await add_energy(
+            request.user_id, energy_to_add, now,
+            set_fields={"last_ad_watch": now.isoformat()},
+            computed_fields={"ads_watched_today": {"$add": [ads_today, 1]}},
+            condition={"$lt": [ads_today, ENERGY_CONFIG["max_ads_per_day"]]}
         )
+        if energy is None:
+            raise HTTPException(status_code=400, detail="Daily ad limit reached")
         
         return {
             "success": True,
             "method": "ad",
             "energy_restored": energy_to_add,
-            "current_energy": new_energy,
-            "ads_remaining": 10 - (energy.get("ads_watched_today", 0) + 1)
+            "current_energy": energy["current_energy"],
+            "ads_remaining": ENERGY_CONFIG["max_ads_per_day"] - energy["ads_watched_today"]
         }
     
     elif request.method == "gems":
-        # Check user gems
-        user = await db.users.find_one({"id": request.user_id}, {"_id": 0, "gems": 1})
-        gems = user.get("gems", 0) if user else 0
-        
-        if gems < ENERGY_CONFIG["gem_cost_per_refill"]:
-            raise HTTPException(status_code=400, detail="Not enough gems")
-        
-        # Deduct gems and refill energy
-        await db.users.update_one(
-            {"id": request.user_id},
+        # Deduct gems only if the player has enough
+        result = await db.users.update_one(
+            {"id": request.user_id, "gems": {"$gte": ENERGY_CONFIG["gem_cost_per_refill"]}},
             {"$inc": {"gems": -ENERGY_CONFIG["gem_cost_per_refill"]}}
         )
+        if not result.modified_count:
+            raise HTTPException(status_code=400, detail="Not enough gems")
         
-        await db.player_energy.update_one(
-            {"user_id": request.user_id},
-            {
-                "$set": {
-                    "current_energy": energy["max_energy"],
-                    "last_updated": now.isoformat()
-                },
-                "$inc": {"total_energy_restored": energy["max_energy"] - energy["current_energy"]}
-            }
-        )
+        before = await get_player_energy(request.user_id, now)
+        restored = max(0, before["max_energy"] - before["current_energy"])
+        energy = await add_energy(request.user_id, before["max_energy"], now, restored=restored)
         
         return {
             "success": True,
             "method": "gems",
             "gems_spent": ENERGY_CONFIG["gem_cost_per_refill"],
-            "current_energy": energy["max_energy"],
-            "energy_restored": energy["max_energy"] - energy["current_energy"]
+            "current_energy": energy["current_energy"],
+            "energy_restored": restored
         }
     
     elif request.method == "booster":
@@ -366,41 +422,28 @@ async def restore_energy(request: RestoreEnergyRequest):
         if not booster:
             raise HTTPException(status_code=404, detail="Booster not found")
         
-        # Check if user has this booster in inventory
-        inventory = await db.player_inventory.find_one({"user_id": request.user_id}, {"_id": 0})
-        booster_count = inventory.get("boosters", {}).get(request.booster_id, 0) if inventory else 0
-        
-        if booster_count <= 0:
+        # Use booster (only if the player has one)
+        result = await db.player_inventory.update_one(
+            {"user_id": request.user_id, f"boosters.{request.booster_id}": {"$gt": 0}},
+            {"$inc": {f"boosters.{request.booster_id}": -1}}
+        )
+        if not result.modified_count:
             raise HTTPException(status_code=400, detail="You don't have this booster")
         
-        # Use booster
-        update_ops = {"$inc": {f"boosters.{request.booster_id}": -1}}
-        await db.player_inventory.update_one({"user_id": request.user_id}, update_ops)
-        
         # Apply booster effect
         if booster.get("energy_restore"):
-            new_energy = min(energy["current_energy"] + booster["energy_restore"], energy["max_energy"])
-            await db.player_energy.update_one(
-                {"user_id": request.user_id},
-                {
-                    "$set": {"current_energy": new_energy, "last_updated": now.isoformat()},
-                    "$inc": {"total_energy_restored": booster["energy_restore"]}
-                }
-            )
+            energy = await add_energy(request.user_id, booster["energy_restore"], now)
             return {
                 "success": True,
                 "method": "booster",
                 "booster": booster["name"],
                 "energy_restored": booster["energy_restore"],
-                "current_energy": new_energy
+                "current_energy": energy["current_energy"]
             }
         
         elif booster.get("infinite_duration_minutes"):
             infinite_until = now + timedelta(minutes=booster["infinite_duration_minutes"])
-            await db.player_energy.update_one(
-                {"user_id": request.user_id},
-                {"$set": {"infinite_until": infinite_until.isoformat()}}
-            )
+            await add_energy(request.user_id, 0, now, restored=0, set_fields={"infinite_until": infinite_until})
             return {
                 "success": True,
                 "method": "booster",
@@ -410,16 +453,12 @@ async def restore_energy(request: RestoreEnergyRequest):
             }
         
         elif booster.get("regen_multiplier"):
+            # Checkpoint first so regen earned before activation is not boosted
             regen_until = now + timedelta(minutes=booster["duration_minutes"])
-            await db.player_energy.update_one(
-                {"user_id": request.user_id},
-                {
-                    "$set": {
-                        "regen_multiplier": booster["regen_multiplier"],
-                        "regen_multiplier_until": regen_until.isoformat()
-                    }
-                }
-            )
+            await add_energy(request.user_id, 0, now, restored=0, set_fields={
+                "regen_multiplier": booster["regen_multiplier"],
+                "regen_multiplier_until": regen_until
+            })
             return {
                 "success": True,
                 "method": "booster",
@@ -432,6 +471,7 @@ async def restore_energy(request: RestoreEnergyRequest):
 
 
 @router.get("/boosters/available")
+@static_catalog
 async def get_available_boosters():
     """Get list of all energy boosters"""
     return {"boosters": list(ENERGY_BOOSTERS.values())}
@@ -483,29 +523,16 @@ async def purchase_booster(user_id: str, booster_id: str, quantity: int = 1):
 @router.post("/perfect-catch-refund/{user_id}")
 async def perfect_catch_energy_refund(user_id: str):
     """Refund energy for a perfect catch"""
-    energy = await get_player_energy(user_id)
+    refund = ENERGY_CONFIG["perfect_catch_refund"]
+    energy = await add_energy(user_id, refund, datetime.now(timezone.utc))
     
     if energy.get("is_infinite"):
         return {"success": True, "refunded": 0, "current_energy": energy["max_energy"]}
     
-    refund = ENERGY_CONFIG["perfect_catch_refund"]
-    new_energy = min(energy["current_energy"] + refund, energy["max_energy"])
-    
-    await db.player_energy.update_one(
-        {"user_id": user_id},
-        {
-            "$set": {
-                "current_energy": new_energy,
-                "last_updated": datetime.now(timezone.utc).isoformat()
-            },
-            "$inc": {"total_energy_restored": refund}
-        }
-    )
-    
     return {
         "success": True,
         "refunded": refund,
-        "current_energy": new_energy
+        "current_energy": energy["current_energy"]
     }
 
 
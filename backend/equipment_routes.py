@@ -3,19 +3,21 @@
 # ~700+ lines of backend code
 
 from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import db, register_indexes
+from catalog_cache import static_catalog
+from pymongo import IndexModel, ASCENDING
 from datetime import datetime, timezone
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
 import uuid
-import os
 
 router = APIRouter(prefix="/api/equipment", tags=["equipment"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("player_equipment", [
+    IndexModel([("user_id", ASCENDING)]),
+])
 
 
 # ========== FISHING RODS BY BIOTOPE ==========
@@ -716,6 +718,7 @@ def calculate_equipment_bonuses(rod_id: str, line_id: str, bobber_id: str, bioto
 # ========== EQUIPMENT ENDPOINTS ==========
 
 @router.get("/rods")
+@static_catalog
 async def get_all_rods(biotope: Optional[str] = None):
     """Get all fishing rods"""
     rods = list(FISHING_RODS.values())
@@ -725,6 +728,7 @@ async def get_all_rods(biotope: Optional[str] = None):
 
 
 @router.get("/lines")
+@static_catalog
 async def get_all_lines(biotope: Optional[str] = None):
     """Get all fishing lines"""
     lines = list(FISHING_LINES.values())
@@ -734,6 +738,7 @@ async def get_all_lines(biotope: Optional[str] = None):
 
 
 @router.get("/bobbers")
+@static_catalog
 async def get_all_bobbers(biotope: Optional[str] = None):
     """Get all bobbers"""
     bobbers = list(BOBBERS.values())
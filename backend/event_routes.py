@@ -3,20 +3,29 @@
 # ~450+ lines of backend polish
 
 from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import db, register_indexes
+from leaderboard_engine import leaderboards
+from user_profiles import attach_usernames
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 import uuid
-import os
 import random
 
 router = APIRouter(prefix="/api/events", tags=["events"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("active_events", [
+    IndexModel([("id", ASCENDING)]),
+    IndexModel([("end_time", ASCENDING)]),
+])
+
+register_indexes("player_event_progress", [
+    IndexModel([("user_id", ASCENDING), ("event_id", ASCENDING)]),
+    IndexModel([("event_id", ASCENDING), ("points", DESCENDING)]),
+])
 
 
 # ========== EVENT DEFINITIONS ==========
@@ -319,6 +328,7 @@ async def join_event(request: JoinEventRequest):
     }
     
     await db.player_event_progress.insert_one(progress)
+    leaderboards.record("event", request.event_id, request.user_id, 0)
     
     return {"success": True, "event": event_data, "progress": progress}
 
@@ -416,6 +426,7 @@ async def update_event_progress(request: UpdateEventProgressRequest):
         },
         upsert=True
     )
+    leaderboards.record("event", request.event_id, request.user_id, new_points)
     
     return {
         "success": True,
@@ -556,19 +567,23 @@ async def purchase_event_item(request: PurchaseEventItemRequest):
     return {"success": True, "item": item}
 
 
+async def load_event_board(event_id: str):
+    """Stream an event's participants into its ranked board"""
+    cursor = db.player_event_progress.find({"event_id": event_id}, {"_id": 0, "user_id": 1, "points": 1})
+    async for entry in cursor:
+        yield entry["user_id"], entry.get("points", 0), None
+
+leaderboards.register("event", load_event_board)
+
+
 @router.get("/leaderboard/{event_id}")
 async def get_event_leaderboard(event_id: str, limit: int = 100):
     """Get event leaderboard"""
-    entries = await db.player_event_progress.find(
-        {"event_id": event_id},
-        {"_id": 0, "user_id": 1, "points": 1}
-    ).sort("points", -1).limit(limit).to_list(limit)
+    board = await leaderboards.board("event", event_id)
+    entries = [{"user_id": e.member, "points": e.score, "rank": e.rank} for e in board.top(limit)]
     
     # Enrich with usernames
-    for i, entry in enumerate(entries):
-        entry["rank"] = i + 1
-        user = await db.users.find_one({"id": entry["user_id"]}, {"_id": 0, "username": 1})
-        entry["username"] = user.get("username", "Unknown") if user else "Unknown"
+    await attach_usernames(entries)
     
     return {"leaderboard": entries}
 
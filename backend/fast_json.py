@@ -0,0 +1,50 @@
+# ========== GO FISH! FAST JSON RESPONSES ==========
+# orjson-backed encoding with native datetime/ObjectId support
+
+from bson import ObjectId
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+from typing import Any
+import json
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback, same output shape
+    orjson = None
+
+
+def _default(value: Any):
+    """Types orjson does not encode natively"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if orjson is None and hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=_OPTIONS)
+else:
+    def dumps(content: Any) -> bytes:
+        return json.dumps(
+            content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class for the app.
+
+    Returning one directly from a route (`return FastJSONResponse(docs)`)
+    also skips FastAPI's jsonable_encoder pass, which matters for large
+    lists of Mongo documents.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
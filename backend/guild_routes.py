@@ -2,19 +2,48 @@
 # Social guild system with challenges, contributions, and perks
 
 from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import db, register_indexes
+from leaderboard_engine import leaderboards
+from pagination import paginate
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 import uuid
-import os
 
 router = APIRouter(prefix="/api/guilds", tags=["guilds"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("guilds", [
+    IndexModel([("id", ASCENDING)]),
+    IndexModel([("name", ASCENDING)]),
+    IndexModel([("tag", ASCENDING)]),
+    IndexModel([("leader_id", ASCENDING)]),
+    IndexModel([("settings.is_public", ASCENDING), ("level", DESCENDING)]),
+    IndexModel([("level", DESCENDING), ("experience", DESCENDING)]),
+])
+
+register_indexes("guild_members", [
+    IndexModel([("guild_id", ASCENDING), ("user_id", ASCENDING)]),
+    IndexModel([("user_id", ASCENDING)]),
+    IndexModel([("guild_id", ASCENDING), ("contribution_points", DESCENDING)]),
+])
+
+register_indexes("guild_applications", [
+    IndexModel([("id", ASCENDING)]),
+    IndexModel([("guild_id", ASCENDING), ("status", ASCENDING)]),
+    IndexModel([("guild_id", ASCENDING), ("user_id", ASCENDING), ("status", ASCENDING)]),
+])
+
+register_indexes("guild_challenges", [
+    IndexModel([("id", ASCENDING)]),
+    IndexModel([("status", ASCENDING)]),
+])
+
+register_indexes("chat_messages", [
+    IndexModel([("channel", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+])
 
 
 # ========== REQUEST/RESPONSE MODELS ==========
@@ -150,6 +179,7 @@ async def create_guild(request: CreateGuildRequest):
     }
     
     await db.guilds.insert_one(guild)
+    leaderboards.record("guilds", "global", guild["id"], (1, 0), _guild_row(guild))
     await db.guild_members.insert_one(leader_member)
     
     return {"success": True, "guild": {k: v for k, v in guild.items() if k != "_id"}}
@@ -510,6 +540,10 @@ async def contribute_to_guild(guild_id: str, request: ContributeRequest):
                 "$inc": {"experience": -xp_for_next_level}
             }
         )
+        guild["level"] = new_level
+        guild["experience"] -= xp_for_next_level
+    
+    leaderboards.record("guilds", "global", guild_id, (guild["level"], guild["experience"]), _guild_row(guild))
     
     return {"success": True, "contribution_points": contribution_points}
 
@@ -703,32 +737,42 @@ async def send_guild_chat(guild_id: str, request: GuildChatRequest):
 
 
 @router.get("/{guild_id}/chat")
-async def get_guild_chat(guild_id: str, limit: int = 50, before: str = None):
-    """Get guild chat messages"""
+async def get_guild_chat(guild_id: str, limit: int = 50, before: str = None, cursor: Optional[str] = None):
+    """Get guild chat messages; pass `next_cursor` back to load older ones"""
     query = {"channel": f"guild_{guild_id}"}
     if before:
         query["created_at"] = {"$lt": before}
     
-    messages = await db.chat_messages.find(
-        query,
-        {"_id": 0}
-    ).sort("created_at", -1).limit(limit).to_list(limit)
+    messages, next_cursor = await paginate(
+        db.chat_messages, query, "created_at", limit=limit, cursor=cursor
+    )
     
-    return {"messages": list(reversed(messages))}
+    return {"messages": list(reversed(messages)), "next_cursor": next_cursor}
 
 
 # ========== GUILD LEADERBOARD ==========
 
+GUILD_ROW_FIELDS = ("id", "name", "tag", "icon", "level", "experience", "member_count", "total_fish_caught")
+
+
+def _guild_row(guild: dict) -> dict:
+    return {k: guild[k] for k in GUILD_ROW_FIELDS if k in guild}
+
+
+async def load_guild_board(board_id: str):
+    """Warm-load every guild ranked by level, then experience"""
+    cursor = db.guilds.find({}, {"_id": 0, **{k: 1 for k in GUILD_ROW_FIELDS}})
+    async for guild in cursor:
+        yield guild["id"], (guild.get("level", 1), guild.get("experience", 0)), guild
+
+leaderboards.register("guilds", load_guild_board)
+
+
 @router.get("/leaderboard")
 async def get_guild_leaderboard(limit: int = 100):
     """Get top guilds by level and XP"""
-    guilds = await db.guilds.find(
-        {},
-        {"_id": 0, "id": 1, "name": 1, "tag": 1, "icon": 1, "level": 1, "experience": 1, "member_count": 1, "total_fish_caught": 1}
-    ).sort([("level", -1), ("experience", -1)]).limit(limit).to_list(limit)
-    
-    for i, guild in enumerate(guilds):
-        guild["rank"] = i + 1
+    board = await leaderboards.board("guilds")
+    guilds = [{**e.data, "rank": e.rank} for e in board.top(limit)]
     
     return {"leaderboard": guilds}
 
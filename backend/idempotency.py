@@ -0,0 +1,67 @@
+# ========== GO FISH! IDEMPOTENT BATCH WRITES ==========
+# Client-generated keys let offline clients replay batches without double counting
+
+from database import db, register_indexes
+from pymongo import IndexModel, ASCENDING
+from pymongo.errors import BulkWriteError
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Set
+import os
+
+DUPLICATE_KEY = 11000
+# Processed keys are remembered this long; replays older than that apply again
+KEY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_KEY_TTL_SECONDS', 7 * 24 * 3600))
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 500))
+
+
+# ========== INDEXES ==========
+
+register_indexes("idempotency_keys", [
+    IndexModel([("created_at", ASCENDING)], expireAfterSeconds=KEY_TTL_SECONDS),
+])
+
+
+def _duplicate_indexes(error: BulkWriteError) -> Set[int]:
+    """Positions rejected as duplicates; any other write error is re-raised"""
+    duplicates = set()
+    for write_error in error.details.get("writeErrors", []):
+        if write_error.get("code") != DUPLICATE_KEY:
+            raise error
+        duplicates.add(write_error["index"])
+    return duplicates
+
+
+async def insert_new(collection: str, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """insert_many(ordered=False) that skips documents already stored.
+
+    The collection needs a unique index on its idempotency key; documents
+    rejected by it were written by an earlier replay of the same batch.
+    """
+    if not docs:
+        return []
+    try:
+        await db[collection].insert_many(docs, ordered=False)
+        duplicates = set()
+    except BulkWriteError as e:
+        duplicates = _duplicate_indexes(e)
+    return [doc for i, doc in enumerate(docs) if i not in duplicates]
+
+
+async def claim_keys(scope: str, keys: Iterable[str]) -> Set[str]:
+    """Record keys as processed and return the ones not seen before"""
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return set()
+    now = datetime.now(timezone.utc)
+    claimed = await insert_new(
+        "idempotency_keys", [{"_id": f"{scope}:{key}", "created_at": now} for key in keys]
+    )
+    prefix = len(scope) + 1
+    return {doc["_id"][prefix:] for doc in claimed}
+
+
+async def release_keys(scope: str, keys: Iterable[str]):
+    """Forget claimed keys whose write failed, so a retry is applied"""
+    keys = list(keys)
+    if keys:
+        await db.idempotency_keys.delete_many({"_id": {"$in": [f"{scope}:{key}" for key in keys]}})
@@ -0,0 +1,224 @@
+"""
+Index coverage report for the GO FISH! backend.
+
+Statically scans every route module for `db.<collection>.<query>(...)` calls,
+extracts the filter and sort fields, and checks them against the indexes
+declared with `register_indexes()`.
+
+Usage:
+    python index_report.py            # full coverage report
+    python index_report.py --scans    # only queries without a usable index
+    python index_report.py --ensure   # create all registered indexes now
+"""
+
+import argparse
+import ast
+import asyncio
+import importlib
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+ROOT_DIR = Path(__file__).parent
+sys.path.insert(0, str(ROOT_DIR))
+
+QUERY_OPS = {
+    "find", "find_one", "count_documents", "update_one", "update_many",
+    "delete_one", "delete_many", "find_one_and_update", "find_one_and_delete",
+    "replace_one",
+}
+
+
+@dataclass
+class QuerySite:
+    module: str
+    line: int
+    collection: str
+    op: str
+    alternatives: Optional[List[Set[str]]]  # None when the filter is built dynamically
+    sort: List[str] = field(default_factory=list)
+    status: str = "scan"
+    index: str = ""
+
+
+# ========== STATIC SCAN ==========
+
+def _filter_alternatives(node: ast.Dict) -> List[Set[str]]:
+    """Field sets a filter can match on; each `$or` branch becomes an alternative"""
+    base, branches = set(), []
+    for key, value in zip(node.keys, node.values):
+        if not isinstance(key, ast.Constant) or not isinstance(key.value, str):
+            continue
+        if key.value == "$or" and isinstance(value, ast.List):
+            branches = [_filter_alternatives(b)[0] for b in value.elts if isinstance(b, ast.Dict)]
+        elif not key.value.startswith("$"):
+            base.add(key.value)
+    if not branches:
+        return [base]
+    return [base | branch for branch in branches]
+
+
+def _resolve_name(func: ast.AST, name: str) -> Optional[ast.Dict]:
+    """Rebuild `query = {...}; query["k"] = ...` patterns into one dict node"""
+    resolved = None
+    for node in ast.walk(func):
+        if not isinstance(node, ast.Assign):
+            continue
+        for target in node.targets:
+            if isinstance(target, ast.Name) and target.id == name and isinstance(node.value, ast.Dict):
+                resolved = ast.Dict(keys=list(node.value.keys), values=list(node.value.values))
+            elif (isinstance(target, ast.Subscript) and isinstance(target.value, ast.Name)
+                  and target.value.id == name and resolved is not None
+                  and isinstance(target.slice, ast.Constant)):
+                resolved.keys.append(target.slice)
+                resolved.values.append(node.value)
+    return resolved
+
+
+def _sort_fields(node: ast.Call) -> List[str]:
+    if not node.args:
+        return []
+    arg = node.args[0]
+    if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+        return [arg.value]
+    if isinstance(arg, ast.List):
+        return [
+            elt.elts[0].value for elt in arg.elts
+            if isinstance(elt, ast.Tuple) and isinstance(elt.elts[0], ast.Constant)
+        ]
+    return []
+
+
+def scan_module(path: Path) -> List[QuerySite]:
+    tree = ast.parse(path.read_text())
+    sites: Dict[int, QuerySite] = {}
+    sorts: List[ast.Call] = []
+
+    for func in ast.walk(tree):
+        if not isinstance(func, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        for node in ast.walk(func):
+            if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)):
+                continue
+            target = node.func.value
+            if (node.func.attr in QUERY_OPS and isinstance(target, ast.Attribute)
+                    and isinstance(target.value, ast.Name) and target.value.id == "db"):
+                filter_node = node.args[0] if node.args else ast.Dict(keys=[], values=[])
+                if isinstance(filter_node, ast.Name):
+                    filter_node = _resolve_name(func, filter_node.id)
+                alternatives = _filter_alternatives(filter_node) if isinstance(filter_node, ast.Dict) else None
+                sites.setdefault(id(node), QuerySite(
+                    path.name, node.lineno, target.attr, node.func.attr, alternatives
+                ))
+            elif node.func.attr == "sort":
+                sorts.append(node)
+
+    # Attach chained .sort() calls, e.g. db.x.find(...).skip(...).sort(...)
+    for node in sorts:
+        inner = node.func.value
+        while isinstance(inner, ast.Call) and isinstance(inner.func, ast.Attribute):
+            if id(inner) in sites:
+                sites[id(inner)].sort = _sort_fields(node)
+                break
+            inner = inner.func.value
+
+    return sorted(sites.values(), key=lambda s: s.line)
+
+
+# ========== COVERAGE ==========
+
+def _index_fields(index) -> List[str]:
+    return list(index.document["key"].keys())
+
+
+def classify(site: QuerySite, registry: Dict[str, Dict]) -> QuerySite:
+    """covered: an index holds every filter field; partial: an index is usable
+    but leaves fields to be filtered in memory; scan: no usable index"""
+    if site.alternatives is None:
+        site.status = "dynamic"
+        return site
+
+    indexes = registry.get(site.collection, {})
+    rank = {"scan": 0, "partial": 1, "covered": 2}
+    worst = "covered"
+    used = []
+
+    for fields in site.alternatives:
+        best, best_name = "scan", ""
+        for name, index in indexes.items():
+            keys = _index_fields(index)
+            if fields:
+                if keys[0] not in fields:
+                    continue
+                status = "covered" if fields <= set(keys) else "partial"
+            elif site.sort and keys[0] == site.sort[0]:
+                status = "covered"
+            else:
+                continue
+            if rank[status] > rank[best]:
+                best, best_name = status, name
+        if rank[best] < rank[worst]:
+            worst = best
+        if best_name:
+            used.append(best_name)
+
+    site.status = worst
+    site.index = ", ".join(dict.fromkeys(used))
+    return site
+
+
+def load_registry() -> Dict[str, Dict]:
+    """Import every module that declares indexes so the registry is populated"""
+    from database import INDEX_REGISTRY
+    for path in sorted(ROOT_DIR.glob("*.py")):
+        if "register_indexes(" in path.read_text() and path.stem not in ("database", "index_report"):
+            importlib.import_module(path.stem)
+    return INDEX_REGISTRY
+
+
+def build_report(registry: Dict[str, Dict]) -> List[QuerySite]:
+    sites = []
+    for path in sorted(ROOT_DIR.glob("*.py")):
+        if path.stem in ("database", "index_report"):
+            continue
+        sites.extend(classify(site, registry) for site in scan_module(path))
+    return sites
+
+
+def print_report(sites: List[QuerySite], scans_only: bool = False):
+    order = ["scan", "dynamic", "partial", "covered"]
+    for status in order:
+        group = [s for s in sites if s.status == status]
+        if not group or (scans_only and status != "scan"):
+            continue
+        print(f"\n== {status.upper()} ({len(group)}) ==")
+        for s in group:
+            fields = " | ".join(",".join(sorted(f)) or "-" for f in s.alternatives or [])
+            sort = f" sort={','.join(s.sort)}" if s.sort else ""
+            via = f"  [{s.index}]" if s.index else ""
+            print(f"  {s.module}:{s.line:<5} {s.collection}.{s.op}({fields}){sort}{via}")
+
+    counts = {status: sum(1 for s in sites if s.status == status) for status in order}
+    print(f"\n{len(sites)} query sites: " + ", ".join(f"{counts[s]} {s}" for s in order))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mongo index coverage report")
+    parser.add_argument("--scans", action="store_true", help="only list queries without a usable index")
+    parser.add_argument("--ensure", action="store_true", help="create all registered indexes")
+    args = parser.parse_args()
+
+    registry = load_registry()
+    if args.ensure:
+        from database import ensure_indexes
+        created = asyncio.run(ensure_indexes())
+        for collection, names in sorted(created.items()):
+            print(f"{collection}: {', '.join(names)}")
+        return
+
+    print_report(build_report(registry), scans_only=args.scans)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+# ========== GO FISH! LEADERBOARD ENGINE ==========
+# In-process ranked boards: top-N, rank-of-member and around-me in O(log n)
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+import asyncio
+import logging
+import os
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+Score = Union[int, float, Tuple[Union[int, float], ...]]
+
+# Seconds before a warm board is re-read from Mongo in the background, so
+# writes made by other workers show up without blocking readers.
+REFRESH_SECONDS = float(os.environ.get('LEADERBOARD_REFRESH_SECONDS', 60))
+# Least recently used boards are dropped beyond this many per worker.
+MAX_BOARDS = int(os.environ.get('LEADERBOARD_MAX_BOARDS', 256))
+
+
+def _normalize(score: Score) -> Tuple:
+    """Scores may be a number or a tuple of tie-breakers, highest first"""
+    if isinstance(score, tuple):
+        return tuple(-s for s in score)
+    return (-score,)
+
+
+# ========== RANKED BOARD (INDEXABLE SKIP LIST) ==========
+
+class _Node:
+    __slots__ = ("key", "forward", "span")
+
+    def __init__(self, key, level: int):
+        self.key = key
+        self.forward: List[Optional["_Node"]] = [None] * level
+        self.span: List[int] = [0] * level
+
+
+@dataclass
+class BoardEntry:
+    rank: int
+    member: str
+    score: Score
+    data: Dict[str, Any]
+
+
+class RankedBoard:
+    """Skip list with span counts ordered by score (desc), then member id.
+
+    Every operation (insert, remove, rank, select-by-rank) is O(log n).
+    With `capacity` set, only the best `capacity` members are kept.
+    """
+
+    MAX_LEVEL = 32
+    P = 0.25
+
+    def __init__(self, capacity: Optional[int] = None):
+        self.capacity = capacity
+        self._head = _Node(None, self.MAX_LEVEL)
+        self._level = 1
+        self._length = 0
+        self._members: Dict[str, Tuple[Tuple, Score, Dict[str, Any]]] = {}
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __contains__(self, member: str) -> bool:
+        return member in self._members
+
+    def _random_level(self) -> int:
+        level = 1
+        while random.random() < self.P and level < self.MAX_LEVEL:
+            level += 1
+        return level
+
+    def _insert(self, key: Tuple):
+        update: List[_Node] = [self._head] * self.MAX_LEVEL
+        rank = [0] * self.MAX_LEVEL
+        x = self._head
+        for i in reversed(range(self._level)):
+            rank[i] = 0 if i == self._level - 1 else rank[i + 1]
+            while x.forward[i] is not None and x.forward[i].key < key:
+                rank[i] += x.span[i]
+                x = x.forward[i]
+            update[i] = x
+
+        level = self._random_level()
+        if level > self._level:
+            for i in range(self._level, level):
+                rank[i] = 0
+                update[i] = self._head
+                self._head.span[i] = self._length
+            self._level = level
+
+        node = _Node(key, level)
+        for i in range(level):
+            node.forward[i] = update[i].forward[i]
+            update[i].forward[i] = node
+            node.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = (rank[0] - rank[i]) + 1
+        for i in range(level, self._level):
+            update[i].span[i] += 1
+        self._length += 1
+
+    def _delete(self, key: Tuple):
+        update: List[_Node] = [self._head] * self.MAX_LEVEL
+        x = self._head
+        for i in reversed(range(self._level)):
+            while x.forward[i] is not None and x.forward[i].key < key:
+                x = x.forward[i]
+            update[i] = x
+
+        x = x.forward[0]
+        if x is None or x.key != key:
+            return
+        for i in range(self._level):
+            if update[i].forward[i] is x:
+                update[i].span[i] += x.span[i] - 1
+                update[i].forward[i] = x.forward[i]
+            else:
+                update[i].span[i] -= 1
+        while self._level > 1 and self._head.forward[self._level - 1] is None:
+            self._level -= 1
+        self._length -= 1
+
+    def _count_less(self, key: Tuple) -> int:
+        count, x = 0, self._head
+        for i in reversed(range(self._level)):
+            while x.forward[i] is not None and x.forward[i].key < key:
+                count += x.span[i]
+                x = x.forward[i]
+        return count
+
+    def _node_at(self, rank: int) -> Optional[_Node]:
+        traversed, x = 0, self._head
+        for i in reversed(range(self._level)):
+            while x.forward[i] is not None and traversed + x.span[i] <= rank:
+                traversed += x.span[i]
+                x = x.forward[i]
+            if traversed == rank:
+                return x
+        return None
+
+    def _entries_from(self, rank: int, count: int) -> List[BoardEntry]:
+        entries = []
+        node = self._node_at(rank) if rank >= 1 else None
+        while node is not None and len(entries) < count:
+            member = node.key[1]
+            _, score, data = self._members[member]
+            entries.append(BoardEntry(rank, member, score, data))
+            rank += 1
+            node = node.forward[0]
+        return entries
+
+    # ---------- public API ----------
+
+    def upsert(self, member: str, score: Score, data: Optional[Dict[str, Any]] = None):
+        """Insert or move a member; `data` is stored alongside for rendering rows"""
+        key = (_normalize(score), member)
+        existing = self._members.get(member)
+        if existing is not None:
+            if data is None:
+                data = existing[2]
+            if existing[0] == key:
+                self._members[member] = (key, score, data)
+                return
+            self._delete(existing[0])
+        elif self.capacity is not None and self._length >= self.capacity:
+            last = self._node_at(self._length)
+            if last is not None and key > last.key:
+                return
+        self._insert(key)
+        self._members[member] = (key, score, data or {})
+
+        if self.capacity is not None and self._length > self.capacity:
+            last = self._node_at(self._length)
+            self._delete(last.key)
+            del self._members[last.key[1]]
+
+    def increment(self, member: str, delta: Union[int, float], data: Optional[Dict[str, Any]] = None):
+        """Add `delta` to a numeric score (members not on the board start at 0)"""
+        existing = self._members.get(member)
+        current = existing[1] if existing is not None else 0
+        if data is not None and existing is not None:
+            data = {**existing[2], **data}
+        self.upsert(member, current + delta, data)
+
+    def raise_to(self, member: str, score: Score, data: Optional[Dict[str, Any]] = None):
+        """Keep the higher of the current and new score (mirrors Mongo `$max`)"""
+        existing = self._members.get(member)
+        if existing is None or _normalize(score) < existing[0][0]:
+            self.upsert(member, score, data)
+
+    def remove(self, member: str):
+        existing = self._members.pop(member, None)
+        if existing is not None:
+            self._delete(existing[0])
+
+    def get(self, member: str) -> Optional[BoardEntry]:
+        existing = self._members.get(member)
+        if existing is None:
+            return None
+        return BoardEntry(self._count_less(existing[0]) + 1, member, existing[1], existing[2])
+
+    def rank(self, member: str) -> Optional[int]:
+        """1-based position of a member, ties ordered by member id"""
+        existing = self._members.get(member)
+        return None if existing is None else self._count_less(existing[0]) + 1
+
+    def count_above(self, score: Score) -> int:
+        """Members strictly ahead of `score`; a tuple prefix compares on its fields only"""
+        return self._count_less((_normalize(score),))
+
+    def top(self, limit: int, offset: int = 0) -> List[BoardEntry]:
+        return self._entries_from(offset + 1, limit)
+
+    def around(self, member: str, radius: int = 5) -> List[BoardEntry]:
+        """Window of `radius` entries above and below a member"""
+        rank = self.rank(member)
+        if rank is None:
+            return []
+        start = max(1, rank - radius)
+        return self._entries_from(start, rank - start + radius + 1)
+
+
+# ========== ENGINE ==========
+
+Loader = Callable[[str], AsyncIterator[Tuple[str, Score, Dict[str, Any]]]]
+
+
+@dataclass
+class _BoardSpec:
+    loader: Loader
+    capacity: Optional[int]
+    refresh_seconds: float
+
+
+@dataclass
+class _BoardState:
+    board: RankedBoard
+    loaded_at: float
+    refreshing: Optional[asyncio.Task] = None
+    pending: Optional[List[Tuple[str, tuple]]] = None
+
+
+class LeaderboardEngine:
+    """Registry of ranked boards warm-loaded from Mongo and updated on writes.
+
+    Each route module registers a loader per board kind; boards are keyed by
+    (kind, board_id), e.g. ("tournament", tournament_id). Reads never block on
+    a refresh once a board is warm: stale boards are reloaded in the background.
+    """
+
+    def __init__(self, max_boards: int = MAX_BOARDS):
+        self.max_boards = max_boards
+        self._specs: Dict[str, _BoardSpec] = {}
+        self._boards: "OrderedDict[Tuple[str, str], _BoardState]" = OrderedDict()
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    def register(self, kind: str, loader: Loader, capacity: Optional[int] = None,
+                 refresh_seconds: float = REFRESH_SECONDS):
+        self._specs[kind] = _BoardSpec(loader, capacity, refresh_seconds)
+
+    async def _load(self, kind: str, board_id: str) -> RankedBoard:
+        spec = self._specs[kind]
+        board = RankedBoard(capacity=spec.capacity)
+        started = time.perf_counter()
+        async for member, score, data in spec.loader(board_id):
+            board.upsert(member, score, data)
+        logger.info(
+            "Leaderboard %s:%s loaded %d entries in %.1fms",
+            kind, board_id, len(board), (time.perf_counter() - started) * 1000
+        )
+        return board
+
+    async def _refresh(self, key: Tuple[str, str], state: _BoardState):
+        state.pending = []
+        try:
+            board = await self._load(*key)
+            # Replay writes that landed while the reload was running (all idempotent)
+            for method, args in state.pending:
+                getattr(board, method)(*args)
+            state.board = board
+            state.loaded_at = time.monotonic()
+        except Exception as e:
+            logger.error(f"Leaderboard refresh failed for {key[0]}:{key[1]}: {e}")
+        finally:
+            state.pending = None
+            state.refreshing = None
+
+    async def board(self, kind: str, board_id: str = "global") -> RankedBoard:
+        """Return a warm board, loading it on first use"""
+        key = (kind, board_id)
+        state = self._boards.get(key)
+        if state is None:
+            lock = self._locks.setdefault(key, asyncio.Lock())
+            async with lock:
+                state = self._boards.get(key)
+                if state is None:
+                    state = _BoardState(await self._load(kind, board_id), time.monotonic())
+                    self._boards[key] = state
+                    while len(self._boards) > self.max_boards:
+                        evicted, _ = self._boards.popitem(last=False)
+                        self._locks.pop(evicted, None)
+            self._locks.pop(key, None)
+
+        self._boards.move_to_end(key)
+        spec = self._specs[kind]
+        if state.refreshing is None and time.monotonic() - state.loaded_at > spec.refresh_seconds:
+            state.refreshing = asyncio.create_task(self._refresh(key, state))
+        return state.board
+
+    def _apply(self, kind: str, board_id: str, method: str, *args):
+        state = self._boards.get((kind, board_id))
+        if state is None:
+            return  # Not warm in this worker; the next load reads it from Mongo
+        getattr(state.board, method)(*args)
+        if state.pending is None:
+            return
+        if method == "increment":
+            # The reload may already include this $inc: replay the resulting
+            # score (idempotent) rather than the delta, which would count twice
+            entry = state.board.get(args[0])
+            if entry is not None:
+                state.pending.append(("upsert", (entry.member, entry.score, entry.data)))
+        else:
+            state.pending.append((method, args))
+
+    def record(self, kind: str, board_id: str, member: str, score: Score,
+               data: Optional[Dict[str, Any]] = None):
+        """Set a member's score after it was written to Mongo"""
+        self._apply(kind, board_id, "upsert", member, score, data)
+
+    def increment(self, kind: str, board_id: str, member: str, delta: Union[int, float],
+                  data: Optional[Dict[str, Any]] = None):
+        """Mirror a Mongo `$inc` on a member's score"""
+        self._apply(kind, board_id, "increment", member, delta, data)
+
+    def record_max(self, kind: str, board_id: str, member: str, score: Score,
+                   data: Optional[Dict[str, Any]] = None):
+        """Mirror a Mongo `$max` on a member's score"""
+        self._apply(kind, board_id, "raise_to", member, score, data)
+
+    def remove(self, kind: str, board_id: str, member: str):
+        self._apply(kind, board_id, "remove", member)
+
+    def invalidate(self, kind: str, board_id: Optional[str] = None):
+        """Drop cached boards so the next read reloads them"""
+        for key in [k for k in self._boards if k[0] == kind and (board_id is None or k[1] == board_id)]:
+            del self._boards[key]
+
+
+leaderboards = LeaderboardEngine()
@@ -11,17 +11,46 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timezone, timedelta
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
+from database import db, register_indexes
+from pymongo import IndexModel, ASCENDING, DESCENDING
 import uuid
 import random
 
 router = APIRouter(prefix="/api/events", tags=["events"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'test_database')]
+# ============================================================================
+# INDEXES
+# ============================================================================
+
+register_indexes("bottle_events", [
+    IndexModel([("event_id", ASCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("opened", ASCENDING)]),
+])
+
+register_indexes("pirate_mail", [
+    IndexModel([("mail_id", ASCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("sent_at", DESCENDING)]),
+])
+
+register_indexes("user_effects", [
+    IndexModel([("user_id", ASCENDING)]),
+])
+
+register_indexes("user_maps", [
+    IndexModel([("user_id", ASCENDING)]),
+])
+
+register_indexes("user_recipes", [
+    IndexModel([("user_id", ASCENDING)]),
+])
+
+register_indexes("user_unlocks", [
+    IndexModel([("user_id", ASCENDING)]),
+])
+
+register_indexes("user_inventory", [
+    IndexModel([("user_id", ASCENDING)]),
+])
 
 # ============================================================================
 # SECTION 1: BOTTLE EVENT CONSTANTS
@@ -3,20 +3,42 @@
 # ~400+ lines of backend polish
 
 from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import db, register_indexes
+from catalog_cache import static_catalog
+from leaderboard_engine import leaderboards
+from user_profiles import attach_usernames
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 import uuid
-import os
 import random
 
 router = APIRouter(prefix="/api", tags=["music_analytics"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("player_sessions", [
+    IndexModel([("user_id", ASCENDING), ("started_at", DESCENDING)]),
+    IndexModel([("started_at", DESCENDING)]),
+])
+
+register_indexes("player_settings", [
+    IndexModel([("user_id", ASCENDING)]),
+])
+
+register_indexes("player_stats", [
+    IndexModel([("user_id", ASCENDING)]),
+    IndexModel([("total_score", DESCENDING)]),
+    IndexModel([("total_fish_caught", DESCENDING)]),
+    IndexModel([("best_combo", DESCENDING)]),
+    IndexModel([("total_playtime_seconds", DESCENDING)]),
+])
+
+register_indexes("achievement_stats", [
+    IndexModel([("achievement_id", ASCENDING)]),
+    IndexModel([("unlock_count", DESCENDING)]),
+])
 
 
 # ========== MUSIC CONFIGURATION ==========
@@ -172,12 +194,14 @@ class RecordAchievementRequest(BaseModel):
 # ========== MUSIC ENDPOINTS ==========
 
 @router.get("/music/tracks")
+@static_catalog
 async def get_all_tracks():
     """Get all available music tracks"""
     return {"tracks": list(MUSIC_TRACKS.values())}
 
 
 @router.get("/music/sfx")
+@static_catalog
 async def get_all_sfx():
     """Get all sound effects"""
     return {"sound_effects": list(SOUND_EFFECTS.values())}
@@ -319,6 +343,11 @@ async def record_session(request: RecordSessionRequest):
         upsert=True
     )
     
+    leaderboards.increment("player_stats", "total_score", request.user_id, request.score_earned)
+    leaderboards.increment("player_stats", "total_fish_caught", request.user_id, request.fish_caught)
+    leaderboards.increment("player_stats", "total_playtime_seconds", request.user_id, request.session_duration_seconds)
+    leaderboards.record_max("player_stats", "best_combo", request.user_id, request.max_combo)
+    
     return {"success": True, "session_id": session["id"]}
 
 
@@ -387,6 +416,15 @@ async def get_session_history(user_id: str, days: int = 7):
     }
 
 
+async def load_stat_board(stat: str):
+    """Stream every player's value for one cumulative stat into its ranked board"""
+    cursor = db.player_stats.find({}, {"_id": 0, "user_id": 1, stat: 1})
+    async for entry in cursor:
+        yield entry["user_id"], entry.get(stat, 0), None
+
+leaderboards.register("player_stats", load_stat_board)
+
+
 @router.get("/analytics/leaderboard")
 async def get_global_leaderboard(stat: str = "total_score", limit: int = 100):
     """Get global leaderboard for a stat"""
@@ -395,17 +433,14 @@ async def get_global_leaderboard(stat: str = "total_score", limit: int = 100):
     if stat not in valid_stats:
         raise HTTPException(status_code=400, detail=f"Invalid stat. Use: {valid_stats}")
     
-    entries = await db.player_stats.find(
-        {},
-        {"_id": 0, "user_id": 1, stat: 1}
-    ).sort(stat, -1).limit(limit).to_list(limit)
+    board = await leaderboards.board("player_stats", stat)
+    entries = [
+        {"user_id": e.member, stat: e.score, "rank": e.rank, "value": e.score}
+        for e in board.top(limit)
+    ]
     
     # Enrich with usernames
-    for i, entry in enumerate(entries):
-        entry["rank"] = i + 1
-        user = await db.users.find_one({"id": entry["user_id"]}, {"_id": 0, "username": 1})
-        entry["username"] = user.get("username", "Unknown") if user else "Unknown"
-        entry["value"] = entry.get(stat, 0)
+    await attach_usernames(entries)
     
     return {"leaderboard": entries, "stat": stat}
 
@@ -0,0 +1,198 @@
+# ========== GO FISH! NAVIGATION ENGINE ==========
+# Uniform-grid spatial index over the world map plus weighted A* routing
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import heapq
+import math
+import os
+
+NAV_CELL_SIZE = int(os.environ.get('NAV_CELL_SIZE', 200))
+ROUTE_CACHE_SIZE = int(os.environ.get('ROUTE_CACHE_SIZE', 512))
+
+# Travel cost per unit of distance: open sea is 1, regions add their dangers
+OPEN_SEA_COST = 1.0
+DANGER_COST = 0.15
+DIFFICULTY_COST = 0.1
+CURRENT_COST = 0.5
+CURRENT_DANGERS = frozenset({"strong_currents", "whirlpools"})
+
+_NEIGHBOURS = [(dx, dy, math.hypot(dx, dy)) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+
+Cell = Tuple[int, int]
+
+
+def region_cost(region: Dict[str, Any]) -> float:
+    """Cost multiplier for sailing through a region"""
+    dangers = region.get("dangers", [])
+    cost = OPEN_SEA_COST + DIFFICULTY_COST * (region.get("difficulty", 1) - 1) + DANGER_COST * len(dangers)
+    if CURRENT_DANGERS.intersection(dangers):
+        cost += CURRENT_COST
+    return cost
+
+
+class NavigationGrid:
+    """Regions and points of interest bucketed on a uniform grid.
+
+    Every cell knows its region and travel cost, so region lookups and
+    nearby-POI queries touch only the cells involved, and routes are A*
+    searches over the cells (8-connected, danger-weighted) with an LRU cache
+    keyed by start and end cell.
+    """
+
+    def __init__(self, world_size: Dict[str, int], regions: Sequence[Dict[str, Any]],
+                 cell_size: int = NAV_CELL_SIZE, cache_size: int = ROUTE_CACHE_SIZE):
+        self.width, self.height = world_size["width"], world_size["height"]
+        self.cell_size = cell_size
+        self.cols = math.ceil(self.width / cell_size)
+        self.rows = math.ceil(self.height / cell_size)
+        self.regions = list(regions)
+        self.regions_by_id = {r["id"]: r for r in self.regions}
+
+        # Later regions win where bounds overlap
+        self._cell_region: List[List[Optional[int]]] = [[None] * self.rows for _ in range(self.cols)]
+        for index, region in enumerate(self.regions):
+            b = region["bounds"]
+            for cx in range(self._col(b["x"]), self._col(b["x"] + b["width"] - 1) + 1):
+                for cy in range(self._row(b["y"]), self._row(b["y"] + b["height"] - 1) + 1):
+                    self._cell_region[cx][cy] = index
+        costs = [region_cost(r) for r in self.regions]
+        self._cost = [[OPEN_SEA_COST if i is None else costs[i] for i in column] for column in self._cell_region]
+        self._min_cost = min([OPEN_SEA_COST, *costs])
+
+        self._poi_cells: Dict[Cell, List[Dict[str, Any]]] = {}
+        for region in self.regions:
+            for poi in region.get("points_of_interest", []):
+                self._poi_cells.setdefault(self.cell_of(poi["x"], poi["y"]), []).append({**poi, "region": region["id"]})
+
+        self.cache_size = cache_size
+        self._routes: "OrderedDict[Tuple[Cell, Cell], Dict[str, Any]]" = OrderedDict()
+
+    # ---------- spatial index ----------
+
+    def _col(self, x: float) -> int:
+        return min(max(int(x // self.cell_size), 0), self.cols - 1)
+
+    def _row(self, y: float) -> int:
+        return min(max(int(y // self.cell_size), 0), self.rows - 1)
+
+    def cell_of(self, x: float, y: float) -> Cell:
+        return self._col(x), self._row(y)
+
+    def contains(self, x: float, y: float) -> bool:
+        return 0 <= x <= self.width and 0 <= y <= self.height
+
+    def region_at(self, x: float, y: float) -> Optional[Dict[str, Any]]:
+        cx, cy = self.cell_of(x, y)
+        index = self._cell_region[cx][cy]
+        return None if index is None else self.regions[index]
+
+    def pois_near(self, x: float, y: float, radius: float, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Points of interest within `radius`, nearest first"""
+        found = []
+        for cx in range(self._col(x - radius), self._col(x + radius) + 1):
+            for cy in range(self._row(y - radius), self._row(y + radius) + 1):
+                for poi in self._poi_cells.get((cx, cy), ()):
+                    distance = math.hypot(poi["x"] - x, poi["y"] - y)
+                    if distance <= radius:
+                        found.append((distance, poi))
+        found.sort(key=lambda item: item[0])
+        return [{**poi, "distance": round(distance, 2)} for distance, poi in found[:limit]]
+
+    # ---------- routing ----------
+
+    def _center(self, cell: Cell) -> Tuple[float, float]:
+        return (min((cell[0] + 0.5) * self.cell_size, self.width),
+                min((cell[1] + 0.5) * self.cell_size, self.height))
+
+    def _search(self, start: Cell, goal: Cell) -> List[Cell]:
+        """A* over grid cells; edge cost is step length times the mean cell cost"""
+        def heuristic(cell: Cell) -> float:
+            dx, dy = abs(cell[0] - goal[0]), abs(cell[1] - goal[1])
+            return (max(dx, dy) + (math.sqrt(2) - 1) * min(dx, dy)) * self._min_cost
+
+        best = {start: 0.0}
+        came_from: Dict[Cell, Cell] = {}
+        # Ties on f go to the deeper node, which keeps open-water searches narrow
+        frontier = [(heuristic(start), 0.0, start)]
+        while frontier:
+            _, depth, cell = heapq.heappop(frontier)
+            cost = -depth
+            if cell == goal:
+                break
+            if cost > best[cell]:
+                continue
+            here = self._cost[cell[0]][cell[1]]
+            for dx, dy, step in _NEIGHBOURS:
+                nx, ny = cell[0] + dx, cell[1] + dy
+                if not (0 <= nx < self.cols and 0 <= ny < self.rows):
+                    continue
+                next_cost = cost + step * (here + self._cost[nx][ny]) / 2
+                if next_cost < best.get((nx, ny), math.inf):
+                    best[(nx, ny)] = next_cost
+                    came_from[(nx, ny)] = cell
+                    heapq.heappush(frontier, (next_cost + heuristic((nx, ny)), -next_cost, (nx, ny)))
+
+        path = [goal]
+        while path[-1] != start:
+            path.append(came_from[path[-1]])
+        path.reverse()
+        return path
+
+    @staticmethod
+    def _turns(path: List[Cell]) -> List[Cell]:
+        """Keep only the cells where the heading changes"""
+        if len(path) <= 2:
+            return path
+        kept = [path[0]]
+        for previous, cell, following in zip(path, path[1:], path[2:]):
+            if (cell[0] - previous[0], cell[1] - previous[1]) != (following[0] - cell[0], following[1] - cell[1]):
+                kept.append(cell)
+        kept.append(path[-1])
+        return kept
+
+    def _cell_route(self, start: Cell, goal: Cell) -> Dict[str, Any]:
+        key = (start, goal)
+        route = self._routes.get(key)
+        if route is not None:
+            self._routes.move_to_end(key)
+            return route
+
+        path = self._search(start, goal)
+        region_ids = []
+        cost = 0.0
+        for previous, cell in zip(path, path[1:]):
+            step = math.hypot(cell[0] - previous[0], cell[1] - previous[1]) * self.cell_size
+            cost += step * (self._cost[previous[0]][previous[1]] + self._cost[cell[0]][cell[1]]) / 2
+        for cell in path:
+            index = self._cell_region[cell[0]][cell[1]]
+            region_id = None if index is None else self.regions[index]["id"]
+            if region_id and (not region_ids or region_ids[-1] != region_id):
+                region_ids.append(region_id)
+
+        route = {"turns": [self._center(c) for c in self._turns(path)][1:-1], "regions": region_ids, "cost": cost}
+        self._routes[key] = route
+        if len(self._routes) > self.cache_size:
+            self._routes.popitem(last=False)
+        return route
+
+    def route(self, start: Tuple[float, float], end: Tuple[float, float]) -> Dict[str, Any]:
+        """Danger-weighted route from start to end with its waypoints, regions and dangers"""
+        cell_route = self._cell_route(self.cell_of(*start), self.cell_of(*end))
+        points = [start, *cell_route["turns"], end]
+        distance = sum(math.hypot(b[0] - a[0], b[1] - a[1]) for a, b in zip(points, points[1:]))
+
+        dangers = []
+        for region_id in cell_route["regions"]:
+            for danger in self.regions_by_id[region_id].get("dangers", []):
+                if danger not in dangers:
+                    dangers.append(danger)
+
+        return {
+            "waypoints": [{"x": round(x, 1), "y": round(y, 1)} for x, y in points],
+            "distance": distance,
+            "direct_distance": math.hypot(end[0] - start[0], end[1] - start[1]),
+            "weighted_cost": cell_route["cost"],
+            "regions": list(cell_route["regions"]),
+            "dangers": dangers,
+        }
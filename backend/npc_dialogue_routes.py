@@ -12,17 +12,25 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timezone
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
+from database import db, register_indexes
+from catalog_cache import static_catalog
+from pymongo import IndexModel, ASCENDING
 import uuid
 import random
 
 router = APIRouter(prefix="/api/dialogue", tags=["dialogue"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'test_database')]
+# ============================================================================
+# INDEXES
+# ============================================================================
+
+register_indexes("dialogue_states", [
+    IndexModel([("user_id", ASCENDING), ("npc_id", ASCENDING)]),
+])
+
+register_indexes("npc_relations", [
+    IndexModel([("user_id", ASCENDING), ("npc_id", ASCENDING)]),
+])
 
 # ============================================================================
 # SECTION 1: NPC DEFINITIONS
@@ -749,6 +757,7 @@ class UserNPCRelation(BaseModel):
 # ============================================================================
 
 @router.get("/npcs")
+@static_catalog
 async def get_all_npcs():
     """Get all NPC definitions"""
     return {"npcs": list(NPCS.values()), "total": len(NPCS)}
@@ -0,0 +1,86 @@
+# ========== GO FISH! KEYSET PAGINATION ==========
+# Opaque continuation tokens over (sort field, id) so deep pages cost O(page)
+
+from fastapi import HTTPException
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import base64
+import json
+
+MAX_PAGE_SIZE = 1000
+
+
+def _encode_value(value: Any):
+    if isinstance(value, datetime):  # typed timestamps survive the round trip
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Cannot use {type(value).__name__} in a cursor")
+
+
+def _decode_value(obj: Dict[str, Any]):
+    if set(obj) == {"$date"}:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+
+def encode_cursor(sort_value: Any, doc_id: str) -> str:
+    raw = json.dumps([sort_value, doc_id], default=_encode_value, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(padded), object_hook=_decode_value)
+        return sort_value, doc_id
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def projection_for(fields: Optional[str], allowed: Iterable[str], required: Iterable[str]) -> Dict[str, int]:
+    """Build a projection from a comma-separated `fields` param; None means all fields"""
+    if not fields:
+        return {"_id": 0}
+    allowed = set(allowed)
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return {"_id": 0, **{f: 1 for f in (*required, *requested)}}
+
+
+async def paginate(
+    collection,
+    query: Dict[str, Any],
+    sort_field: str,
+    id_field: str = "id",
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, int]] = None,
+    descending: bool = True,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of `query` ordered by (sort_field, id_field) plus the next cursor.
+
+    Needs an index on the query's equality fields followed by sort_field and
+    id_field in the same direction, e.g. (user_id, created_at -1, id -1).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    direction = -1 if descending else 1
+
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor)
+        op = "$lt" if descending else "$gt"
+        query = {"$and": [query, {"$or": [
+            {sort_field: {op: sort_value}},
+            {sort_field: sort_value, id_field: {op: last_id}},
+        ]}]}
+
+    docs = await collection.find(query, projection or {"_id": 0}).sort(
+        [(sort_field, direction), (id_field, direction)]
+    ).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last.get(sort_field), last.get(id_field))
+    return docs, next_cursor
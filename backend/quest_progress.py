@@ -0,0 +1,210 @@
+# ========== GO FISH! QUEST PROGRESS ENGINE ==========
+# Active objectives indexed by type and filter, changes persisted in one bulk write
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from pymongo import ReturnDocument, UpdateOne
+
+# Objective field -> event field; equality filters are part of the index key
+EXACT_FILTERS = (("fish_type", "fish_type"), ("stage", "stage"))
+# Objective field -> event field the event must reach
+MINIMUM_FILTERS = (("min_rarity", "rarity"), ("min_size", "size"))
+
+# Objectives measured by the best single event, e.g. "catch a fish larger than
+# 80cm" or "achieve a 10x combo": the action's value is the event's measure and
+# progress keeps the highest one instead of adding them up
+PEAK_OBJECTIVES = frozenset({"catch_size", "combo"})
+# Objectives can also opt in individually with {"measure": "peak"}
+PEAK = "peak"
+
+# (objective_type, progress_delta, extra_data)
+Action = Tuple[str, int, Dict[str, Any]]
+Entry = Tuple[int, int, Dict[str, Any]]
+
+
+def objective_types(objectives: Iterable[Dict[str, Any]]) -> List[str]:
+    """Distinct objective types of a quest, stored on player_quests for the progress lookup"""
+    return sorted({o["type"] for o in objectives})
+
+
+def _exact_key(source: Dict[str, Any], fields: Sequence[str]) -> Tuple:
+    return tuple(source.get(f) for f in fields)
+
+
+def objective_matches(objective: Dict[str, Any], extra: Dict[str, Any]) -> bool:
+    """Whether an event's extra data passes an objective's filters"""
+    for objective_field, event_field in EXACT_FILTERS:
+        if objective_field in objective and extra.get(event_field) != objective[objective_field]:
+            return False
+    for objective_field, event_field in MINIMUM_FILTERS:
+        if objective_field in objective and (extra.get(event_field) or 0) < objective[objective_field]:
+            return False
+    return True
+
+
+@dataclass
+class QuestChange:
+    quest_id: str
+    progress: List[int]
+    targets: List[int]
+    changed: Dict[int, int] = field(default_factory=dict)
+    completed: bool = False
+
+
+class ObjectiveIndex:
+    """A user's active objectives keyed by (type, fish_type, stage).
+
+    An event looks up only the keys it can match — the unfiltered key plus
+    the ones carrying its own fish_type/stage — and checks the remaining
+    minimum filters on that short list, instead of scanning every objective
+    of every active quest.
+    """
+
+    def __init__(self, quests: Iterable[Dict[str, Any]]):
+        self.quests = list(quests)
+        self._progress = [list(q.get("objectives_progress") or []) for q in self.quests]
+        self._entries: Dict[str, Dict[Tuple, List[Entry]]] = {}
+        for q, quest in enumerate(self.quests):
+            objectives = quest["quest_data"]["objectives"]
+            self._progress[q] += [0] * (len(objectives) - len(self._progress[q]))
+            for o, objective in enumerate(objectives):
+                key = _exact_key(objective, [f for f, _ in EXACT_FILTERS])
+                self._entries.setdefault(objective["type"], {}).setdefault(key, []).append((q, o, objective))
+
+    def __len__(self) -> int:
+        return sum(len(entries) for keys in self._entries.values() for entries in keys.values())
+
+    def matching(self, objective_type: str, extra: Dict[str, Any]) -> List[Entry]:
+        keys = self._entries.get(objective_type)
+        if not keys:
+            return []
+        values = _exact_key(extra, [e for _, e in EXACT_FILTERS])
+        found = []
+        # Every combination of "unfiltered" and "equals the event's value" per exact field
+        candidates = {()}
+        for value in values:
+            candidates = {key + (option,) for key in candidates for option in {None, value}}
+        for key in candidates:
+            for q, o, objective in keys.get(key, ()):
+                if objective_matches(objective, extra):
+                    found.append((q, o, objective))
+        return found
+
+    def apply(self, actions: Iterable[Action]) -> List[QuestChange]:
+        """Apply progress events in memory; returns the quests whose progress moved"""
+        changes: Dict[int, QuestChange] = {}
+        for objective_type, delta, extra in actions:
+            for q, o, objective in self.matching(objective_type, extra or {}):
+                progress = self._progress[q]
+                peak = objective_type in PEAK_OBJECTIVES or objective.get("measure") == PEAK
+                reached = max(progress[o], delta) if peak else progress[o] + delta
+                value = min(reached, objective["target"])
+                if value == progress[o]:
+                    continue
+                progress[o] = value
+                change = changes.get(q)
+                if change is None:
+                    targets = [o["target"] for o in self.quests[q]["quest_data"]["objectives"]]
+                    change = changes[q] = QuestChange(self.quests[q]["id"], progress, targets)
+                change.changed[o] = value
+
+        for change in changes.values():
+            change.completed = all(p >= t for p, t in zip(change.progress, change.targets))
+        return [changes[q] for q in sorted(changes)]
+
+
+def progress_writes(changes: Iterable[QuestChange], completed_at: Optional[str] = None) -> List[UpdateOne]:
+    """One UpdateOne per changed quest, for a single unordered bulk_write.
+
+    Progress positions are raised with $max so concurrent events never move
+    them backwards, and completion is decided on the stored progress after
+    the raise, so two events finishing different objectives at the same time
+    still complete the quest. Only a still-active quest can be completed.
+    """
+    writes = []
+    for change in changes:
+        stored = [{"$ifNull": [{"$arrayElemAt": ["$objectives_progress", i]}, 0]} for i in range(len(change.targets))]
+        done = {"$and": [{"$gte": [value, target]} for value, target in zip(stored, change.targets)]}
+        writes.append(UpdateOne({"id": change.quest_id, "status": "active"}, [
+            {"$set": {"objectives_progress": [
+                {"$max": [value, change.changed.get(i, 0)]} for i, value in enumerate(stored)
+            ]}},
+            {"$set": {
+                "status": {"$cond": [done, "completed", "$status"]},
+                "completed_at": {"$cond": [done, completed_at, "$completed_at"]},
+            }},
+        ]))
+    return writes
+
+
+# ========== KEYED PROGRESS (quest_system) ==========
+# quest_progress documents keep {"<objective_id>": {"current", "target",
+# "completed"}}; each objective is addressed directly and set to a reported
+# value, so they map onto peak objectives of the same engine.
+
+def objective_action(objective_id: str) -> str:
+    return f"objective:{objective_id}"
+
+
+def keyed_quest(quest_id: str, objectives: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """A quest_progress document's objectives in ObjectiveIndex form"""
+    return {
+        "id": quest_id,
+        "quest_data": {"objectives": [
+            {"type": objective_action(key), "target": o["target"], "measure": PEAK} for key, o in objectives.items()
+        ]},
+        "objectives_progress": [o.get("current", 0) for o in objectives.values()],
+    }
+
+
+def keyed_progress_update(change: QuestChange, keys: Sequence[str], completed_at: str) -> List[Dict[str, Any]]:
+    """Update pipeline raising the changed objectives and completing the quest once all are done"""
+    raised = {}
+    for i, value in change.changed.items():
+        path = f"objectives_progress.{keys[i]}"
+        current = {"$max": [{"$ifNull": [f"${path}.current", 0]}, value]}
+        raised[f"{path}.current"] = current
+        raised[f"{path}.completed"] = {"$gte": [current, change.targets[i]]}
+    done = {"$allElementsTrue": [{"$map": {
+        "input": {"$objectToArray": "$objectives_progress"}, "in": "$$this.v.completed"
+    }}]}
+    return [
+        {"$set": raised},
+        {"$set": {
+            "status": {"$cond": [done, "completed", "$status"]},
+            "completed_at": {"$cond": [done, completed_at, "$completed_at"]},
+        }},
+    ]
+
+
+async def apply_keyed_progress(collection, query: Dict[str, Any], objective_id: str, value: int,
+                               active_status: str, completed_at: str) -> Optional[Dict[str, Any]]:
+    """Set one objective of a keyed quest document in a single conditional write.
+
+    Returns the document after the write (or as stored, when nothing moved),
+    None when there is no active quest, and raises KeyError for an unknown
+    objective. Only the write that flips the status sees "completed" with
+    `just_completed` set.
+    """
+    active = {**query, "status": active_status}
+    doc = await collection.find_one(active, {"_id": 0})
+    if doc is None:
+        return None
+    objectives = doc.get("objectives_progress", {})
+    if objective_id not in objectives:
+        raise KeyError(objective_id)
+
+    keys = list(objectives)
+    changes = ObjectiveIndex([keyed_quest(doc.get("quest_id"), objectives)]).apply(
+        [(objective_action(objective_id), value, {})]
+    )
+    if not changes:
+        return {**doc, "just_completed": False}
+    updated = await collection.find_one_and_update(
+        active, keyed_progress_update(changes[0], keys, completed_at),
+        projection={"_id": 0}, return_document=ReturnDocument.AFTER
+    )
+    if updated is None:
+        # Completed by a concurrent write in the meantime
+        return {**doc, "status": "completed", "just_completed": False}
+    return {**updated, "just_completed": updated.get("status") == "completed"}
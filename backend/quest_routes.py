@@ -2,20 +2,32 @@
 # Daily quests, weekly missions, story progression, and achievements
 
 from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import db, register_indexes
+from catalog_cache import static_catalog
+from achievement_engine import AchievementIndex
+from quest_progress import ObjectiveIndex, objective_types, progress_writes
+from pymongo import IndexModel, ASCENDING
 from datetime import datetime, timezone, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from pydantic import BaseModel, Field
+import asyncio
 import uuid
-import os
 import random
 
 router = APIRouter(prefix="/api/quests", tags=["quests"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("player_quests", [
+    IndexModel([("id", ASCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("quest_type", ASCENDING), ("status", ASCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("quest_type", ASCENDING), ("quest_date", ASCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("status", ASCENDING), ("objective_types", ASCENDING)]),
+])
+
+register_indexes("player_story_progress", [
+    IndexModel([("user_id", ASCENDING)]),
+])
 
 
 # ========== QUEST TEMPLATES ==========
@@ -278,6 +290,7 @@ async def get_daily_quests(user_id: str):
                 "quest_type": "daily",
                 "status": "active",
                 "objectives_progress": [0] * len(quest["objectives"]),
+                "objective_types": objective_types(quest["objectives"]),
                 "started_at": datetime.now(timezone.utc).isoformat(),
                 "completed_at": None,
                 "claimed_at": None
@@ -315,6 +328,7 @@ async def get_weekly_quests(user_id: str):
                 "quest_type": "weekly",
                 "status": "active",
                 "objectives_progress": [0] * len(quest["objectives"]),
+                "objective_types": objective_types(quest["objectives"]),
                 "started_at": datetime.now(timezone.utc).isoformat(),
                 "completed_at": None,
                 "claimed_at": None
@@ -404,6 +418,7 @@ async def start_story_quest(user_id: str, quest_id: str):
         "quest_type": "story",
         "status": "active",
         "objectives_progress": [0] * len(story_quest["objectives"]),
+        "objective_types": objective_types(story_quest["objectives"]),
         "started_at": datetime.now(timezone.utc).isoformat(),
         "completed_at": None,
         "claimed_at": None
@@ -415,81 +430,40 @@ async def start_story_quest(user_id: str, quest_id: str):
 
 # ========== QUEST PROGRESS ==========
 
-@router.post("/progress")
-async def update_quest_progress(request: UpdateQuestProgressRequest):
-    """Update progress on quests based on player actions"""
-    # Get all active quests for user
+async def apply_quest_progress(user_id: str, actions: List[Tuple[str, int, Dict[str, Any]]]) -> dict:
+    """Apply several (objective_type, progress_delta, extra_data) actions in one pass"""
+    types = sorted({objective_type for objective_type, _, _ in actions})
+    # Only quests with a matching objective type; quests created before
+    # objective_types was stored are always considered
     active_quests = await db.player_quests.find({
-        "user_id": request.user_id,
-        "status": "active"
-    }, {"_id": 0}).to_list(20)
-    
-    updated_quests = []
-    completed_quests = []
-    
-    for quest in active_quests:
-        quest_data = quest["quest_data"]
-        objectives = quest_data["objectives"]
-        progress = quest["objectives_progress"]
-        
-        was_updated = False
-        
-        for i, objective in enumerate(objectives):
-            if objective["type"] == request.objective_type:
-                # Check additional filters
-                matches = True
-                
-                if "fish_type" in objective and request.extra_data.get("fish_type") != objective["fish_type"]:
-                    matches = False
-                if "stage" in objective and request.extra_data.get("stage") != objective["stage"]:
-                    matches = False
-                if "min_rarity" in objective and request.extra_data.get("rarity", 0) < objective["min_rarity"]:
-                    matches = False
-                if "min_size" in objective and request.extra_data.get("size", 0) < objective.get("min_size", 0):
-                    matches = False
-                
-                if matches:
-                    progress[i] = min(progress[i] + request.progress_delta, objective["target"])
-                    was_updated = True
-        
-        if was_updated:
-            # Check if quest is completed
-            is_complete = all(
-                progress[i] >= objectives[i]["target"]
-                for i in range(len(objectives))
-            )
-            
-            if is_complete and quest["status"] == "active":
-                await db.player_quests.update_one(
-                    {"id": quest["id"]},
-                    {
-                        "$set": {
-                            "objectives_progress": progress,
-                            "status": "completed",
-                            "completed_at": datetime.now(timezone.utc).isoformat()
-                        }
-                    }
-                )
-                completed_quests.append(quest["id"])
-            else:
-                await db.player_quests.update_one(
-                    {"id": quest["id"]},
-                    {"$set": {"objectives_progress": progress}}
-                )
-            
-            updated_quests.append({
-                "quest_id": quest["id"],
-                "progress": progress,
-                "completed": is_complete
-            })
-    
+        "user_id": user_id,
+        "status": "active",
+        "$or": [{"objective_types": {"$in": types}}, {"objective_types": {"$exists": False}}]
+    }, {"_id": 0, "id": 1, "quest_data.objectives": 1, "objectives_progress": 1}).to_list(20)
+
+    changes = ObjectiveIndex(active_quests).apply(actions)
+    if changes:
+        await db.player_quests.bulk_write(
+            progress_writes(changes, datetime.now(timezone.utc).isoformat()), ordered=False
+        )
+
     return {
         "success": True,
-        "updated_quests": updated_quests,
-        "completed_quests": completed_quests
+        "updated_quests": [
+            {"quest_id": c.quest_id, "progress": c.progress, "completed": c.completed} for c in changes
+        ],
+        "completed_quests": [c.quest_id for c in changes if c.completed]
     }
 
 
+@router.post("/progress")
+async def update_quest_progress(request: UpdateQuestProgressRequest):
+    """Update progress on quests based on player actions"""
+    return await apply_quest_progress(
+        request.user_id, [(request.objective_type, request.progress_delta, request.extra_data)]
+    )
+
+
 @router.post("/claim")
 async def claim_quest_reward(request: ClaimQuestRewardRequest):
     """Claim reward for completed quest"""
@@ -582,8 +556,33 @@ ACHIEVEMENTS = [
     {"id": "daily_30", "name": "Dedicated", "description": "Login 30 days in a row", "icon": "🗓️", "xp": 1000, "gems": 100},
 ]
 
+# Achievements unlocked from user document fields: id -> (field, threshold);
+# list fields count their entries
+ACHIEVEMENT_REQUIREMENTS = {
+    "first_catch": ("total_catches", 1),
+    "catch_100": ("total_catches", 100),
+    "catch_1000": ("total_catches", 1000),
+    "catch_10000": ("total_catches", 10000),
+    "level_10": ("level", 10),
+    "level_50": ("level", 50),
+    "level_100": ("level", 100),
+    "prestige_1": ("prestige", 1),
+    "prestige_5": ("prestige", 5),
+    "perfect_10": ("perfect_catches", 10),
+    "perfect_100": ("perfect_catches", 100),
+    "combo_10": ("max_combo", 10),
+    "combo_50": ("max_combo", 50),
+    "all_lures": ("unlocked_lures", 3),
+}
+
+QUEST_ACHIEVEMENT_INDEX = AchievementIndex(
+    [a for a in ACHIEVEMENTS if a["id"] in ACHIEVEMENT_REQUIREMENTS],
+    lambda achievement: ACHIEVEMENT_REQUIREMENTS[achievement["id"]]
+)
+
 
 @router.get("/achievements/all")
+@static_catalog
 async def get_all_achievements():
     """Get all available achievements"""
     return {"achievements": ACHIEVEMENTS}
@@ -611,50 +610,32 @@ async def get_user_achievements(user_id: str):
 @router.post("/achievements/{user_id}/check")
 async def check_achievements(user_id: str):
     """Check and unlock new achievements based on player stats"""
-    user = await db.users.find_one({"id": user_id}, {"_id": 0})
+    user = await db.users.find_one(
+        {"id": user_id},
+        {"_id": 0, "achievements": 1, **{field: 1 for field in QUEST_ACHIEVEMENT_INDEX.stats}}
+    )
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     current_achievements = user.get("achievements", [])
-    stats = await db.player_stats.find_one({"user_id": user_id}, {"_id": 0})
-    
-    newly_unlocked = []
-    
-    # Check each achievement
-    checks = {
-        "first_catch": user.get("total_catches", 0) >= 1,
-        "catch_100": user.get("total_catches", 0) >= 100,
-        "catch_1000": user.get("total_catches", 0) >= 1000,
-        "catch_10000": user.get("total_catches", 0) >= 10000,
-        "level_10": user.get("level", 1) >= 10,
-        "level_50": user.get("level", 1) >= 50,
-        "level_100": user.get("level", 1) >= 100,
-        "prestige_1": user.get("prestige", 0) >= 1,
-        "prestige_5": user.get("prestige", 0) >= 5,
-        "perfect_10": user.get("perfect_catches", 0) >= 10,
-        "perfect_100": user.get("perfect_catches", 0) >= 100,
-        "combo_10": user.get("max_combo", 0) >= 10,
-        "combo_50": user.get("max_combo", 0) >= 50,
-        "all_lures": len(user.get("unlocked_lures", [])) >= 3,
+    values = {
+        field: len(value) if isinstance(value, list) else value
+        for field, value in user.items() if field != "achievements"
     }
-    
-    for ach_id, condition in checks.items():
-        if condition and ach_id not in current_achievements:
-            # Unlock achievement
-            ach_data = next((a for a in ACHIEVEMENTS if a["id"] == ach_id), None)
-            if ach_data:
-                newly_unlocked.append(ach_data)
-                current_achievements.append(ach_id)
-                
-                # Award achievement rewards
-                if "gems" in ach_data:
-                    await db.users.update_one({"id": user_id}, {"$inc": {"gems": ach_data["gems"]}})
+    newly_unlocked = QUEST_ACHIEVEMENT_INDEX.unlockable(values, set(current_achievements))
     
     if newly_unlocked:
-        await db.users.update_one(
-            {"id": user_id},
-            {"$set": {"achievements": current_achievements}}
-        )
+        # Each achievement is unlocked and paid by its own guarded write, so one
+        # unlocked concurrently elsewhere doesn't hold back the others
+        results = await asyncio.gather(*(
+            db.users.update_one(
+                {"id": user_id, "achievements": {"$ne": a["id"]}},
+                {"$addToSet": {"achievements": a["id"]}, **({"$inc": {"gems": a["gems"]}} if a.get("gems") else {})}
+            )
+            for a in newly_unlocked
+        ))
+        newly_unlocked = [a for a, result in zip(newly_unlocked, results) if result.modified_count]
+        current_achievements = current_achievements + [a["id"] for a in newly_unlocked]
     
     return {
         "newly_unlocked": newly_unlocked,
@@ -14,17 +14,27 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timezone, timedelta
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
+from database import db, register_indexes
+from catalog_cache import static_catalog
+from quest_progress import apply_keyed_progress
+from pymongo import IndexModel, ASCENDING
 import uuid
 import random
 
 router = APIRouter(prefix="/api/quests", tags=["quests"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'test_database')]
+# ============================================================================
+# INDEXES
+# ============================================================================
+
+register_indexes("quest_progress", [
+    IndexModel([("user_id", ASCENDING), ("quest_id", ASCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("status", ASCENDING)]),
+])
+
+register_indexes("user_titles", [
+    IndexModel([("user_id", ASCENDING)]),
+])
 
 # ============================================================================
 # QUEST CATEGORIES
@@ -221,11 +231,13 @@ class UpdateProgressRequest(BaseModel):
 # ============================================================================
 
 @router.get("/all")
+@static_catalog
 async def get_all_quests():
     """Get all quests"""
     return {"quests": QUESTS, "total": TOTAL_QUESTS}
 
 @router.get("/types")
+@static_catalog
 async def get_quest_types():
     """Get all quest types"""
     return QUEST_TYPES
@@ -336,39 +348,21 @@ async def start_quest(request: StartQuestRequest):
 @router.post("/update-progress")
 async def update_quest_progress(request: UpdateProgressRequest):
     """Update progress on a quest objective"""
-    progress = await db.quest_progress.find_one(
-        {"user_id": request.user_id, "quest_id": request.quest_id, "status": "in_progress"},
-        {"_id": 0}
-    )
-    if not progress:
+    # One conditional write; progress only moves forward and exactly one
+    # request sees the quest complete (and pays its rewards)
+    try:
+        progress = await apply_keyed_progress(
+            db.quest_progress, {"user_id": request.user_id, "quest_id": request.quest_id},
+            request.objective_id, request.progress, "in_progress", datetime.now(timezone.utc).isoformat()
+        )
+    except KeyError:
+        raise HTTPException(status_code=400, detail="Invalid objective")
+    if progress is None:
         raise HTTPException(status_code=404, detail="Active quest not found")
     
     objectives = progress.get("objectives_progress", {})
-    if request.objective_id not in objectives:
-        raise HTTPException(status_code=400, detail="Invalid objective")
-    
-    # Update progress
-    objectives[request.objective_id]["current"] = min(
-        request.progress,
-        objectives[request.objective_id]["target"]
-    )
-    
-    # Check if objective completed
-    if objectives[request.objective_id]["current"] >= objectives[request.objective_id]["target"]:
-        objectives[request.objective_id]["completed"] = True
-    
-    # Check if all objectives completed
-    all_complete = all(obj["completed"] for obj in objectives.values())
-    new_status = "completed" if all_complete else "in_progress"
-    
-    update_data = {"objectives_progress": objectives, "status": new_status}
-    if all_complete:
-        update_data["completed_at"] = datetime.now(timezone.utc).isoformat()
-    
-    await db.quest_progress.update_one(
-        {"user_id": request.user_id, "quest_id": request.quest_id},
-        {"$set": update_data}
-    )
+    all_complete = progress["just_completed"]
+    new_status = progress.get("status", "in_progress")
     
     result = {"progress": objectives, "status": new_status}
     
@@ -13,16 +13,33 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timezone, timedelta
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import db, register_indexes, register_migration, migration_done
+from catalog_cache import static_catalog
+from pagination import paginate
+from pymongo import IndexModel, UpdateOne, ASCENDING, DESCENDING
+import asyncio
 import os
 import uuid
 
 router = APIRouter(prefix="/api/reputation", tags=["reputation"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'test_database')]
+# ============================================================================
+# INDEXES
+# ============================================================================
+
+register_indexes("user_reputation", [
+    IndexModel([("user_id", ASCENDING), ("faction_id", ASCENDING)]),
+])
+
+# Full change history lives here; user_reputation keeps only the latest few
+register_indexes("reputation_history", [
+    IndexModel([("id", ASCENDING)], unique=True),
+    IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("faction_id", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)]),
+])
+
+# Changes embedded on each user_reputation document ($slice keeps it bounded)
+RECENT_HISTORY = int(os.environ.get('REPUTATION_RECENT_HISTORY', 10))
 
 # ============================================================================
 # FACTIONS
@@ -193,6 +210,17 @@ FACTIONS = {
     }
 }
 
+# Spillover from a change with one faction: (target faction, share, type),
+# precomputed once for gains and for losses
+SPILLOVER_RULES: Dict[str, Dict[str, List[tuple]]] = {
+    faction_id: {
+        "gain": [(ally, 0.25, "ally_bonus") for ally in faction.get("allies", [])]
+              + [(enemy, -0.5, "enemy_penalty") for enemy in faction.get("enemies", [])],
+        "loss": [(ally, 0.25, "ally_sympathy") for ally in faction.get("allies", [])],
+    }
+    for faction_id, faction in FACTIONS.items()
+}
+
 # ============================================================================
 # REPUTATION LEVELS
 # ============================================================================
@@ -261,6 +289,7 @@ class ReputationChange(BaseModel):
 # ============================================================================
 
 @router.get("/factions")
+@static_catalog
 async def get_all_factions():
     """Get all factions"""
     return {"factions": list(FACTIONS.values()), "total": len(FACTIONS)}
@@ -274,6 +303,7 @@ async def get_faction(faction_id: str):
     return faction
 
 @router.get("/levels")
+@static_catalog
 async def get_reputation_levels():
     """Get all reputation levels"""
     return {"levels": REPUTATION_LEVELS}
@@ -334,7 +364,7 @@ async def get_user_faction_reputation(user_id: str, faction_id: str):
         "level_info": level_info,
         "benefits": get_current_benefits(faction_id, level_info["name"].lower()),
         "next_level": get_next_level_info(rep["reputation"]),
-        "history": rep.get("history", [])[-10:]  # Last 10 changes
+        "history": rep.get("history", [])[-10:]  # Last 10 changes; full log at /user/{user_id}/history
     }
 
 def get_current_benefits(faction_id: str, level_name: str) -> List[str]:
@@ -375,40 +405,62 @@ async def change_reputation(change: ReputationChange):
     if not faction:
         raise HTTPException(status_code=404, detail="Faction not found")
     
-    # Get current reputation
-    current = await db.user_reputation.find_one(
-        {"user_id": change.user_id, "faction_id": change.faction_id}
-    )
-    
-    current_rep = current["reputation"] if current else 0
-    new_rep = current_rep + change.amount
+    if not await migration_done(HISTORY_MIGRATION):
+        # The $slice below would drop legacy history that was never copied
+        await migrate_reputation_history(change.user_id)
     
-    level_info = get_reputation_level(new_rep)
+    spillover = calculate_spillover(change.faction_id, change.amount)
+    amounts = {change.faction_id: change.amount}
+    for effect in spillover:
+        amounts[effect["faction"]] = amounts.get(effect["faction"], 0) + effect["amount"]
     
-    # Create history entry
-    history_entry = {
-        "amount": change.amount,
-        "reason": change.reason,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "quest": change.related_quest
+    # Current standing with every affected faction in one read
+    current = {
+        r["faction_id"]: r.get("reputation", 0)
+        for r in await db.user_reputation.find(
+            {"user_id": change.user_id, "faction_id": {"$in": list(amounts)}},
+            {"_id": 0, "faction_id": 1, "reputation": 1}
+        ).to_list(len(amounts))
     }
     
-    # Update database
-    await db.user_reputation.update_one(
-        {"user_id": change.user_id, "faction_id": change.faction_id},
-        {
-            "$set": {
-                "reputation": new_rep,
-                "level": level_info["name"],
-                "last_change": datetime.now(timezone.utc).isoformat()
+    now = datetime.now(timezone.utc).isoformat()
+    entries = [history_entry(change.user_id, change.faction_id, change.amount, change.reason, now,
+                             quest=change.related_quest)]
+    entries += [history_entry(change.user_id, e["faction"], e["amount"], change.reason, now,
+                              quest=change.related_quest, kind=e["type"], source=change.faction_id)
+                for e in spillover]
+    entries_by_faction: Dict[str, List[Dict]] = {}
+    for entry in entries:
+        entries_by_faction.setdefault(entry["faction_id"], []).append(entry)
+    
+    # One bulk write for all affected factions plus one history insert
+    writes = [
+        UpdateOne(
+            {"user_id": change.user_id, "faction_id": faction_id},
+            {
+                "$inc": {"reputation": amount},
+                "$set": {
+                    "level": get_reputation_level(current.get(faction_id, 0) + amount)["name"],
+                    "last_change": now
+                },
+                "$setOnInsert": {"history_migrated": True},
+                "$push": {"history": {
+                    "$each": [recent_entry(e) for e in entries_by_faction[faction_id]],
+                    "$slice": -RECENT_HISTORY
+                }}
             },
-            "$push": {"history": history_entry}
-        },
-        upsert=True
+            upsert=True
+        )
+        for faction_id, amount in amounts.items()
+    ]
+    await asyncio.gather(
+        db.user_reputation.bulk_write(writes, ordered=False),
+        db.reputation_history.insert_many(entries, ordered=False),
     )
     
-    # Check for spillover effects
-    spillover = await calculate_spillover(change.faction_id, change.amount, change.user_id)
+    current_rep = current.get(change.faction_id, 0)
+    new_rep = current_rep + change.amount
+    level_info = get_reputation_level(new_rep)
     
     # Check if level changed
     old_level = get_reputation_level(current_rep)
@@ -425,50 +477,93 @@ async def change_reputation(change: ReputationChange):
         "new_benefits": get_current_benefits(change.faction_id, level_info["name"].lower()) if level_changed else []
     }
 
-async def calculate_spillover(faction_id: str, amount: int, user_id: str) -> List[Dict]:
+def calculate_spillover(faction_id: str, amount: int) -> List[Dict]:
     """Calculate reputation spillover to allied/enemy factions"""
-    faction = FACTIONS.get(faction_id)
-    if not faction:
+    rules = SPILLOVER_RULES.get(faction_id)
+    if not rules or not amount:
         return []
     
+    # Gains: allies +25%, enemies -50%. Losses: allies -25%
     spillover = []
-    
-    # Allies gain 25% of positive reputation
-    if amount > 0:
-        for ally_id in faction.get("allies", []):
-            ally_amount = int(amount * 0.25)
-            if ally_amount > 0:
-                await db.user_reputation.update_one(
-                    {"user_id": user_id, "faction_id": ally_id},
-                    {"$inc": {"reputation": ally_amount}},
-                    upsert=True
-                )
-                spillover.append({"faction": ally_id, "amount": ally_amount, "type": "ally_bonus"})
-    
-    # Enemies lose 50% of positive reputation gained
-    if amount > 0:
-        for enemy_id in faction.get("enemies", []):
-            enemy_amount = int(amount * -0.5)
-            await db.user_reputation.update_one(
-                {"user_id": user_id, "faction_id": enemy_id},
-                {"$inc": {"reputation": enemy_amount}},
-                upsert=True
-            )
-            spillover.append({"faction": enemy_id, "amount": enemy_amount, "type": "enemy_penalty"})
-    
-    # If you help enemies, you lose 25% with original faction's allies
-    if amount < 0:
-        for ally_id in faction.get("allies", []):
-            ally_loss = int(amount * 0.25)
-            await db.user_reputation.update_one(
-                {"user_id": user_id, "faction_id": ally_id},
-                {"$inc": {"reputation": ally_loss}},
-                upsert=True
-            )
-            spillover.append({"faction": ally_id, "amount": ally_loss, "type": "ally_sympathy"})
-    
+    for target, share, kind in rules["gain" if amount > 0 else "loss"]:
+        spill = int(amount * share)
+        if spill:
+            spillover.append({"faction": target, "amount": spill, "type": kind})
     return spillover
 
+def history_entry(user_id: str, faction_id: str, amount: int, reason: str, timestamp: str,
+                  quest: Optional[str] = None, kind: str = "direct", source: Optional[str] = None) -> Dict:
+    """A reputation_history document"""
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "faction_id": faction_id,
+        "amount": amount,
+        "reason": reason,
+        "type": kind,
+        "source_faction": source,
+        "timestamp": timestamp,
+        "quest": quest
+    }
+
+def recent_entry(entry: Dict) -> Dict:
+    """The slim copy embedded on user_reputation"""
+    return {k: entry[k] for k in ("id", "amount", "reason", "type", "timestamp", "quest")}
+
+@router.get("/user/{user_id}/history")
+async def get_reputation_history(user_id: str, faction_id: Optional[str] = None, limit: int = 50,
+                                 cursor: Optional[str] = None):
+    """Reputation changes, newest first; pass `next_cursor` back to continue"""
+    query = {"user_id": user_id}
+    if faction_id:
+        if faction_id not in FACTIONS:
+            raise HTTPException(status_code=404, detail="Faction not found")
+        query["faction_id"] = faction_id
+    
+    history, next_cursor = await paginate(db.reputation_history, query, "timestamp", limit=limit, cursor=cursor)
+    return {"history": history, "next_cursor": next_cursor}
+
+async def migrate_reputation_history(user_id: Optional[str] = None) -> int:
+    """Copy embedded history of unmigrated documents into reputation_history, then trim it.
+
+    Entries written by change_reputation keep their history id, so they are
+    not copied twice; legacy entries get "<_id>-<position>" ids.
+    """
+    pending = {"history_migrated": {"$ne": True}}
+    if user_id is not None:
+        pending["user_id"] = user_id
+    await db.user_reputation.aggregate([
+        {"$match": {**pending, "history.0": {"$exists": True}}},
+        {"$unwind": {"path": "$history", "includeArrayIndex": "position"}},
+        {"$project": {
+            "_id": 0,
+            "id": {"$ifNull": [
+                "$history.id",
+                {"$concat": [{"$toString": "$_id"}, "-", {"$toString": "$position"}]}
+            ]},
+            "user_id": 1,
+            "faction_id": 1,
+            "amount": "$history.amount",
+            "reason": "$history.reason",
+            "type": {"$ifNull": ["$history.type", "direct"]},
+            "source_faction": {"$literal": None},
+            "timestamp": "$history.timestamp",
+            "quest": "$history.quest"
+        }},
+        {"$merge": {"into": "reputation_history", "on": "id", "whenMatched": "keepExisting"}}
+    ]).to_list(None)
+    result = await db.user_reputation.update_many(
+        pending,
+        {
+            "$set": {"history_migrated": True},
+            "$push": {"history": {"$each": [], "$slice": -RECENT_HISTORY}}
+        }
+    )
+    return result.modified_count
+
+HISTORY_MIGRATION = "reputation_history"
+register_migration(HISTORY_MIGRATION, migrate_reputation_history)
+
 @router.get("/user/{user_id}/standing-summary")
 async def get_standing_summary(user_id: str):
     """Get a summary of user's faction standings"""
@@ -525,6 +620,7 @@ async def get_standing_summary(user_id: str):
     return summary
 
 @router.get("/actions")
+@static_catalog
 async def get_reputation_actions():
     """Get all possible reputation actions"""
     return {"actions": REPUTATION_ACTIONS}
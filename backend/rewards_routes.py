@@ -2,19 +2,38 @@
 # Login bonuses, season pass progression, and recurring rewards
 
 from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import db, register_indexes
+from catalog_cache import static_catalog
+from pymongo import IndexModel, ASCENDING
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 import uuid
-import os
 
 router = APIRouter(prefix="/api/rewards", tags=["rewards"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("player_daily_rewards", [
+    IndexModel([("user_id", ASCENDING)]),
+])
+
+register_indexes("player_items", [
+    IndexModel([("user_id", ASCENDING)]),
+])
+
+register_indexes("player_season_pass", [
+    IndexModel([("user_id", ASCENDING), ("season_pass_id", ASCENDING)]),
+])
+
+register_indexes("player_wheel_status", [
+    IndexModel([("user_id", ASCENDING)]),
+])
+
+register_indexes("season_passes", [
+    IndexModel([("id", ASCENDING)]),
+    IndexModel([("status", ASCENDING), ("start_date", ASCENDING), ("end_date", ASCENDING)]),
+])
 
 
 # ========== DAILY REWARD CONFIGURATION ==========
@@ -531,6 +550,7 @@ async def purchase_season_pass(request: PurchaseSeasonPassRequest):
 # ========== LUCKY WHEEL ==========
 
 @router.get("/wheel/config")
+@static_catalog
 async def get_wheel_config():
     """Get lucky wheel configuration"""
     wheel = {
@@ -15,18 +15,29 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timezone, timedelta
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
+from database import db, register_indexes
+from catalog_cache import static_catalog
+from catch_sampler import CatchSampler, CatchTable, make_rng, pool_pick_probabilities, randint
+from pymongo import IndexModel, ASCENDING, DESCENDING
 import uuid
 import random
 import math
 
 router = APIRouter(prefix="/api/sea-voyage", tags=["sea_voyage"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'test_database')]
+# ============================================================================
+# INDEXES
+# ============================================================================
+
+register_indexes("voyages", [
+    IndexModel([("voyage_id", ASCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("active", ASCENDING)]),
+    IndexModel([("active", ASCENDING), ("total_gold_earned", DESCENDING)]),
+])
+
+register_indexes("user_boats", [
+    IndexModel([("user_id", ASCENDING)]),
+])
 
 # ============================================================================
 # SECTION 1: BOAT DEFINITIONS (20 BOATS)
@@ -390,9 +401,13 @@ BOATS = [
 
 LOCATION_TYPES = ["port", "island", "city", "pirate_haven", "fishing_ground", "danger_zone", "secret_location"]
 
+STAGE_SEED = 1725
+
 def generate_stages():
     """Generate 100 stages with varying locations and challenges"""
     stages = []
+    # Fixed seed: every worker must generate the same map (catalog ETags depend on it)
+    rng = random.Random(STAGE_SEED)
     
     # Stage templates by region
     regions = [
@@ -449,7 +464,7 @@ def generate_stages():
             elif i % 3 == 0:  # Every 3rd is an island
                 loc_type = "island"
             else:  # Default is port or fishing ground
-                loc_type = random.choice(["port", "fishing_ground"])
+                loc_type = rng.choice(["port", "fishing_ground"])
             
             # Get location name
             if loc_type in location_names:
@@ -543,6 +558,27 @@ SEA_FISH = [
     {"id": 23, "name": "The Eternal Catch", "tier": 5, "value": 10000, "rarity": 0.0005, "min_stage": 100, "description": "The fish that grants wisdom."}
 ]
 
+# Catch odds per stage. Rolling every species against its chance and then
+# picking uniformly among the hits has a fixed outcome distribution per stage,
+# so it is computed once into an alias table and each fish is one O(1) draw.
+CATCH_SAMPLER = CatchSampler()
+# Replace with make_rng(seed) for reproducible hauls
+CATCH_RNG = make_rng()
+
+def stage_catch_table(stage: Dict[str, Any]) -> CatchTable:
+    """Alias table of fish (and misses) for a stage"""
+    available = [f for f in SEA_FISH if f["min_stage"] <= stage["id"]]
+    rare_chance = stage["rewards"]["rare_fish_chance"]
+    
+    def build():
+        picks, miss = pool_pick_probabilities([f["rarity"] * rare_chance * 10 for f in available])
+        return CatchTable(available, picks, miss)
+    
+    return CATCH_SAMPLER.table((tuple(f["id"] for f in available), rare_chance), build)
+
+for _stage in STAGES:
+    stage_catch_table(_stage)
+
 # ============================================================================
 # SECTION 4: SUPPLIES AND CONSUMABLES
 # ============================================================================
@@ -704,11 +740,13 @@ class SellFishRequest(BaseModel):
 # ============================================================================
 
 @router.get("/boats")
+@static_catalog
 async def get_all_boats():
     """Get all available boats"""
     return {"boats": BOATS, "total": len(BOATS)}
 
 @router.get("/boats/{boat_id}")
+@static_catalog
 async def get_boat(boat_id: int):
     """Get a specific boat by ID"""
     boat = next((b for b in BOATS if b["id"] == boat_id), None)
@@ -717,11 +755,13 @@ async def get_boat(boat_id: int):
     return boat
 
 @router.get("/stages")
+@static_catalog
 async def get_all_stages():
     """Get all stages"""
     return {"stages": STAGES, "total": len(STAGES)}
 
 @router.get("/stages/{stage_id}")
+@static_catalog
 async def get_stage(stage_id: int):
     """Get a specific stage"""
     stage = next((s for s in STAGES if s["id"] == stage_id), None)
@@ -730,22 +770,26 @@ async def get_stage(stage_id: int):
     return stage
 
 @router.get("/stages/region/{region_name}")
+@static_catalog
 async def get_stages_by_region(region_name: str):
     """Get all stages in a region"""
     stages = [s for s in STAGES if s["region"].lower() == region_name.lower()]
     return {"stages": stages, "total": len(stages)}
 
 @router.get("/fish")
+@static_catalog
 async def get_all_sea_fish():
     """Get all sea fish"""
     return {"fish": SEA_FISH, "total": len(SEA_FISH)}
 
 @router.get("/supplies")
+@static_catalog
 async def get_all_supplies():
     """Get all available supplies"""
     return SUPPLIES
 
 @router.get("/dangers")
+@static_catalog
 async def get_all_dangers():
     """Get all possible dangers"""
     return SEA_DANGERS
@@ -836,34 +880,25 @@ async def attempt_fishing(request: FishingAttempt):
     
     # Calculate catch
     base_catch = boat["fishing_capacity"] * net_multipliers.get(request.net_size, 1) / 10
-    catch_count = random.randint(int(base_catch * 0.5), int(base_catch * 1.5))
-    
-    # Get available fish for this stage
-    available_fish = [f for f in SEA_FISH if f["min_stage"] <= voyage["current_stage"]]
+    catch_count = randint(CATCH_RNG, int(base_catch * 0.5), int(base_catch * 1.5))
     
+    # One weighted draw per fish in the haul
+    caught_at = datetime.now(timezone.utc).isoformat()
     caught_fish = []
     total_value = 0
     
-    for _ in range(max(1, catch_count)):
-        # Random fish selection weighted by rarity
-        fish_pool = []
-        for fish in available_fish:
-            if random.random() < fish["rarity"] * stage["rewards"]["rare_fish_chance"] * 10:
-                fish_pool.append(fish)
-        
-        if fish_pool:
-            caught = random.choice(fish_pool)
-            fish_entry = {
-                "fish_id": str(uuid.uuid4()),
-                "type_id": caught["id"],
-                "name": caught["name"],
-                "tier": caught["tier"],
-                "value": int(caught["value"] * stage["rewards"]["gold_multiplier"]),
-                "caught_at": datetime.now(timezone.utc).isoformat(),
-                "stage": voyage["current_stage"]
-            }
-            caught_fish.append(fish_entry)
-            total_value += fish_entry["value"]
+    for caught in stage_catch_table(stage).sample(max(1, catch_count), CATCH_RNG):
+        fish_entry = {
+            "fish_id": str(uuid.uuid4()),
+            "type_id": caught["id"],
+            "name": caught["name"],
+            "tier": caught["tier"],
+            "value": int(caught["value"] * stage["rewards"]["gold_multiplier"]),
+            "caught_at": caught_at,
+            "stage": voyage["current_stage"]
+        }
+        caught_fish.append(fish_entry)
+        total_value += fish_entry["value"]
     
     # Update voyage
     await db.voyages.update_one(
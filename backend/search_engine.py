@@ -0,0 +1,215 @@
+# ========== GO FISH! IN-MEMORY SEARCH ENGINE ==========
+# Inverted token index with prefix and trigram lookups for static catalogs
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import math
+import re
+import unicodedata
+
+MAX_PREFIX = 12
+STOPWORDS = frozenset({"a", "an", "and", "the", "of", "in", "on", "to", "for", "with", "is", "it"})
+TITLE_WEIGHT = 3.0
+PREFIX_FACTOR = 0.7
+FUZZY_FACTOR = 0.5
+# Largest page any search endpoint returns
+MAX_RESULTS = 100
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, strip accents, split on anything that isn't a letter or digit"""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+    return [t for t in _TOKEN_RE.findall(text) if t not in STOPWORDS]
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f"${token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, giving up (limit + 1) once it exceeds `limit`"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _max_edits(token: str) -> int:
+    return 0 if len(token) < 4 else 1 if len(token) < 7 else 2
+
+
+@dataclass
+class SearchDoc:
+    kind: str
+    id: str
+    title: str
+    data: Dict[str, Any] = field(repr=False)
+    extra: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+
+@dataclass
+class SearchHit:
+    doc: SearchDoc
+    score: float
+
+
+class SearchIndex:
+    """Ranked catalog search.
+
+    Query tokens match index tokens exactly, by prefix (edge n-grams) or,
+    when nothing else matches, within a small edit distance found through a
+    trigram index. Every query token must match (AND); scores are summed
+    idf-weighted field weights, with title hits counting triple.
+    """
+
+    def __init__(self):
+        self.docs: List[SearchDoc] = []
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._title_postings: Dict[str, Set[int]] = {}
+        self._prefixes: Dict[str, Set[str]] = {}
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._idf: Dict[str, float] = {}
+
+    # ---------- building ----------
+
+    def add(self, kind: str, doc_id: str, title: str, data: Dict[str, Any],
+            text: Iterable[str] = (), **extra):
+        """Index a record by its title plus any extra searchable text"""
+        doc_index = len(self.docs)
+        self.docs.append(SearchDoc(kind, doc_id, title, data, extra))
+
+        weights: Dict[str, float] = {}
+        for token in tokenize(title):
+            weights[token] = weights.get(token, 0) + TITLE_WEIGHT
+            self._title_postings.setdefault(token, set()).add(doc_index)
+        for chunk in text:
+            for token in tokenize(chunk or ""):
+                weights[token] = weights.get(token, 0) + 1.0
+        for token, weight in weights.items():
+            self._postings.setdefault(token, {})[doc_index] = weight
+
+    def build(self) -> "SearchIndex":
+        """Finish indexing: compute idf and the prefix/trigram vocab lookups"""
+        total = len(self.docs)
+        for token, postings in self._postings.items():
+            self._idf[token] = math.log(1 + total / len(postings))
+            for length in range(1, min(len(token), MAX_PREFIX) + 1):
+                self._prefixes.setdefault(token[:length], set()).add(token)
+            for gram in _trigrams(token):
+                self._trigrams.setdefault(gram, set()).add(token)
+        return self
+
+    # ---------- lookups ----------
+
+    def _prefix_tokens(self, prefix: str) -> Set[str]:
+        tokens = self._prefixes.get(prefix[:MAX_PREFIX], set())
+        if len(prefix) > MAX_PREFIX:
+            tokens = {t for t in tokens if t.startswith(prefix)}
+        return tokens
+
+    def _fuzzy_tokens(self, token: str) -> Dict[str, int]:
+        limit = _max_edits(token)
+        if not limit:
+            return {}
+        grams = _trigrams(token)
+        counts: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self._trigrams.get(gram, ()):
+                counts[candidate] = counts.get(candidate, 0) + 1
+        # Each edit destroys at most 3 trigrams
+        needed = len(grams) - 3 * limit
+        matches = {}
+        for candidate, shared in counts.items():
+            if shared >= needed:
+                distance = _edit_distance(token, candidate, limit)
+                if distance <= limit:
+                    matches[candidate] = distance
+        return matches
+
+    def _expand(self, token: str, prefix: bool) -> Dict[str, float]:
+        """Index tokens a query token may stand for, with a score factor each"""
+        expansions = {token: 1.0} if token in self._postings else {}
+        if prefix or not expansions:
+            for candidate in self._prefix_tokens(token):
+                expansions.setdefault(candidate, PREFIX_FACTOR)
+        if not expansions:
+            for candidate, distance in self._fuzzy_tokens(token).items():
+                expansions[candidate] = FUZZY_FACTOR / distance
+        return expansions
+
+    def search(self, query: str, kinds: Optional[Iterable[str]] = None, limit: int = 20,
+               offset: int = 0) -> Tuple[List[SearchHit], int]:
+        """Ranked hits for `query` and the total number of matches"""
+        tokens = tokenize(query)
+        if not tokens:
+            return [], 0
+        kinds = set(kinds) if kinds else None
+
+        scores: Optional[Dict[int, float]] = None
+        for position, token in enumerate(tokens):
+            # Only the word being typed is treated as a prefix of something longer
+            token_scores: Dict[int, float] = {}
+            for candidate, factor in self._expand(token, prefix=position == len(tokens) - 1).items():
+                idf = self._idf.get(candidate, 0.0)
+                for doc_index, weight in self._postings[candidate].items():
+                    score = factor * weight * idf
+                    if score > token_scores.get(doc_index, 0.0):
+                        token_scores[doc_index] = score
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {d: s + token_scores[d] for d, s in scores.items() if d in token_scores}
+            if not scores:
+                return [], 0
+
+        phrase = " ".join(tokens)
+        hits = []
+        for doc_index, score in scores.items():
+            doc = self.docs[doc_index]
+            if kinds is not None and doc.kind not in kinds:
+                continue
+            title = " ".join(tokenize(doc.title))
+            if title == phrase:
+                score *= 2.0
+            elif title.startswith(phrase):
+                score *= 1.5
+            hits.append(SearchHit(doc, score))
+
+        hits.sort(key=lambda h: (-h.score, h.doc.title))
+        return hits[offset:offset + limit], len(hits)
+
+    def autocomplete(self, prefix: str, kinds: Optional[Iterable[str]] = None, limit: int = 10) -> List[SearchDoc]:
+        """Titles whose words start with the typed words, shortest titles first"""
+        tokens = tokenize(prefix)
+        if not tokens:
+            return []
+        kinds = set(kinds) if kinds else None
+
+        candidates: Optional[Set[int]] = None
+        for position, token in enumerate(tokens):
+            if position == len(tokens) - 1:
+                vocab = self._prefix_tokens(token)
+            else:
+                vocab = {token} if token in self._title_postings else set(self._fuzzy_tokens(token))
+            matched: Set[int] = set()
+            for candidate in vocab:
+                matched |= self._title_postings.get(candidate, set())
+            candidates = matched if candidates is None else candidates & matched
+            if not candidates:
+                return []
+
+        docs = [self.docs[i] for i in candidates]
+        if kinds is not None:
+            docs = [d for d in docs if d.kind in kinds]
+        docs.sort(key=lambda d: (len(d.title), d.title))
+        return docs[:limit]
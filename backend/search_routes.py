@@ -0,0 +1,87 @@
+# ========== GO FISH! CATALOG SEARCH API ==========
+# One ranked, typo-tolerant search (and autocomplete) across all static catalogs
+
+from fastapi import APIRouter
+from typing import Optional
+import logging
+import time
+
+from search_engine import SearchIndex, MAX_RESULTS
+from encyclopedia_routes import FISH_DATABASE
+from biotope_achievements_routes import ALL_BIOTOPE_FISH
+from world_map import REGIONS
+from expanded_npcs import PORT_NPCS, CITY_NPCS, PIRATE_HAVEN_NPCS
+from cooking_routes import RECIPES
+from crafting_routes import CRAFTING_RECIPES
+from equipment_routes import FISHING_RODS, FISHING_LINES, BOBBERS
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+
+# ========== INDEX ==========
+
+def build_catalog_index() -> SearchIndex:
+    index = SearchIndex()
+
+    for fish in ALL_BIOTOPE_FISH.values():
+        index.add("fish", fish["id"], fish["name"], fish,
+                  [fish.get("scientific_name", ""), fish.get("description", ""), fish.get("stage", "")])
+    for fish in FISH_DATABASE.values():
+        index.add("encyclopedia_fish", fish["id"], fish["name"], fish,
+                  [fish.get("scientific_name", ""), fish.get("description", "")])
+
+    for region in REGIONS:
+        index.add("region", region["id"], region["name"], region, [region.get("description", "")])
+        for poi in region.get("points_of_interest", []):
+            index.add("poi", poi["id"], poi["name"], poi, [poi.get("type", "")], region=region["id"])
+
+    for location_type, npcs in (("port", PORT_NPCS), ("city", CITY_NPCS), ("pirate_haven", PIRATE_HAVEN_NPCS)):
+        for npc in npcs:
+            index.add("npc", npc["id"], npc["name"], npc,
+                      [npc.get("title", ""), npc.get("role", ""), npc.get("description", "")],
+                      location_type=location_type)
+
+    for recipe in RECIPES.values():
+        index.add("recipe", recipe["id"], recipe["name"], recipe, [recipe.get("description", "")])
+    for recipe in CRAFTING_RECIPES:
+        index.add("crafting_recipe", recipe["id"], recipe["name"], recipe, [recipe.get("description", "")])
+
+    for kind, items in (("rod", FISHING_RODS), ("line", FISHING_LINES), ("bobber", BOBBERS)):
+        for item in items.values():
+            index.add(kind, item["id"], item["name"], item, [item.get("description", ""), item.get("biotope", "")])
+
+    return index.build()
+
+
+_started = time.perf_counter()
+CATALOG_SEARCH = build_catalog_index()
+logger.info(f"Catalog search index: {len(CATALOG_SEARCH.docs)} docs in {(time.perf_counter() - _started) * 1000:.1f}ms")
+
+
+def _kinds(kinds: Optional[str]):
+    return [k.strip() for k in kinds.split(",") if k.strip()] if kinds else None
+
+
+# ========== ENDPOINTS ==========
+
+@router.get("")
+async def search_catalogs(q: str, kinds: Optional[str] = None, limit: int = 20, offset: int = 0):
+    """Ranked search over fish, regions, NPCs, recipes and equipment (`kinds` is comma-separated)"""
+    hits, total = CATALOG_SEARCH.search(q, _kinds(kinds), limit=max(1, min(limit, MAX_RESULTS)), offset=max(0, offset))
+    return {
+        "query": q,
+        "total": total,
+        "results": [
+            {"kind": h.doc.kind, "id": h.doc.id, "title": h.doc.title, "score": round(h.score, 3), **h.doc.extra, "data": h.doc.data}
+            for h in hits
+        ],
+    }
+
+
+@router.get("/autocomplete")
+async def autocomplete(q: str, kinds: Optional[str] = None, limit: int = 10):
+    """Title suggestions for a partially typed query"""
+    docs = CATALOG_SEARCH.autocomplete(q, _kinds(kinds), limit=max(1, min(limit, MAX_RESULTS)))
+    return {"query": q, "suggestions": [{"kind": d.kind, "id": d.id, "title": d.title} for d in docs]}
@@ -1,57 +1,55 @@
 from fastapi import FastAPI, APIRouter, HTTPException
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
-import aiohttp
-from bson import ObjectId
+from pymongo import IndexModel, UpdateOne, ASCENDING, DESCENDING
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
-
-# Helper function to convert MongoDB documents to JSON-safe format
-def serialize_doc(doc):
-    """Convert MongoDB document to JSON-serializable format"""
-    if doc is None:
-        return None
-    if isinstance(doc, list):
-        return [serialize_doc(item) for item in doc]
-    if isinstance(doc, dict):
-        result = {}
-        for key, value in doc.items():
-            if key == '_id':
-                continue  # Skip _id field
-            if isinstance(value, ObjectId):
-                result[key] = str(value)
-            elif isinstance(value, datetime):
-                result[key] = value.isoformat()
-            elif isinstance(value, dict):
-                result[key] = serialize_doc(value)
-            elif isinstance(value, list):
-                result[key] = serialize_doc(value)
-            else:
-                result[key] = value
-        return result
-    if isinstance(doc, ObjectId):
-        return str(doc)
-    if isinstance(doc, datetime):
-        return doc.isoformat()
-    return doc
-
-app = FastAPI()
+# MongoDB connection (shared pool for every router, see database.py)
+from database import db, connect_db, close_db, register_indexes
+from leaderboard_engine import leaderboards
+from user_profiles import invalidate_profile
+from write_behind import stat_writer
+from catch_routes import tacklebox_doc
+from idempotency import insert_new, MAX_BATCH_SIZE
+from pagination import paginate, projection_for
+from weather_service import weather_service
+from catalog_cache import static_catalog, warm_catalogs
+from fast_json import FastJSONResponse
+
+app = FastAPI(default_response_class=FastJSONResponse)
 api_router = APIRouter(prefix="/api")
 
+# ========== INDEXES ==========
+
+register_indexes("users", [
+    IndexModel([("id", ASCENDING)]),
+    IndexModel([("device_id", ASCENDING)]),
+    IndexModel([("username", ASCENDING)]),
+])
+
+register_indexes("scores", [
+    IndexModel([("score", DESCENDING)]),
+    IndexModel([("user_id", ASCENDING)]),
+    # Idempotency key for batched submissions
+    IndexModel([("user_id", ASCENDING), ("client_id", ASCENDING)], unique=True,
+               partialFilterExpression={"client_id": {"$exists": True}}),
+])
+
+register_indexes("tacklebox", [
+    IndexModel([("user_id", ASCENDING), ("caught_at", DESCENDING), ("id", DESCENDING)]),
+    IndexModel([("id", ASCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("client_id", ASCENDING)], unique=True,
+               partialFilterExpression={"client_id": {"$exists": True}}),
+])
+
 
 # ========== GAME MODELS ==========
 class User(BaseModel):
@@ -90,6 +88,23 @@ class ScoreCreate(BaseModel):
     catches: int
     stage: int
 
+class ScoreBatchItem(ScoreCreate):
+    client_id: str  # idempotency key generated by the client
+
+class ScoreBatch(BaseModel):
+    scores: List[ScoreBatchItem]
+
+class TackleboxFish(BaseModel):
+    client_id: str
+    name: Optional[str] = None
+    size: Optional[int] = None
+    points: Optional[int] = None
+    color: Optional[str] = None
+    caught_at: Optional[str] = None
+
+class TackleboxBatch(BaseModel):
+    fish: List[TackleboxFish]
+
 class LurePurchase(BaseModel):
     user_id: str
     lure_id: int
@@ -150,15 +165,13 @@ async def update_high_score(user_id: str, score: int):
         {"id": user_id},
         {"$set": {"high_score": score}}
     )
+    invalidate_profile(user_id)
     return {"success": True}
 
 @api_router.post("/user/{user_id}/increment-catches")
 async def increment_catches(user_id: str, count: int = 1):
-    """Increment total catches"""
-    await db.users.update_one(
-        {"id": user_id},
-        {"$inc": {"total_catches": count}}
-    )
+    """Increment total catches (buffered and flushed in bulk)"""
+    stat_writer.inc("users", user_id, {"total_catches": count}, key_field="id", upsert=False)
     return {"success": True}
 
 @api_router.post("/user/{user_id}/set-level")
@@ -168,6 +181,7 @@ async def set_level(user_id: str, level: int):
         {"id": user_id},
         {"$set": {"level": level}}
     )
+    invalidate_profile(user_id)
     return {"success": True}
 
 @api_router.post("/user/{user_id}/prestige")
@@ -182,6 +196,7 @@ async def prestige_user(user_id: str):
         {"id": user_id},
         {"$set": {"prestige": new_prestige, "level": 1}}
     )
+    invalidate_profile(user_id)
     return {"success": True, "prestige": new_prestige}
 
 @api_router.post("/user/{user_id}/unlock-achievement")
@@ -212,11 +227,34 @@ async def complete_daily(user_id: str):
 
 
 # ========== SCORE ROUTES ==========
+SCORE_BOARD_CAPACITY = 1000
+
+
+def _score_row(score: dict) -> dict:
+    return {
+        "username": score["username"],
+        "score": score["score"],
+        "level": score["level"],
+        "catches": score["catches"],
+        "timestamp": score["timestamp"]
+    }
+
+
+async def load_score_board(board_id: str):
+    """Warm-load the best submitted scores for the global leaderboard"""
+    cursor = db.scores.find({}).sort("score", -1).limit(SCORE_BOARD_CAPACITY)
+    async for s in cursor:
+        yield s.get("id") or str(s["_id"]), s["score"], _score_row(s)
+
+leaderboards.register("scores", load_score_board, capacity=SCORE_BOARD_CAPACITY)
+
+
 @api_router.post("/score", response_model=dict)
 async def create_score(input: ScoreCreate):
     """Submit a new score"""
     score = Score(**input.model_dump())
     await db.scores.insert_one(score.model_dump())
+    leaderboards.record("scores", "global", score.id, score.score, _score_row(score.model_dump()))
     
     # Update user high score if needed
     user = await db.users.find_one({"id": input.user_id}, {"_id": 0})
@@ -225,113 +263,96 @@ async def create_score(input: ScoreCreate):
             {"id": input.user_id},
             {"$set": {"high_score": input.score}}
         )
+        invalidate_profile(input.user_id)
     
     return score.model_dump()
 
+@api_router.post("/score/batch", response_model=dict)
+async def create_scores_batch(batch: ScoreBatch):
+    """Submit queued scores at once; replayed client_ids are ignored"""
+    if len(batch.scores) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch limited to {MAX_BATCH_SIZE} scores")
+    
+    docs = []
+    for item in batch.scores:
+        score = Score(**item.model_dump(exclude={"client_id"}))
+        docs.append({**score.model_dump(), "client_id": item.client_id})
+    inserted = await insert_new("scores", docs)
+    
+    best_by_user = {}
+    for doc in inserted:
+        leaderboards.record("scores", "global", doc["id"], doc["score"], _score_row(doc))
+        best_by_user[doc["user_id"]] = max(doc["score"], best_by_user.get(doc["user_id"], 0))
+    
+    if best_by_user:
+        await db.users.bulk_write([
+            UpdateOne({"id": user_id}, {"$max": {"high_score": best}})
+            for user_id, best in best_by_user.items()
+        ], ordered=False)
+        for user_id in best_by_user:
+            invalidate_profile(user_id)
+    
+    return {
+        "success": True,
+        "inserted": len(inserted),
+        "duplicates": len(docs) - len(inserted),
+        "score_ids": [doc["id"] for doc in inserted],
+    }
+
 @api_router.get("/leaderboard", response_model=List[dict])
 async def get_leaderboard(limit: int = 100):
     """Get top scores (global leaderboard)"""
-    scores = await db.scores.find({}, {"_id": 0}).sort("score", -1).limit(limit).to_list(limit)
-    return [
-        {
-            "username": s["username"],
-            "score": s["score"],
-            "level": s["level"],
-            "catches": s["catches"],
-            "timestamp": s["timestamp"]
-        }
-        for s in scores
-    ]
+    if limit > SCORE_BOARD_CAPACITY:
+        scores = await db.scores.find({}, {"_id": 0}).sort("score", -1).limit(limit).to_list(limit)
+        return FastJSONResponse([_score_row(s) for s in scores])
+    
+    board = await leaderboards.board("scores")
+    return FastJSONResponse([entry.data for entry in board.top(limit)])
 
 
 # ========== WEATHER ROUTES ==========
 @api_router.get("/weather")
 async def get_weather():
-    """Get current weather (cached for 30 min)"""
-    cached = await db.weather.find_one({}, {'_id': 0})
-    if cached:
-        cached_time = datetime.fromisoformat(cached.get("cached_at", "2000-01-01T00:00:00+00:00"))
-        if datetime.now(timezone.utc) - cached_time < timedelta(minutes=30):
-            return {
-                "condition": cached["condition"],
-                "temperature": cached["temperature"],
-                "wind_speed": cached["wind_speed"],
-                "cloud_cover": cached["cloud_cover"],
-                "precipitation": cached["precipitation"]
-            }
-    
-    try:
-        async with aiohttp.ClientSession() as session:
-            url = "https://api.open-meteo.com/v1/forecast"
-            params = {
-                "latitude": 52.52,
-                "longitude": 13.41,
-                "current_weather": "true",
-                "hourly": "precipitation_probability,cloud_cover"
-            }
-            async with session.get(url, params=params) as response:
-                data = await response.json()
-                
-                cw = data.get("current_weather", {})
-                weather_code = cw.get("weathercode", 0)
-                
-                if weather_code < 4:
-                    condition = "clear"
-                elif weather_code < 50:
-                    condition = "cloudy"
-                elif weather_code < 70:
-                    condition = "rain"
-                else:
-                    condition = "storm"
-                
-                weather_data = {
-                    "condition": condition,
-                    "temperature": int(cw.get("temperature", 18)),
-                    "wind_speed": int(cw.get("windspeed", 8)),
-                    "cloud_cover": data.get("hourly", {}).get("cloud_cover", [30])[0],
-                    "precipitation": data.get("hourly", {}).get("precipitation_probability", [0])[0],
-                    "cached_at": datetime.now(timezone.utc).isoformat()
-                }
-                
-                await db.weather.delete_many({})
-                await db.weather.insert_one(weather_data)
-                
-                return {k: v for k, v in weather_data.items() if k != "cached_at"}
-    except Exception as e:
-        logging.error(f"Weather API error: {e}")
-        return {
-            "condition": "clear",
-            "temperature": 18,
-            "wind_speed": 8,
-            "cloud_cover": 30,
-            "precipitation": 0
-        }
+    """Get current weather (served from memory, refreshed in the background)"""
+    return await weather_service.current()
 
 
 # ========== TACKLEBOX ROUTES ==========
 @api_router.post("/tacklebox/{user_id}/add-fish")
 async def add_fish_to_tacklebox(user_id: str, fish: dict):
     """Add caught fish to tacklebox"""
-    fish_doc = {
-        "id": str(uuid.uuid4()),
-        "user_id": user_id,
-        "name": fish.get("name"),
-        "size": fish.get("size"),
-        "points": fish.get("points"),
-        "color": fish.get("color"),
-        "caught_at": datetime.now(timezone.utc).isoformat()
-    }
+    fish_doc = tacklebox_doc(user_id, fish)
     await db.tacklebox.insert_one(fish_doc)
     return {"success": True, "fish_id": fish_doc["id"]}
 
+@api_router.post("/tacklebox/{user_id}/add-fish/batch")
+async def add_fish_batch_to_tacklebox(user_id: str, batch: TackleboxBatch):
+    """Add queued catches at once; replayed client_ids are ignored"""
+    if len(batch.fish) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch limited to {MAX_BATCH_SIZE} fish")
+    
+    docs = [
+        {**tacklebox_doc(user_id, fish.model_dump()), "client_id": fish.client_id}
+        for fish in batch.fish
+    ]
+    inserted = await insert_new("tacklebox", docs)
+    return {
+        "success": True,
+        "inserted": len(inserted),
+        "duplicates": len(docs) - len(inserted),
+        "fish_ids": [doc["id"] for doc in inserted],
+    }
+
+TACKLEBOX_FIELDS = ("id", "name", "size", "points", "color", "caught_at")
+
 @api_router.get("/tacklebox/{user_id}")
-async def get_tacklebox(user_id: str, limit: int = 1000):
-    """Get user's tacklebox (last 1000 fish for performance)"""
-    fish = await db.tacklebox.find(
-        {"user_id": user_id}, 
-        {"_id": 0}
-    ).sort("caught_at", -1).limit(limit).to_list(limit)
-    return {"fish": fish, "count": len(fish)}
+async def get_tacklebox(user_id: str, limit: int = 100, cursor: Optional[str] = None, fields: Optional[str] = None):
+    """Get user's tacklebox, newest first; pass `next_cursor` back to continue"""
+    fish, next_cursor = await paginate(
+        db.tacklebox, {"user_id": user_id}, "caught_at", limit=limit, cursor=cursor,
+        projection=projection_for(fields, TACKLEBOX_FIELDS, ("id", "caught_at")),
+    )
+    return FastJSONResponse({"fish": fish, "count": len(fish), "next_cursor": next_cursor})
 
 
 # ========== DAILY CHALLENGE ==========
@@ -371,6 +392,7 @@ ACHIEVEMENTS = [
 ]
 
 @api_router.get("/achievements")
+@static_catalog
 async def get_achievements():
     """Get all available achievements"""
     return {"achievements": ACHIEVEMENTS}
@@ -419,6 +441,11 @@ from sea_voyage_routes import router as sea_voyage_router
 from npc_dialogue_routes import router as npc_dialogue_router
 from letter_bottle_routes import router as letter_bottle_router
 
+# Catch ingestion (write-behind stat counters)
+from catch_routes import router as catch_router
+from catalog_routes import router as catalog_router
+from search_routes import router as search_router
+
 app.include_router(api_router)
 
 # Include all new routes
@@ -439,6 +466,11 @@ app.include_router(sea_voyage_router)
 app.include_router(npc_dialogue_router)
 app.include_router(letter_bottle_router)
 
+# Include catch ingestion routes
+app.include_router(catch_router)
+app.include_router(catalog_router)
+app.include_router(search_router)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -453,6 +485,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def startup_db_client():
+    await connect_db(app)
+    stat_writer.start()
+    await weather_service.start()
+    await warm_catalogs()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    await weather_service.stop()
+    await stat_writer.stop()
+    await close_db(app)
@@ -13,17 +13,22 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timezone
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
+from database import db, register_indexes
+from catalog_cache import static_catalog
+from pymongo import IndexModel, ASCENDING
 import uuid
 import random
 
 router = APIRouter(prefix="/api/ship", tags=["ship"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'test_database')]
+# ============================================================================
+# INDEXES
+# ============================================================================
+
+register_indexes("ship_crew", [
+    IndexModel([("user_id", ASCENDING), ("ship_id", ASCENDING), ("role", ASCENDING)]),
+    IndexModel([("crew_id", ASCENDING), ("user_id", ASCENDING)]),
+])
 
 # ============================================================================
 # SHIP CREW NPCs
@@ -296,11 +301,13 @@ class SellFishRequest(BaseModel):
 # ============================================================================
 
 @router.get("/crew-types")
+@static_catalog
 async def get_crew_types():
     """Get all available crew types"""
     return {"crew_types": SHIP_CREW_TYPES}
 
 @router.get("/stores")
+@static_catalog
 async def get_store_types():
     """Get all store types"""
     return {"stores": STORE_TYPES}
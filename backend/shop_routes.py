@@ -3,21 +3,32 @@
 # ~500+ lines of backend polish
 
 from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import db, register_indexes
+from catalog_cache import static_catalog
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 import uuid
-import os
 import random
 import hashlib
 
 router = APIRouter(prefix="/api/shop", tags=["shop"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("player_inventory", [
+    IndexModel([("user_id", ASCENDING)]),
+])
+
+register_indexes("daily_deals", [
+    IndexModel([("user_id", ASCENDING), ("date", ASCENDING)]),
+])
+
+register_indexes("purchases", [
+    IndexModel([("user_id", ASCENDING), ("purchased_at", DESCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("product_id", ASCENDING), ("type", ASCENDING)]),
+])
 
 
 # ========== SHOP ITEMS DATABASE ==========
@@ -411,6 +422,7 @@ async def get_shop_items(user_id: Optional[str] = None):
 
 
 @router.get("/currency")
+@static_catalog
 async def get_currency_packs():
     """Get all currency purchase options"""
     return {"currency_packs": CURRENCY_PACKS}
@@ -2,19 +2,58 @@
 # Friend system, gifts, and social interactions
 
 from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import db, register_indexes
+from catalog_cache import static_catalog
+from user_profiles import resolve_profiles
+from pagination import paginate, projection_for, decode_cursor, encode_cursor
+from fast_json import FastJSONResponse
+from pymongo import IndexModel, UpdateOne, ASCENDING, DESCENDING
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
-import uuid
 import os
+import uuid
 
 router = APIRouter(prefix="/api/social", tags=["social"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("friendships", [
+    IndexModel([("id", ASCENDING)]),
+    IndexModel([("user_id_1", ASCENDING), ("user_id_2", ASCENDING)]),
+    IndexModel([("user_id_2", ASCENDING), ("user_id_1", ASCENDING)]),
+])
+
+register_indexes("friend_requests", [
+    IndexModel([("id", ASCENDING)]),
+    IndexModel([("to_user_id", ASCENDING), ("status", ASCENDING)]),
+    IndexModel([("from_user_id", ASCENDING), ("status", ASCENDING)]),
+])
+
+register_indexes("gifts", [
+    IndexModel([("id", ASCENDING)]),
+    IndexModel([("to_user_id", ASCENDING), ("status", ASCENDING), ("expires_at", ASCENDING)]),
+    IndexModel([("from_user_id", ASCENDING), ("created_at", ASCENDING)]),
+])
+
+register_indexes("notifications", [
+    IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("is_read", ASCENDING)]),
+    IndexModel([("id", ASCENDING), ("user_id", ASCENDING)]),
+])
+
+register_indexes("activity_feed", [
+    IndexModel([("id", ASCENDING)]),
+    IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+])
+
+register_indexes("feed_inboxes", [
+    IndexModel([("user_id", ASCENDING)], unique=True),
+])
+
+register_indexes("feed_publishers", [
+    IndexModel([("user_id", ASCENDING)], unique=True),
+])
 
 
 # ========== GIFT CONFIGURATIONS ==========
@@ -160,6 +199,7 @@ async def accept_friend_request(request: AcceptFriendRequest):
     }
     
     await db.friendships.insert_one(friendship)
+    await link_feed_inboxes(friendship["user_id_1"], friendship["user_id_2"])
     
     # Update request status
     await db.friend_requests.update_one(
@@ -204,11 +244,14 @@ async def get_friends(user_id: str):
         ]
     }, {"_id": 0}).to_list(100)
     
+    friend_ids = [fs["user_id_2"] if fs["user_id_1"] == user_id else fs["user_id_1"] for fs in friendships]
+    profiles = await resolve_profiles(friend_ids)
+    
     friends = []
-    for fs in friendships:
-        friend_id = fs["user_id_2"] if fs["user_id_1"] == user_id else fs["user_id_1"]
-        friend_user = await db.users.find_one({"id": friend_id}, {"_id": 0, "id": 1, "username": 1, "level": 1, "high_score": 1})
-        if friend_user:
+    for fs, friend_id in zip(friendships, friend_ids):
+        profile = profiles.get(friend_id)
+        if profile:
+            friend_user = dict(profile)
             friend_user["friendship_level"] = fs["friendship_level"]
             friend_user["friendship_id"] = fs["id"]
             friend_user["gifts_exchanged"] = fs["gifts_sent"] + fs["gifts_received"]
@@ -230,12 +273,14 @@ async def remove_friend(user_id: str, friend_id: str):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Friendship not found")
     
+    await unlink_feed_inboxes(user_id, friend_id)
     return {"success": True}
 
 
 # ========== GIFT SYSTEM ==========
 
 @router.get("/gifts/types")
+@static_catalog
 async def get_gift_types():
     """Get available gift types"""
     return {"gift_types": GIFT_TYPES}
@@ -514,33 +559,175 @@ async def get_player_profile(user_id: str, viewer_id: str = None):
 
 
 # ========== ACTIVITY FEED ==========
+# Fan-out on write: each post is pushed to a capped inbox document per friend,
+# so opening the feed is one indexed fetch. Authors with more friends than
+# FEED_FANOUT_LIMIT are not fanned out; readers pull their posts instead.
 
-@router.get("/feed/{user_id}")
-async def get_activity_feed(user_id: str, limit: int = 20):
-    """Get activity feed from friends"""
-    # Get friends list
+ACTIVITY_FIELDS = ("id", "user_id", "username", "activity_type", "content", "likes", "liked_by", "created_at")
+
+FEED_MODE = os.environ.get('FEED_MODE', 'fanout')  # "fanout" or "pull"
+FEED_INBOX_SIZE = int(os.environ.get('FEED_INBOX_SIZE', 500))
+FEED_FANOUT_LIMIT = int(os.environ.get('FEED_FANOUT_LIMIT', 1000))
+
+
+async def get_friend_ids(user_id: str, limit: Optional[int] = 100) -> List[str]:
     friendships = await db.friendships.find({
         "$or": [
             {"user_id_1": user_id},
             {"user_id_2": user_id}
         ]
-    }, {"_id": 0}).to_list(100)
+    }, {"_id": 0, "user_id_1": 1, "user_id_2": 1}).to_list(limit)
     
-    friend_ids = []
-    for fs in friendships:
-        friend_id = fs["user_id_2"] if fs["user_id_1"] == user_id else fs["user_id_1"]
-        friend_ids.append(friend_id)
+    return [fs["user_id_2"] if fs["user_id_1"] == user_id else fs["user_id_1"] for fs in friendships]
+
+
+def _inbox_entry(activity: dict) -> dict:
+    return {"id": activity["id"], "user_id": activity["user_id"], "created_at": activity["created_at"]}
+
+
+async def _pull_publishers(user_ids: List[str]) -> List[str]:
+    """High-fanout authors among `user_ids`, whose posts readers pull"""
+    publishers = await db.feed_publishers.find(
+        {"user_id": {"$in": user_ids}}, {"_id": 0, "user_id": 1}
+    ).to_list(None)
+    return [p["user_id"] for p in publishers]
+
+
+async def materialize_inbox(user_id: str) -> dict:
+    """Build a missing inbox from friends' recent activity (first feed open)"""
+    friend_ids = await get_friend_ids(user_id, limit=None)
+    pull_from = await _pull_publishers(friend_ids) if friend_ids else []
+    push_from = [f for f in friend_ids if f not in set(pull_from)]
+    
+    recent = []
+    if push_from:
+        recent = await db.activity_feed.find(
+            {"user_id": {"$in": push_from}},
+            {"_id": 0, "id": 1, "user_id": 1, "created_at": 1}
+        ).sort([("created_at", -1), ("id", -1)]).limit(FEED_INBOX_SIZE).to_list(FEED_INBOX_SIZE)
     
+    inbox = {"user_id": user_id, "items": recent, "pull_from": pull_from}
+    # $setOnInsert keeps an inbox a concurrent request already built
+    await db.feed_inboxes.update_one({"user_id": user_id}, {"$setOnInsert": inbox}, upsert=True)
+    return inbox
+
+
+async def fan_out_activity(activity: dict):
+    """Push a new activity to every friend's inbox, or switch the author to pull mode"""
+    friend_ids = await get_friend_ids(activity["user_id"], limit=None)
     if not friend_ids:
-        return {"feed": []}
+        return
+    
+    if len(friend_ids) > FEED_FANOUT_LIMIT:
+        result = await db.feed_publishers.update_one(
+            {"user_id": activity["user_id"]},
+            {"$setOnInsert": {"user_id": activity["user_id"], "since": activity["created_at"]}},
+            upsert=True
+        )
+        if result.upserted_id is not None:
+            await db.feed_inboxes.update_many(
+                {"user_id": {"$in": friend_ids}},
+                {"$addToSet": {"pull_from": activity["user_id"]}}
+            )
+        return
+    
+    # Inboxes that don't exist yet are materialized on their first read
+    entry = _inbox_entry(activity)
+    await db.feed_inboxes.bulk_write([
+        UpdateOne({"user_id": friend_id}, {"$push": {"items": {
+            "$each": [entry],
+            "$sort": {"created_at": -1, "id": -1},
+            "$slice": FEED_INBOX_SIZE,
+        }}})
+        for friend_id in friend_ids
+    ], ordered=False)
+
+
+async def link_feed_inboxes(user_a: str, user_b: str):
+    """Seed two new friends' inboxes with each other's activity"""
+    for reader, author in ((user_a, user_b), (user_b, user_a)):
+        if await db.feed_publishers.find_one({"user_id": author}, {"_id": 1}):
+            await db.feed_inboxes.update_one({"user_id": reader}, {"$addToSet": {"pull_from": author}})
+            continue
+        recent = await db.activity_feed.find(
+            {"user_id": author}, {"_id": 0, "id": 1, "user_id": 1, "created_at": 1}
+        ).sort([("created_at", -1), ("id", -1)]).limit(FEED_INBOX_SIZE).to_list(FEED_INBOX_SIZE)
+        if recent:
+            await db.feed_inboxes.update_one({"user_id": reader}, {"$push": {"items": {
+                "$each": recent,
+                "$sort": {"created_at": -1, "id": -1},
+                "$slice": FEED_INBOX_SIZE,
+            }}})
+
+
+async def unlink_feed_inboxes(user_a: str, user_b: str):
+    for reader, author in ((user_a, user_b), (user_b, user_a)):
+        await db.feed_inboxes.update_one(
+            {"user_id": reader},
+            {"$pull": {"items": {"user_id": author}, "pull_from": author}}
+        )
+
+
+def _before(entry: dict, cursor: Optional[tuple]) -> bool:
+    return cursor is None or (entry["created_at"], entry["id"]) < cursor
+
+
+async def _inbox_feed(user_id: str, limit: int, cursor: Optional[str], projection: dict):
+    inbox = await db.feed_inboxes.find_one({"user_id": user_id}, {"_id": 0})
+    if inbox is None:
+        inbox = await materialize_inbox(user_id)
+    
+    position = decode_cursor(cursor) if cursor else None
+    entries = [e for e in inbox.get("items", []) if _before(e, position)][:limit + 1]
+    
+    if inbox.get("pull_from"):
+        query = {"user_id": {"$in": inbox["pull_from"]}}
+        if position:
+            query["$or"] = [
+                {"created_at": {"$lt": position[0]}},
+                {"created_at": position[0], "id": {"$lt": position[1]}},
+            ]
+        pulled = await db.activity_feed.find(
+            query, {"_id": 0, "id": 1, "user_id": 1, "created_at": 1}
+        ).sort([("created_at", -1), ("id", -1)]).limit(limit + 1).to_list(limit + 1)
+        entries = sorted(entries + pulled, key=lambda e: (e["created_at"], e["id"]), reverse=True)[:limit + 1]
+    
+    next_cursor = None
+    if len(entries) > limit:
+        entries = entries[:limit]
+        next_cursor = encode_cursor(entries[-1]["created_at"], entries[-1]["id"])
+    
+    if not entries:
+        return [], next_cursor
+    docs = await db.activity_feed.find(
+        {"id": {"$in": [e["id"] for e in entries]}}, projection
+    ).to_list(len(entries))
+    by_id = {doc["id"]: doc for doc in docs}
+    return [by_id[e["id"]] for e in entries if e["id"] in by_id], next_cursor
+
+
+@router.get("/feed/{user_id}")
+async def get_activity_feed(user_id: str, limit: int = 20, cursor: Optional[str] = None, fields: Optional[str] = None):
+    """Get activity feed from friends; pass `next_cursor` back to continue"""
+    projection = projection_for(fields, ACTIVITY_FIELDS, ("id", "created_at"))
+    
+    if FEED_MODE == "fanout":
+        activities, next_cursor = await _inbox_feed(user_id, max(1, min(limit, FEED_INBOX_SIZE)), cursor, projection)
+        return FastJSONResponse({"feed": activities, "next_cursor": next_cursor})
+    
+    # Get friends list
+    friend_ids = await get_friend_ids(user_id)
+    
+    if not friend_ids:
+        return {"feed": [], "next_cursor": None}
     
     # Get recent activities from friends
-    activities = await db.activity_feed.find(
-        {"user_id": {"$in": friend_ids}},
-        {"_id": 0}
-    ).sort("created_at", -1).limit(limit).to_list(limit)
+    activities, next_cursor = await paginate(
+        db.activity_feed, {"user_id": {"$in": friend_ids}}, "created_at", limit=limit, cursor=cursor,
+        projection=projection,
+    )
     
-    return {"feed": activities}
+    return FastJSONResponse({"feed": activities, "next_cursor": next_cursor})
 
 
 @router.post("/activity/post")
@@ -563,6 +750,8 @@ async def post_activity(
     }
     
     await db.activity_feed.insert_one(activity)
+    if FEED_MODE == "fanout":
+        await fan_out_activity(activity)
     return {"success": True, "activity": {k: v for k, v in activity.items() if k != "_id"}}
 
 
@@ -591,24 +780,30 @@ async def like_activity(activity_id: str, user_id: str):
 
 # ========== NOTIFICATIONS ==========
 
+NOTIFICATION_FIELDS = (
+    "id", "user_id", "notification_type", "title", "message", "icon",
+    "action_type", "action_data", "is_read", "created_at",
+)
+
 @router.get("/notifications/{user_id}")
-async def get_notifications(user_id: str, limit: int = 50, unread_only: bool = False):
-    """Get user notifications"""
+async def get_notifications(user_id: str, limit: int = 50, unread_only: bool = False,
+                            cursor: Optional[str] = None, fields: Optional[str] = None):
+    """Get user notifications, newest first; pass `next_cursor` back to continue"""
     query = {"user_id": user_id}
     if unread_only:
         query["is_read"] = False
     
-    notifications = await db.notifications.find(
-        query,
-        {"_id": 0}
-    ).sort("created_at", -1).limit(limit).to_list(limit)
+    notifications, next_cursor = await paginate(
+        db.notifications, query, "created_at", limit=limit, cursor=cursor,
+        projection=projection_for(fields, NOTIFICATION_FIELDS, ("id", "created_at")),
+    )
     
     unread_count = await db.notifications.count_documents({
         "user_id": user_id,
         "is_read": False
     })
     
-    return {"notifications": notifications, "unread_count": unread_count}
+    return FastJSONResponse({"notifications": notifications, "unread_count": unread_count, "next_cursor": next_cursor})
 
 
 @router.post("/notifications/{notification_id}/read")
@@ -1,20 +1,40 @@
 # ========== GO FISH! TOURNAMENT SYSTEM API ==========
 # Competitive fishing tournaments with rewards and rankings
 
-from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi import APIRouter, BackgroundTasks, HTTPException
+from database import db, register_indexes
+from leaderboard_engine import leaderboards
+from pymongo import IndexModel, ASCENDING, DESCENDING, ReturnDocument, UpdateOne
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 import uuid
 import os
+import logging
 
 router = APIRouter(prefix="/api/tournaments", tags=["tournaments"])
+logger = logging.getLogger(__name__)
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("tournaments", [
+    IndexModel([("id", ASCENDING)]),
+    IndexModel([("status", ASCENDING), ("end_time", ASCENDING)]),
+    IndexModel([("status", ASCENDING), ("start_time", ASCENDING)]),
+    IndexModel([("tournament_type", ASCENDING), ("created_at", DESCENDING)]),
+])
+
+register_indexes("tournament_entries", [
+    IndexModel([("tournament_id", ASCENDING), ("score", DESCENDING)]),
+    IndexModel([("tournament_id", ASCENDING), ("score", DESCENDING), ("biggest_fish", DESCENDING), ("id", ASCENDING)]),
+    IndexModel([("tournament_id", ASCENDING), ("user_id", ASCENDING)]),
+    IndexModel([("id", ASCENDING)]),
+])
+
+register_indexes("tournament_results", [
+    IndexModel([("user_id", ASCENDING), ("tournament_id", DESCENDING)]),
+    IndexModel([("tournament_id", ASCENDING), ("user_id", ASCENDING)]),
+])
 
 
 # ========== REQUEST/RESPONSE MODELS ==========
@@ -118,21 +138,42 @@ async def get_tournament(tournament_id: str):
     return tournament
 
 
+# ========== TOURNAMENT LEADERBOARD ==========
+
+def _entry_score(entry: dict) -> tuple:
+    """Board ordering: score, then biggest fish (same as finalization)"""
+    return (entry.get("score", 0), entry.get("biggest_fish", 0))
+
+
+async def load_tournament_board(tournament_id: str):
+    """Stream a tournament's entries into its ranked board"""
+    cursor = db.tournament_entries.find({"tournament_id": tournament_id}, {"_id": 0})
+    async for entry in cursor:
+        yield entry["user_id"], _entry_score(entry), entry
+
+leaderboards.register("tournament", load_tournament_board)
+
+
 @router.get("/{tournament_id}/leaderboard")
 async def get_tournament_leaderboard(tournament_id: str, limit: int = 100):
     """Get tournament leaderboard"""
-    entries = await db.tournament_entries.find(
-        {"tournament_id": tournament_id},
-        {"_id": 0}
-    ).sort("score", -1).limit(limit).to_list(limit)
-    
-    # Add ranks
-    for i, entry in enumerate(entries):
-        entry["rank"] = i + 1
+    board = await leaderboards.board("tournament", tournament_id)
+    entries = [{**e.data, "rank": e.rank} for e in board.top(limit)]
     
     return {"leaderboard": entries}
 
 
+@router.get("/{tournament_id}/around/{user_id}")
+async def get_tournament_around_me(tournament_id: str, user_id: str, radius: int = 5):
+    """Get the leaderboard window around a player"""
+    board = await leaderboards.board("tournament", tournament_id)
+    if user_id not in board:
+        raise HTTPException(status_code=404, detail="Not participating in this tournament")
+    
+    entries = [{**e.data, "rank": e.rank} for e in board.around(user_id, radius)]
+    return {"leaderboard": entries, "total_participants": len(board)}
+
+
 # ========== TOURNAMENT PARTICIPATION ==========
 
 @router.post("/{tournament_id}/join")
@@ -187,6 +228,8 @@ async def join_tournament(tournament_id: str, request: JoinTournamentRequest):
     }
     
     await db.tournament_entries.insert_one(entry)
+    entry.pop("_id", None)
+    leaderboards.record("tournament", tournament_id, request.user_id, _entry_score(entry), entry)
     
     # Update participant count
     await db.tournaments.update_one(
@@ -235,18 +278,17 @@ async def update_tournament_score(tournament_id: str, request: UpdateScoreReques
         }
     }
     
-    await db.tournament_entries.update_one(
+    updated_entry = await db.tournament_entries.find_one_and_update(
         {"id": entry["id"]},
-        update_data
+        update_data,
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
     )
     
-    # Get updated entry with rank
-    updated_entry = await db.tournament_entries.find_one({"id": entry["id"]}, {"_id": 0})
-    rank_count = await db.tournament_entries.count_documents({
-        "tournament_id": tournament_id,
-        "score": {"$gt": updated_entry["score"]}
-    })
-    updated_entry["rank"] = rank_count + 1
+    # Rank from the in-memory board: players with a strictly higher score
+    board = await leaderboards.board("tournament", tournament_id)
+    leaderboards.record("tournament", tournament_id, request.user_id, _entry_score(updated_entry), updated_entry)
+    updated_entry["rank"] = board.count_above((updated_entry["score"],)) + 1
     
     return {"success": True, "entry": updated_entry}
 
@@ -263,48 +305,62 @@ async def get_my_tournament_entry(tournament_id: str, user_id: str):
         return {"joined": False}
     
     # Calculate rank
-    rank_count = await db.tournament_entries.count_documents({
-        "tournament_id": tournament_id,
-        "score": {"$gt": entry["score"]}
-    })
-    entry["rank"] = rank_count + 1
-    
-    total = await db.tournament_entries.count_documents({"tournament_id": tournament_id})
-    entry["total_participants"] = total
+    board = await leaderboards.board("tournament", tournament_id)
+    entry["rank"] = board.count_above((entry["score"],)) + 1
+    entry["total_participants"] = len(board)
     
     return {"joined": True, "entry": entry}
 
 
 # ========== TOURNAMENT COMPLETION ==========
 
-@router.post("/{tournament_id}/finalize")
-async def finalize_tournament(tournament_id: str):
-    """Finalize tournament and distribute rewards"""
-    tournament = await db.tournaments.find_one({"id": tournament_id}, {"_id": 0})
-    if not tournament:
-        raise HTTPException(status_code=404, detail="Tournament not found")
-    
-    if tournament["status"] == "ended":
-        raise HTTPException(status_code=400, detail="Tournament already finalized")
-    
-    # Get final leaderboard
-    entries = await db.tournament_entries.find(
-        {"tournament_id": tournament_id},
-        {"_id": 0}
-    ).sort([("score", -1), ("biggest_fish", -1)]).to_list(None)
-    
-    # Create results and assign rewards
-    results = []
-    for rank, entry in enumerate(entries, 1):
-        # Find applicable reward tier
-        reward = {}
-        trophy = "participation"
-        for tier in tournament["reward_tiers"]:
-            if tier["rank_min"] <= rank <= tier["rank_max"]:
-                reward = tier["rewards"]
-                trophy = tier.get("trophy_type", "participation")
-                break
-        
+FINALIZE_CHUNK_SIZE = int(os.environ.get('TOURNAMENT_FINALIZE_CHUNK_SIZE', 500))
+# A "finalizing" tournament whose checkpoint hasn't moved for this long is
+# treated as crashed and may be resumed by another finalize call.
+FINALIZE_STALE_SECONDS = int(os.environ.get('TOURNAMENT_FINALIZE_STALE_SECONDS', 300))
+FINAL_ORDER = [("score", -1), ("biggest_fish", -1), ("id", 1)]
+
+_finalizing_jobs: set = set()
+
+
+def build_rank_tier_table(reward_tiers: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+    """Index tiers by rank so each entry's reward is a list lookup (first matching tier wins)"""
+    max_rank = max((tier["rank_max"] for tier in reward_tiers), default=0)
+    table: List[Optional[Dict[str, Any]]] = [None] * (max_rank + 1)
+    for tier in reward_tiers:
+        for rank in range(max(tier["rank_min"], 1), tier["rank_max"] + 1):
+            if table[rank] is None:
+                table[rank] = tier
+    return table
+
+
+def _after_checkpoint(last_key: List[Any]) -> Dict[str, Any]:
+    """Filter for entries ordered strictly after `last_key` in FINAL_ORDER"""
+    score, biggest_fish, entry_id = last_key
+    return {"$or": [
+        {"score": {"$lt": score}},
+        {"score": score, "biggest_fish": {"$lt": biggest_fish}},
+        {"score": score, "biggest_fish": biggest_fish, "id": {"$gt": entry_id}},
+    ]}
+
+
+def _reward_update(tournament_id: str, reward: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    inc = {currency: reward[currency] for currency in ("coins", "gems") if currency in reward}
+    if not inc:
+        return None
+    # The paid-marker makes the grant idempotent if a chunk is replayed after a crash
+    return {
+        "$inc": inc,
+        "$push": {"tournament_rewards_paid": {"$each": [tournament_id], "$slice": -50}}
+    }
+
+
+async def _finalize_chunk(tournament_id: str, tier_table: List[Optional[Dict[str, Any]]],
+                          entries: List[Dict[str, Any]], first_rank: int):
+    result_ops, reward_ops = [], []
+    for rank, entry in enumerate(entries, first_rank):
+        tier = tier_table[rank] if rank < len(tier_table) else None
+        reward = tier["rewards"] if tier else {}
         result = {
             "tournament_id": tournament_id,
             "user_id": entry["user_id"],
@@ -313,34 +369,146 @@ async def finalize_tournament(tournament_id: str):
             "final_score": entry["score"],
             "rewards_claimed": False,
             "rewards": reward,
-            "trophy": trophy
+            "trophy": tier.get("trophy_type", "participation") if tier else "participation"
         }
-        results.append(result)
+        result_ops.append(UpdateOne(
+            {"tournament_id": tournament_id, "user_id": entry["user_id"]},
+            {"$setOnInsert": result},
+            upsert=True
+        ))
         
-        # Award rewards to user
-        if reward:
-            update_ops = {}
-            if "coins" in reward:
-                update_ops["$inc"] = update_ops.get("$inc", {})
-                update_ops["$inc"]["coins"] = reward["coins"]
-            if "gems" in reward:
-                update_ops["$inc"] = update_ops.get("$inc", {})
-                update_ops["$inc"]["gems"] = reward["gems"]
-            
-            if update_ops:
-                await db.users.update_one({"id": entry["user_id"]}, update_ops)
-    
-    # Save results
-    if results:
-        await db.tournament_results.insert_many(results)
-    
-    # Update tournament status
+        update = _reward_update(tournament_id, reward)
+        if update:
+            reward_ops.append(UpdateOne(
+                {"id": entry["user_id"], "tournament_rewards_paid": {"$ne": tournament_id}},
+                update
+            ))
+    
+    await db.tournament_results.bulk_write(result_ops, ordered=False)
+    if reward_ops:
+        await db.users.bulk_write(reward_ops, ordered=False)
+
+
+async def _save_checkpoint(tournament_id: str, processed: int, last_entry: Dict[str, Any]):
     await db.tournaments.update_one(
         {"id": tournament_id},
-        {"$set": {"status": "ended", "final_leaderboard": entries[:100]}}
+        {"$set": {"finalize_checkpoint": {
+            "processed": processed,
+            "last_key": [last_entry["score"], last_entry.get("biggest_fish", 0), last_entry["id"]],
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }}}
+    )
+
+
+async def run_finalization(tournament_id: str):
+    """Stream entries in rank order, writing results and rewards chunk by chunk.
+
+    Progress is checkpointed on the tournament after every chunk, so a run
+    that dies midway resumes from the last completed chunk.
+    """
+    _finalizing_jobs.add(tournament_id)
+    try:
+        tournament = await db.tournaments.find_one({"id": tournament_id}, {"_id": 0})
+        tier_table = build_rank_tier_table(tournament.get("reward_tiers", []))
+        checkpoint = tournament.get("finalize_checkpoint", {})
+        processed = checkpoint.get("processed", 0)
+        
+        query = {"tournament_id": tournament_id}
+        if checkpoint.get("last_key"):
+            query.update(_after_checkpoint(checkpoint["last_key"]))
+        
+        cursor = db.tournament_entries.find(query, {"_id": 0}).sort(FINAL_ORDER).batch_size(FINALIZE_CHUNK_SIZE)
+        chunk = []
+        async for entry in cursor:
+            chunk.append(entry)
+            if len(chunk) < FINALIZE_CHUNK_SIZE:
+                continue
+            await _finalize_chunk(tournament_id, tier_table, chunk, processed + 1)
+            processed += len(chunk)
+            await _save_checkpoint(tournament_id, processed, chunk[-1])
+            chunk = []
+        
+        if chunk:
+            await _finalize_chunk(tournament_id, tier_table, chunk, processed + 1)
+            processed += len(chunk)
+            await _save_checkpoint(tournament_id, processed, chunk[-1])
+        
+        final_leaderboard = await db.tournament_entries.find(
+            {"tournament_id": tournament_id},
+            {"_id": 0}
+        ).sort(FINAL_ORDER).limit(100).to_list(100)
+        
+        await db.tournaments.update_one(
+            {"id": tournament_id},
+            {"$set": {
+                "status": "ended",
+                "final_leaderboard": final_leaderboard,
+                "results_count": processed,
+                "finalized_at": datetime.now(timezone.utc).isoformat()
+            }}
+        )
+        leaderboards.invalidate("tournament", tournament_id)
+        logger.info("Tournament %s finalized (%d results)", tournament_id, processed)
+    except Exception as e:
+        logger.error(f"Tournament {tournament_id} finalization failed: {e}")
+    finally:
+        _finalizing_jobs.discard(tournament_id)
+
+
+@router.post("/{tournament_id}/finalize")
+async def finalize_tournament(tournament_id: str, background_tasks: BackgroundTasks):
+    """Finalize tournament and distribute rewards (runs as a background job)"""
+    tournament = await db.tournaments.find_one({"id": tournament_id}, {"_id": 0})
+    if not tournament:
+        raise HTTPException(status_code=404, detail="Tournament not found")
+    
+    if tournament["status"] == "ended":
+        raise HTTPException(status_code=400, detail="Tournament already finalized")
+    
+    if tournament_id in _finalizing_jobs:
+        return {"success": True, "status": "finalizing"}
+    
+    # Claim the job; a stale "finalizing" tournament is a crashed run to resume
+    stale_before = (datetime.now(timezone.utc) - timedelta(seconds=FINALIZE_STALE_SECONDS)).isoformat()
+    claimed = await db.tournaments.find_one_and_update(
+        {
+            "id": tournament_id,
+            "$or": [
+                {"status": {"$nin": ["ended", "finalizing"]}},
+                {"status": "finalizing", "finalize_checkpoint.updated_at": {"$lt": stale_before}},
+            ]
+        },
+        {"$set": {
+            "status": "finalizing",
+            "finalize_checkpoint.updated_at": datetime.now(timezone.utc).isoformat()
+        }},
+        projection={"_id": 0, "finalize_checkpoint": 1}
+    )
+    if not claimed:
+        raise HTTPException(status_code=409, detail="Tournament finalization already in progress")
+    
+    background_tasks.add_task(run_finalization, tournament_id)
+    
+    resumed_from = claimed.get("finalize_checkpoint", {}).get("processed", 0)
+    return {"success": True, "status": "finalizing", "resumed_from": resumed_from}
+
+
+@router.get("/{tournament_id}/finalize/status")
+async def get_finalization_status(tournament_id: str):
+    """Get progress of a tournament finalization job"""
+    tournament = await db.tournaments.find_one(
+        {"id": tournament_id},
+        {"_id": 0, "status": 1, "finalize_checkpoint": 1, "results_count": 1}
     )
+    if not tournament:
+        raise HTTPException(status_code=404, detail="Tournament not found")
     
-    return {"success": True, "results_count": len(results)}
+    checkpoint = tournament.get("finalize_checkpoint", {})
+    return {
+        "status": tournament["status"],
+        "processed": tournament.get("results_count", checkpoint.get("processed", 0)),
+        "updated_at": checkpoint.get("updated_at")
+    }
 
 
 @router.get("/{tournament_id}/results/{user_id}")
@@ -0,0 +1,65 @@
+# ========== GO FISH! USER PROFILE RESOLVER ==========
+# Batched id -> display fields lookups for decorating leaderboard/list rows
+
+from database import db
+from typing import Any, Dict, Iterable, List, Optional
+import os
+import time
+
+# Display fields served from the cache. Kept small so entries stay cheap.
+PROFILE_FIELDS = ("id", "username", "level", "high_score")
+PROFILE_TTL_SECONDS = float(os.environ.get('PROFILE_CACHE_TTL_SECONDS', 30))
+PROFILE_CACHE_SIZE = int(os.environ.get('PROFILE_CACHE_SIZE', 10000))
+
+_cache: Dict[str, tuple] = {}  # user_id -> (expires_at, profile or None)
+
+
+def _cache_put(user_id: str, profile: Optional[Dict[str, Any]], now: float):
+    if len(_cache) >= PROFILE_CACHE_SIZE:
+        # Evict expired entries first, then the oldest insertions
+        for key in [k for k, (expires, _) in _cache.items() if expires <= now]:
+            del _cache[key]
+        while len(_cache) >= PROFILE_CACHE_SIZE:
+            del _cache[next(iter(_cache))]
+    _cache[user_id] = (now + PROFILE_TTL_SECONDS, profile)
+
+
+async def resolve_profiles(user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Resolve many users in one `$in` query; unknown ids are omitted"""
+    now = time.monotonic()
+    profiles: Dict[str, Dict[str, Any]] = {}
+    missing: List[str] = []
+
+    for user_id in dict.fromkeys(user_ids):
+        cached = _cache.get(user_id)
+        if cached is not None and cached[0] > now:
+            if cached[1] is not None:
+                profiles[user_id] = cached[1]
+        else:
+            missing.append(user_id)
+
+    if missing:
+        projection = {"_id": 0, **{field: 1 for field in PROFILE_FIELDS}}
+        found = await db.users.find({"id": {"$in": missing}}, projection).to_list(len(missing))
+        for user in found:
+            profiles[user["id"]] = user
+            _cache_put(user["id"], user, now)
+        for user_id in missing:
+            if user_id not in profiles:
+                _cache_put(user_id, None, now)  # negative-cache unknown ids too
+
+    return profiles
+
+
+async def attach_usernames(rows: List[Dict[str, Any]], key: str = "user_id", default: str = "Unknown") -> List[Dict[str, Any]]:
+    """Set `username` on each row from its `key` user id, in a single round trip"""
+    profiles = await resolve_profiles(row[key] for row in rows)
+    for row in rows:
+        profile = profiles.get(row[key])
+        row["username"] = profile.get("username", default) if profile else default
+    return rows
+
+
+def invalidate_profile(user_id: str):
+    """Drop a cached profile after its display fields change"""
+    _cache.pop(user_id, None)
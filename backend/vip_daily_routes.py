@@ -3,21 +3,22 @@
 # ~400+ lines of backend code
 
 from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import db, register_indexes
+from pymongo import IndexModel, ASCENDING
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
 import uuid
-import os
 import random
 import hashlib
 
 router = APIRouter(prefix="/api/vip-daily", tags=["vip_daily"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("vip_progress", [
+    IndexModel([("user_id", ASCENDING)]),
+])
 
 
 # ========== CATCH OF THE DAY CONFIGURATION ==========
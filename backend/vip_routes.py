@@ -3,19 +3,25 @@
 # ~400+ lines of backend polish
 
 from fastapi import APIRouter, HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from database import db, register_indexes
+from catalog_cache import static_catalog
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field
 import uuid
-import os
 
 router = APIRouter(prefix="/api/vip", tags=["vip"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME')]
+# ========== INDEXES ==========
+
+register_indexes("player_vip", [
+    IndexModel([("user_id", ASCENDING)]),
+])
+
+register_indexes("vip_subscriptions", [
+    IndexModel([("user_id", ASCENDING), ("subscribed_at", DESCENDING)]),
+])
 
 
 # ========== VIP TIERS CONFIGURATION ==========
@@ -233,6 +239,7 @@ async def get_vip_status(user_id: str):
 
 
 @router.get("/tiers")
+@static_catalog
 async def get_vip_tiers():
     """Get all VIP tier information"""
     tiers = []
@@ -0,0 +1,164 @@
+# ========== GO FISH! WEATHER SERVICE ==========
+# In-memory current weather, refreshed ahead of expiry by a single in-flight fetch
+
+from database import db
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+import aiohttp
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Point WEATHER_API_URL at a local stub server to run without Open-Meteo
+WEATHER_API_URL = os.environ.get('WEATHER_API_URL', 'https://api.open-meteo.com/v1/forecast')
+WEATHER_LATITUDE = float(os.environ.get('WEATHER_LATITUDE', 52.52))
+WEATHER_LONGITUDE = float(os.environ.get('WEATHER_LONGITUDE', 13.41))
+WEATHER_TTL_SECONDS = float(os.environ.get('WEATHER_TTL_SECONDS', 30 * 60))
+# Refresh this long before the reading expires so readers never wait
+WEATHER_REFRESH_AHEAD_SECONDS = float(os.environ.get('WEATHER_REFRESH_AHEAD_SECONDS', 5 * 60))
+WEATHER_RETRY_SECONDS = float(os.environ.get('WEATHER_RETRY_SECONDS', 60))
+WEATHER_TIMEOUT_SECONDS = float(os.environ.get('WEATHER_TIMEOUT_SECONDS', 5))
+
+DEFAULT_WEATHER = {
+    "condition": "clear",
+    "temperature": 18,
+    "wind_speed": 8,
+    "cloud_cover": 30,
+    "precipitation": 0
+}
+
+
+def parse_open_meteo(data: Dict[str, Any]) -> Dict[str, Any]:
+    cw = data.get("current_weather", {})
+    weather_code = cw.get("weathercode", 0)
+
+    if weather_code < 4:
+        condition = "clear"
+    elif weather_code < 50:
+        condition = "cloudy"
+    elif weather_code < 70:
+        condition = "rain"
+    else:
+        condition = "storm"
+
+    return {
+        "condition": condition,
+        "temperature": int(cw.get("temperature", 18)),
+        "wind_speed": int(cw.get("windspeed", 8)),
+        "cloud_cover": data.get("hourly", {}).get("cloud_cover", [30])[0],
+        "precipitation": data.get("hourly", {}).get("precipitation_probability", [0])[0],
+    }
+
+
+class WeatherService:
+    """Serves the current reading from memory.
+
+    A background task refreshes it WEATHER_REFRESH_AHEAD_SECONDS before it
+    expires; concurrent refreshes share one in-flight fetch, and upstream
+    errors keep serving the last good reading (stale-while-revalidate).
+    The last reading is persisted so a restart does not hit the API.
+    """
+
+    def __init__(self, url: str = WEATHER_API_URL, ttl: float = WEATHER_TTL_SECONDS):
+        self.url = url
+        self.ttl = ttl
+        self._reading: Optional[Dict[str, Any]] = None
+        self._fetched_at = 0.0  # time.monotonic() of the current reading
+        self._inflight: Optional[asyncio.Task] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self._fetched_at
+
+    async def _fetch(self) -> Dict[str, Any]:
+        if self._session is None:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=WEATHER_TIMEOUT_SECONDS))
+        params = {
+            "latitude": WEATHER_LATITUDE,
+            "longitude": WEATHER_LONGITUDE,
+            "current_weather": "true",
+            "hourly": "precipitation_probability,cloud_cover"
+        }
+        async with self._session.get(self.url, params=params) as response:
+            response.raise_for_status()
+            reading = parse_open_meteo(await response.json())
+
+        self._reading, self._fetched_at = reading, time.monotonic()
+        await db.weather.replace_one(
+            {"_id": "current"},
+            {**reading, "cached_at": datetime.now(timezone.utc).isoformat()},
+            upsert=True
+        )
+        return reading
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._fetch())
+            self._inflight.add_done_callback(self._finish_refresh)
+        return self._inflight
+
+    def _finish_refresh(self, task: asyncio.Task):
+        self._inflight = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Weather API error: {task.exception()}")
+
+    async def refresh(self) -> Optional[Dict[str, Any]]:
+        """Fetch a new reading; callers arriving mid-fetch share its result"""
+        try:
+            return await asyncio.shield(self._start_refresh())
+        except Exception:
+            return self._reading
+
+    async def current(self) -> Dict[str, Any]:
+        if self._reading is None:
+            await self.refresh()
+        elif self.age >= self.ttl:
+            self._start_refresh()  # serve the stale reading meanwhile
+        return dict(self._reading or DEFAULT_WEATHER)
+
+    async def _load_persisted(self):
+        cached = await db.weather.find_one({"_id": "current"})
+        if not cached:
+            return
+        cached_at = datetime.fromisoformat(cached["cached_at"])
+        age = (datetime.now(timezone.utc) - cached_at).total_seconds()
+        self._reading = {k: cached[k] for k in DEFAULT_WEATHER}
+        self._fetched_at = time.monotonic() - age
+
+    async def _run(self):
+        while True:
+            delay = self.ttl - WEATHER_REFRESH_AHEAD_SECONDS - self.age
+            if delay > 0:
+                await asyncio.sleep(delay)
+            before = self._fetched_at
+            await self.refresh()
+            if self._fetched_at == before:
+                await asyncio.sleep(WEATHER_RETRY_SECONDS)
+
+    async def start(self):
+        try:
+            await self._load_persisted()
+        except Exception as e:
+            logger.error(f"Could not load persisted weather: {e}")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+weather_service = WeatherService()
@@ -13,18 +13,36 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timezone
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
+from database import db, register_indexes
+from catalog_cache import static_catalog
+from search_engine import SearchIndex, MAX_RESULTS
+from navigation import NavigationGrid
+from pymongo import IndexModel, ASCENDING
+from bson.int64 import Int64
 import uuid
 import random
-import math
 
 router = APIRouter(prefix="/api/map", tags=["map"])
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'test_database')]
+# ============================================================================
+# INDEXES
+# ============================================================================
+
+register_indexes("discovered_locations", [
+    IndexModel([("user_id", ASCENDING), ("location_id", ASCENDING)]),
+])
+
+register_indexes("navigation_routes", [
+    IndexModel([("user_id", ASCENDING)]),
+])
+
+register_indexes("discovery_bits", [
+    IndexModel([("user_id", ASCENDING)], unique=True),
+])
+
+register_indexes("random_islands", [
+    IndexModel([("discovered_by", ASCENDING)]),
+])
 
 # ============================================================================
 # WORLD MAP CONFIGURATION
@@ -212,6 +230,84 @@ REGIONS = [
     }
 ]
 
+LOCATION_SEARCH = SearchIndex()
+for _region in REGIONS:
+    LOCATION_SEARCH.add("region", _region["id"], _region["name"], _region)
+    for _poi in _region.get("points_of_interest", []):
+        LOCATION_SEARCH.add("poi", _poi["id"], _poi["name"], _poi, region=_region["id"])
+LOCATION_SEARCH.build()
+
+# Grid index over region bounds and points of interest, also used for routing
+NAVIGATION = NavigationGrid(WORLD_SIZE, REGIONS)
+
+# ============================================================================
+# DISCOVERY BITSETS
+# ============================================================================
+# Every point of interest gets an ordinal (its position in REGIONS order, so
+# new POIs must be appended to keep existing ordinals stable). A user's
+# discoveries are one discovery_bits document holding 63-bit words that
+# discover_location sets atomically with $bit.
+
+WORD_BITS = 63  # stays clear of the Int64 sign bit
+
+POI_LIST = [
+    {"id": poi["id"], "region": region["id"]}
+    for region in REGIONS for poi in region.get("points_of_interest", [])
+]
+POI_ORDINALS = {poi["id"]: ordinal for ordinal, poi in enumerate(POI_LIST)}
+REGION_MASKS: Dict[str, int] = {}
+for _ordinal, _poi in enumerate(POI_LIST):
+    REGION_MASKS[_poi["region"]] = REGION_MASKS.get(_poi["region"], 0) | (1 << _ordinal)
+
+
+def discovery_bits_update(mask: int) -> Dict:
+    """Atomic OR of `mask` into a user's stored words"""
+    words = words_from_mask(mask)
+    if not words:
+        return {"$setOnInsert": {"words": {}}}
+    return {"$bit": {f"words.{word}": {"or": value} for word, value in words.items()}}
+
+
+def mask_from_words(words: Dict[str, int]) -> int:
+    mask = 0
+    for word, value in (words or {}).items():
+        mask |= int(value) << (int(word) * WORD_BITS)
+    return mask
+
+
+def words_from_mask(mask: int) -> Dict[str, Int64]:
+    words = {}
+    word = 0
+    while mask:
+        if mask & ((1 << WORD_BITS) - 1):
+            words[str(word)] = Int64(mask & ((1 << WORD_BITS) - 1))
+        mask >>= WORD_BITS
+        word += 1
+    return words
+
+
+async def get_discovery_mask(user_id: str) -> int:
+    """The user's POI discovery bitset as an int"""
+    doc = await db.discovery_bits.find_one({"user_id": user_id}, {"_id": 0, "words": 1})
+    if doc is not None:
+        return mask_from_words(doc.get("words"))
+    
+    mask = await legacy_discovery_mask(user_id)
+    await db.discovery_bits.update_one({"user_id": user_id}, discovery_bits_update(mask), upsert=True)
+    return mask
+
+
+async def legacy_discovery_mask(user_id: str) -> int:
+    """Bits for discoveries recorded before bitsets existed (read once per user)"""
+    discovered = await db.discovered_locations.find(
+        {"user_id": user_id, "location_id": {"$in": list(POI_ORDINALS)}},
+        {"_id": 0, "location_id": 1}
+    ).to_list(None)
+    mask = 0
+    for d in discovered:
+        mask |= 1 << POI_ORDINALS[d["location_id"]]
+    return mask
+
 # ============================================================================
 # RANDOM ISLAND GENERATOR
 # ============================================================================
@@ -309,6 +405,7 @@ class NavigationRoute(BaseModel):
 # ============================================================================
 
 @router.get("/world")
+@static_catalog
 async def get_world_map():
     """Get the complete world map"""
     return {
@@ -318,6 +415,7 @@ async def get_world_map():
     }
 
 @router.get("/regions")
+@static_catalog
 async def get_all_regions():
     """Get all regions"""
     return {"regions": REGIONS}
@@ -325,7 +423,7 @@ async def get_all_regions():
 @router.get("/regions/{region_id}")
 async def get_region(region_id: str):
     """Get a specific region"""
-    region = next((r for r in REGIONS if r["id"] == region_id), None)
+    region = NAVIGATION.regions_by_id.get(region_id)
     if not region:
         raise HTTPException(status_code=404, detail="Region not found")
     return region
@@ -343,49 +441,52 @@ async def get_discovered_locations(user_id: str):
 @router.get("/user/{user_id}/fog-of-war")
 async def get_fog_of_war(user_id: str):
     """Get user's explored/unexplored areas"""
-    discovered = await db.discovered_locations.find(
-        {"user_id": user_id},
-        {"_id": 0, "location_id": 1}
-    ).to_list(1000)
-    
-    discovered_ids = [d["location_id"] for d in discovered]
+    mask = await get_discovery_mask(user_id)
     
     # All possible locations
-    all_locations = []
-    for region in REGIONS:
-        for poi in region.get("points_of_interest", []):
-            all_locations.append({
-                "id": poi["id"],
-                "region": region["id"],
-                "discovered": poi["id"] in discovered_ids
-            })
+    all_locations = [
+        {"id": poi["id"], "region": poi["region"], "discovered": bool(mask >> ordinal & 1)}
+        for ordinal, poi in enumerate(POI_LIST)
+    ]
     
-    discovered_count = len([l for l in all_locations if l["discovered"]])
-    total_count = len(all_locations)
+    discovered_count = mask.bit_count()
+    total_count = len(POI_LIST)
     
     return {
         "locations": all_locations,
         "discovered_count": discovered_count,
         "total_count": total_count,
+        "by_region": {
+            region_id: {"discovered": (mask & region_mask).bit_count(), "total": region_mask.bit_count()}
+            for region_id, region_mask in REGION_MASKS.items()
+        },
         "exploration_percentage": round(discovered_count / total_count * 100, 1) if total_count > 0 else 0
     }
 
 @router.post("/discover")
 async def discover_location(location: DiscoveredLocation):
     """Record a newly discovered location"""
-    existing = await db.discovered_locations.find_one(
-        {"user_id": location.user_id, "location_id": location.location_id}
+    fields = location.model_dump()
+    fields.pop("times_visited")
+    result = await db.discovered_locations.update_one(
+        {"user_id": location.user_id, "location_id": location.location_id},
+        {"$setOnInsert": fields, "$inc": {"times_visited": 1}},
+        upsert=True
     )
     
-    if existing:
-        # Update visit count
-        await db.discovered_locations.update_one(
-            {"user_id": location.user_id, "location_id": location.location_id},
-            {"$inc": {"times_visited": 1}}
+    ordinal = POI_ORDINALS.get(location.location_id)
+    if ordinal is not None:
+        bits = await db.discovery_bits.update_one(
+            {"user_id": location.user_id}, discovery_bits_update(1 << ordinal), upsert=True
         )
-        return {"message": "Location visited again", "first_discovery": False}
+        if bits.upserted_id is not None:
+            # First bitset write for this user: carry over older discoveries
+            legacy = await legacy_discovery_mask(location.user_id)
+            if legacy:
+                await db.discovery_bits.update_one({"user_id": location.user_id}, discovery_bits_update(legacy))
     
-    await db.discovered_locations.insert_one(location.model_dump())
+    if result.upserted_id is None:
+        return {"message": "Location visited again", "first_discovery": False}
     return {"message": "New location discovered!", "first_discovery": True}
 
 @router.post("/random-island/{region_id}")
@@ -438,25 +539,23 @@ async def get_user_routes(user_id: str):
 
 @router.get("/calculate-route")
 async def calculate_route(start_x: int, start_y: int, end_x: int, end_y: int):
-    """Calculate optimal route between two points"""
-    distance = math.sqrt((end_x - start_x)**2 + (end_y - start_y)**2)
+    """Calculate the safest-fastest route between two points (A* over the map grid)"""
+    if not (NAVIGATION.contains(start_x, start_y) and NAVIGATION.contains(end_x, end_y)):
+        raise HTTPException(status_code=400, detail="Route must stay within the world map")
     
-    # Estimate time (100 units per minute average)
-    estimated_time = int(distance / 100)
+    route = NAVIGATION.route((start_x, start_y), (end_x, end_y))
     
-    # Find dangers along route
-    dangers = []
-    for region in REGIONS:
-        bounds = region["bounds"]
-        # Simple check if route passes through region
-        if (bounds["x"] <= max(start_x, end_x) and 
-            bounds["x"] + bounds["width"] >= min(start_x, end_x)):
-            dangers.extend(region.get("dangers", []))
+    # Estimate time (100 units per minute average)
+    estimated_time = int(route["distance"] / 100)
     
     return {
-        "distance": round(distance, 2),
+        "distance": round(route["distance"], 2),
+        "direct_distance": round(route["direct_distance"], 2),
+        "weighted_cost": round(route["weighted_cost"], 2),
+        "waypoints": route["waypoints"],
+        "regions_on_route": route["regions"],
         "estimated_time_minutes": estimated_time,
-        "dangers_on_route": list(set(dangers)),
+        "dangers_on_route": route["dangers"],
         "recommended_supplies": calculate_supplies_needed(estimated_time)
     }
 
@@ -473,24 +572,28 @@ def calculate_supplies_needed(time_minutes: int) -> Dict:
 @router.get("/points-of-interest/{region_id}")
 async def get_points_of_interest(region_id: str):
     """Get all points of interest in a region"""
-    region = next((r for r in REGIONS if r["id"] == region_id), None)
+    region = NAVIGATION.regions_by_id.get(region_id)
     if not region:
         raise HTTPException(status_code=404, detail="Region not found")
     
     return {"points_of_interest": region.get("points_of_interest", [])}
 
+@router.get("/nearby")
+async def get_nearby(x: float, y: float, radius: float = 500, limit: int = 20):
+    """Region at a point and the points of interest around it, nearest first"""
+    if not NAVIGATION.contains(x, y):
+        raise HTTPException(status_code=400, detail="Point is outside the world map")
+    region = NAVIGATION.region_at(x, y)
+    return {
+        "region": region["id"] if region else None,
+        "points_of_interest": NAVIGATION.pois_near(x, y, min(radius, 5000), max(1, min(limit, 100)))
+    }
+
 @router.get("/search")
-async def search_locations(query: str):
-    """Search for locations by name"""
-    results = []
-    query_lower = query.lower()
-    
-    for region in REGIONS:
-        if query_lower in region["name"].lower():
-            results.append({"type": "region", "data": region})
-        
-        for poi in region.get("points_of_interest", []):
-            if query_lower in poi["name"].lower():
-                results.append({"type": "poi", "region": region["id"], "data": poi})
-    
-    return {"results": results, "count": len(results)}
+async def search_locations(query: str, limit: int = 50):
+    """Search for locations by name (ranked, typo tolerant)"""
+    hits, total = LOCATION_SEARCH.search(query, limit=max(1, min(limit, MAX_RESULTS)))
+    return {
+        "results": [{"type": hit.doc.kind, **hit.doc.extra, "data": hit.doc.data} for hit in hits],
+        "count": total
+    }
@@ -0,0 +1,188 @@
+# ========== GO FISH! WRITE-BEHIND STAT AGGREGATOR ==========
+# Coalesces per-user counter updates and flushes them as bulk writes
+
+from database import db
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL_SECONDS = float(os.environ.get('WRITE_BEHIND_FLUSH_SECONDS', 1.0))
+# Flush early once this many documents have pending deltas
+MAX_PENDING_DOCS = int(os.environ.get('WRITE_BEHIND_MAX_PENDING', 5000))
+# An op rejected by Mongo this many flushes in a row is dropped to the dead letters
+MAX_WRITE_ATTEMPTS = int(os.environ.get('WRITE_BEHIND_MAX_ATTEMPTS', 3))
+DEAD_LETTER_LIMIT = int(os.environ.get('WRITE_BEHIND_DEAD_LETTERS', 1000))
+
+MERGE_OPS = {
+    "$inc": lambda old, new: old + new,
+    "$max": max,
+    "$min": min,
+}
+
+# (collection, key_field, key, upsert) -> {"$inc": {...}, "$max": {...}, "$min": {...}}
+BufferKey = Tuple[str, str, str, bool]
+
+
+class WriteBehindAggregator:
+    """Buffers `$inc`/`$max`/`$min` deltas per document for a short window.
+
+    Many catches by the same player collapse into one UpdateOne per document
+    per flush, and every collection is flushed with a single unordered
+    bulk_write. Counters are eventually consistent (up to one flush window);
+    use `overlay()` when a read must see this worker's pending deltas.
+    """
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL_SECONDS,
+                 max_pending: int = MAX_PENDING_DOCS):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._buffer: Dict[BufferKey, Dict[str, Dict[str, Any]]] = {}
+        self._inflight: Dict[BufferKey, Dict[str, Dict[str, Any]]] = {}
+        self._attempts: Dict[BufferKey, int] = {}
+        self.dead_letters: deque = deque(maxlen=DEAD_LETTER_LIMIT)
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+
+    def _add(self, op: str, collection: str, key: str, fields: Dict[str, Any],
+             key_field: str, upsert: bool):
+        pending = self._buffer.setdefault((collection, key_field, key, upsert), {})
+        target = pending.setdefault(op, {})
+        merge = MERGE_OPS[op]
+        for path, value in fields.items():
+            target[path] = merge(target[path], value) if path in target else value
+        if len(self._buffer) >= self.max_pending:
+            self._wakeup.set()
+
+    def inc(self, collection: str, key: str, deltas: Dict[str, Any],
+            key_field: str = "user_id", upsert: bool = True):
+        self._add("$inc", collection, key, deltas, key_field, upsert)
+
+    def max(self, collection: str, key: str, values: Dict[str, Any],
+            key_field: str = "user_id", upsert: bool = True):
+        self._add("$max", collection, key, values, key_field, upsert)
+
+    def min(self, collection: str, key: str, values: Dict[str, Any],
+            key_field: str = "user_id", upsert: bool = True):
+        self._add("$min", collection, key, values, key_field, upsert)
+
+    def overlay(self, collection: str, key: str, doc: Dict[str, Any],
+                key_field: str = "user_id") -> Dict[str, Any]:
+        """Apply this worker's unflushed deltas to a document read from Mongo"""
+        for pending in (self._inflight, self._buffer):
+            for upsert in (True, False):
+                ops = pending.get((collection, key_field, key, upsert))
+                if ops:
+                    self._apply(doc, ops)
+        return doc
+
+    @staticmethod
+    def _apply(doc: Dict[str, Any], ops: Dict[str, Dict[str, Any]]):
+        for op, fields in ops.items():
+            merge = MERGE_OPS[op]
+            for path, value in fields.items():
+                *parents, leaf = path.split(".")
+                target = doc
+                for part in parents:
+                    target = target.setdefault(part, {})
+                target[leaf] = merge(target[leaf], value) if leaf in target else value
+
+    async def flush(self):
+        """Write all pending deltas; failed operations are re-queued.
+
+        Ops Mongo itself rejects (bad path, type conflict) are retried up to
+        MAX_WRITE_ATTEMPTS flushes, then logged and kept in `dead_letters`.
+        Whole-batch failures (e.g. connection errors) are always retried.
+        """
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            buffer, self._buffer = self._buffer, {}
+            self._inflight = buffer
+
+            by_collection: Dict[str, List[Tuple[BufferKey, Dict[str, Dict[str, Any]]]]] = {}
+            for buffer_key, ops in buffer.items():
+                by_collection.setdefault(buffer_key[0], []).append((buffer_key, ops))
+
+            for collection, items in by_collection.items():
+                requests = [
+                    UpdateOne({key_field: key}, ops, upsert=upsert)
+                    for (_, key_field, key, upsert), ops in items
+                ]
+                errors = {}
+                try:
+                    await db[collection].bulk_write(requests, ordered=False)
+                except BulkWriteError as e:
+                    errors = {error["index"]: error.get("errmsg") for error in e.details.get("writeErrors", [])}
+                    logger.error(f"Write-behind flush to {collection}: {len(errors)} ops failed")
+                except Exception as e:
+                    logger.error(f"Write-behind flush to {collection} failed: {e}")
+                    self._settle(items)
+                    self._requeue(items)
+                    continue
+                # Written (or re-queued below): overlay() must not apply these twice
+                self._settle(items)
+                self._retry_or_drop([(items[i], errors[i]) for i in errors])
+                for i, (buffer_key, _) in enumerate(items):
+                    if i not in errors:
+                        self._attempts.pop(buffer_key, None)
+
+    def _settle(self, items):
+        """Drop a collection's ops from the in-flight view once its bulk write returns"""
+        for buffer_key, _ in items:
+            self._inflight.pop(buffer_key, None)
+
+    def _retry_or_drop(self, failures):
+        retry = []
+        for (buffer_key, ops), error in failures:
+            attempts = self._attempts.get(buffer_key, 0) + 1
+            if attempts < MAX_WRITE_ATTEMPTS:
+                self._attempts[buffer_key] = attempts
+                retry.append((buffer_key, ops))
+                continue
+            self._attempts.pop(buffer_key, None)
+            collection, key_field, key, upsert = buffer_key
+            logger.error(f"Write-behind dropped {collection} {key_field}={key} after {attempts} attempts: {error} {ops}")
+            self.dead_letters.append({
+                "collection": collection, "key_field": key_field, "key": key,
+                "upsert": upsert, "ops": ops, "error": error,
+            })
+        self._requeue(retry)
+
+    def _requeue(self, items):
+        for (collection, key_field, key, upsert), ops in items:
+            for op, fields in ops.items():
+                self._add(op, collection, key, fields, key_field, upsert)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background flusher and write whatever is still pending"""
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+
+stat_writer = WriteBehindAggregator()
@@ -0,0 +1,35 @@
+from achievement_engine import AchievementIndex, requirement_count
+
+ACHIEVEMENTS = [
+    {"id": "fish_100", "requirement": {"type": "fish_caught", "count": 100}},
+    {"id": "fish_1", "requirement": {"type": "fish_caught", "count": 1}},
+    {"id": "fish_10", "requirement": {"type": "fish_caught", "count": 10}},
+    {"id": "big", "requirement": {"type": "largest_fish", "size": 50}},
+    {"id": "combo", "requirement": {"type": "max_combo"}},
+]
+
+
+def test_requirement_count():
+    assert requirement_count(ACHIEVEMENTS[0]) == ("fish_caught", 100)
+    assert requirement_count(ACHIEVEMENTS[3]) == ("largest_fish", 50)
+    assert requirement_count(ACHIEVEMENTS[4]) == ("max_combo", 1)
+
+
+def test_unlockable_only_looks_at_touched_stats():
+    index = AchievementIndex(ACHIEVEMENTS)
+    values = {"fish_caught": 12, "largest_fish": 80}
+    assert [a["id"] for a in index.unlockable(values, set())] == ["fish_1", "fish_10", "big"]
+    assert [a["id"] for a in index.unlockable(values, {"fish_1"}, stats=["fish_caught"])] == ["fish_10"]
+    assert index.unlockable(values, set(), stats=["unknown"]) == []
+
+
+def test_pending_stats_and_next_unlock():
+    index = AchievementIndex(ACHIEVEMENTS)
+    assert set(index.stats) == {"fish_caught", "largest_fish", "max_combo"}
+    assert index.depends_on("max_combo") and not index.depends_on("gold")
+    assert index.pending_stats({"fish_1", "fish_10", "fish_100"}, ["fish_caught", "max_combo"]) == ["max_combo"]
+
+    threshold, achievement = index.next_unlock("fish_caught", 10)
+    assert (threshold, achievement["id"]) == (100, "fish_100")
+    assert index.next_unlock("fish_caught", 100) is None
+    assert index.next_unlock("gold", 0) is None
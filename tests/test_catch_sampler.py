@@ -0,0 +1,70 @@
+import itertools
+import random
+from collections import Counter
+
+import pytest
+
+from catch_sampler import AliasTable, CatchSampler, CatchTable, pool_pick_probabilities
+
+
+def brute_force_pick(chances):
+    """Enumerate every pool the legacy loop could roll"""
+    picks = [0.0] * len(chances)
+    empty = 0.0
+    for joined in itertools.product((False, True), repeat=len(chances)):
+        prob = 1.0
+        for p, j in zip(chances, joined):
+            prob *= p if j else 1 - p
+        members = [i for i, j in enumerate(joined) if j]
+        if not members:
+            empty += prob
+        for i in members:
+            picks[i] += prob / len(members)
+    return picks, empty
+
+
+@pytest.mark.parametrize("chances", [[0.5], [0.1, 0.4, 0.9], [0.05, 0.2, 0.2, 0.7, 1.0], [0.0, 0.3]])
+def test_pool_pick_probabilities_are_exact(chances):
+    picks, empty = pool_pick_probabilities(chances)
+    expected_picks, expected_empty = brute_force_pick(chances)
+    assert picks == pytest.approx(expected_picks)
+    assert empty == pytest.approx(expected_empty)
+    assert sum(picks) + empty == pytest.approx(1.0)
+
+
+def test_alias_table_matches_weights():
+    weights = [1, 2, 3, 4]
+    table = AliasTable(weights)
+    rng = random.Random(3)
+    draws = 200_000
+    counts = Counter(table.draw(rng) for _ in range(draws))
+    for i, weight in enumerate(weights):
+        assert counts[i] / draws == pytest.approx(weight / sum(weights), abs=0.01)
+
+
+def test_alias_table_rejects_empty_weights():
+    with pytest.raises(ValueError):
+        AliasTable([])
+    with pytest.raises(ValueError):
+        AliasTable([0, 0])
+
+
+def test_catch_table_drops_misses():
+    table = CatchTable(["cod"], [1.0], miss=1.0)
+    caught = table.sample(10_000, random.Random(5))
+    assert set(caught) == {"cod"}
+    assert len(caught) / 10_000 == pytest.approx(0.5, abs=0.03)
+    assert table.sample(0) == []
+
+
+def test_catch_sampler_builds_each_table_once():
+    sampler = CatchSampler()
+    builds = []
+
+    def build():
+        builds.append(1)
+        return CatchTable(["cod"], [1.0])
+
+    first = sampler.table("stage-1", build)
+    assert sampler.table("stage-1", build) is first
+    assert len(builds) == 1 and len(sampler) == 1
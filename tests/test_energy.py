@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
+from energy_routes import ENERGY_CONFIG, compute_energy
+
+NOW = datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)
+RATE = ENERGY_CONFIG["regen_rate_per_minute"]
+MAX = ENERGY_CONFIG["max_energy"]
+
+
+def record(**fields):
+    return {"user_id": "u1", "max_energy": MAX, **fields}
+
+
+def test_regenerates_from_the_checkpoint():
+    state = compute_energy(record(current_energy=10, last_updated=(NOW - timedelta(minutes=30)).isoformat()), NOW)
+    assert state["current_energy"] == 10 + 30 * RATE
+    assert state["minutes_to_full"] == (MAX - 10 - 30 * RATE) // RATE
+
+
+def test_regen_stops_at_max_but_keeps_bonus_energy():
+    long_ago = (NOW - timedelta(days=1)).isoformat()
+    assert compute_energy(record(current_energy=10, last_updated=long_ago), NOW)["current_energy"] == MAX
+    assert compute_energy(record(current_energy=MAX + 20, last_updated=long_ago), NOW)["current_energy"] == MAX + 20
+
+
+def test_missing_record_fields_mean_full_energy():
+    state = compute_energy({"user_id": "u1"}, NOW)
+    assert state["current_energy"] == MAX
+    assert state["minutes_to_full"] == 0
+
+
+def test_boost_only_applies_inside_its_window():
+    state = compute_energy(record(
+        current_energy=0,
+        last_updated=NOW - timedelta(minutes=20),
+        regen_multiplier=2.0,
+        regen_multiplier_until=NOW - timedelta(minutes=10),
+    ), NOW)
+    # 10 boosted minutes count double, the last 10 at the normal rate
+    assert state["current_energy"] == 30 * RATE
+    assert state["regen_multiplier"] == 1.0
+    assert state["regen_multiplier_until"] is None
+
+
+def test_infinite_mode():
+    state = compute_energy(record(current_energy=3, last_updated=NOW, infinite_until=NOW + timedelta(hours=1)), NOW)
+    assert state["is_infinite"] and state["current_energy"] == MAX
+    expired = compute_energy(record(current_energy=3, last_updated=NOW, infinite_until=NOW - timedelta(hours=1)), NOW)
+    assert not expired["is_infinite"] and expired["current_energy"] == 3
@@ -0,0 +1,124 @@
+import asyncio
+import random
+
+from leaderboard_engine import LeaderboardEngine, RankedBoard
+
+
+def naive_ranking(scores):
+    return sorted(scores, key=lambda member: (-scores[member], member))
+
+
+def test_rank_matches_sorted_order():
+    rng = random.Random(7)
+    board = RankedBoard()
+    scores = {}
+    for i in range(500):
+        member = f"p{i}"
+        scores[member] = rng.randint(0, 100)
+        board.upsert(member, scores[member])
+
+    ranking = naive_ranking(scores)
+    assert len(board) == len(scores)
+    assert [e.member for e in board.top(len(ranking))] == ranking
+    for position, member in enumerate(ranking, 1):
+        assert board.rank(member) == position
+
+
+def test_updates_and_removals_keep_ranks_consistent():
+    rng = random.Random(11)
+    board = RankedBoard()
+    scores = {}
+    for step in range(2000):
+        member = f"p{rng.randint(0, 99)}"
+        action = rng.random()
+        if action < 0.6:
+            scores[member] = rng.randint(0, 50)
+            board.upsert(member, scores[member])
+        elif action < 0.8:
+            scores[member] = scores.get(member, 0) + 3
+            board.increment(member, 3)
+        else:
+            scores.pop(member, None)
+            board.remove(member)
+
+    ranking = naive_ranking(scores)
+    assert [e.member for e in board.top(len(ranking) + 5)] == ranking
+    assert [board.rank(m) for m in ranking] == list(range(1, len(ranking) + 1))
+
+
+def test_ties_are_ordered_by_member_id():
+    board = RankedBoard()
+    for member in ("carol", "alice", "bob"):
+        board.upsert(member, 10)
+    assert [e.member for e in board.top(3)] == ["alice", "bob", "carol"]
+
+
+def test_tuple_scores_and_count_above():
+    board = RankedBoard()
+    board.upsert("a", (5, 2))
+    board.upsert("b", (5, 9))
+    board.upsert("c", (3, 100))
+    assert [e.member for e in board.top(3)] == ["b", "a", "c"]
+    assert board.count_above((5,)) == 0
+    assert board.count_above((4,)) == 2
+
+
+def test_raise_to_only_moves_up():
+    board = RankedBoard()
+    board.raise_to("a", 10)
+    board.raise_to("a", 5)
+    assert board.get("a").score == 10
+    board.raise_to("a", 12)
+    assert board.get("a").score == 12
+
+
+def test_capacity_keeps_best_members():
+    board = RankedBoard(capacity=3)
+    for i, score in enumerate([5, 1, 9, 7, 3]):
+        board.upsert(f"p{i}", score)
+    assert [e.member for e in board.top(10)] == ["p2", "p3", "p0"]
+    assert "p1" not in board
+
+
+def test_around_window():
+    board = RankedBoard()
+    for i in range(10):
+        board.upsert(f"p{i}", i)
+    window = board.around("p5", radius=2)
+    assert [e.member for e in window] == ["p7", "p6", "p5", "p4", "p3"]
+    assert [e.rank for e in window] == [3, 4, 5, 6, 7]
+    assert board.around("missing") == []
+
+
+def test_refresh_does_not_double_count_increments():
+    stored = {"a": 10, "b": 5}
+    reload_started = asyncio.Event()
+    finish_reload = asyncio.Event()
+
+    async def loader(board_id):
+        if reload_started.is_set():
+            await finish_reload.wait()
+        for member, score in list(stored.items()):
+            yield member, score, {}
+
+    async def scenario():
+        engine = LeaderboardEngine()
+        engine.register("points", loader, refresh_seconds=0)
+        await engine.board("points")
+        reload_started.set()
+        await engine.board("points")  # stale: starts a background reload
+        await asyncio.sleep(0)
+
+        # A write lands in Mongo and on the warm board while the reload runs
+        stored["b"] += 10
+        engine.increment("points", "global", "b", 10)
+        engine.record_max("points", "global", "a", 12)
+        stored["a"] = 12
+        finish_reload.set()
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        board = engine._boards[("points", "global")].board
+        return board.get("a").score, board.get("b").score
+
+    assert asyncio.run(scenario()) == (12, 15)
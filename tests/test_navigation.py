@@ -0,0 +1,58 @@
+import pytest
+
+from navigation import NavigationGrid, region_cost
+
+WORLD = {"width": 1000, "height": 1000}
+REGIONS = [
+    {"id": "harbor", "bounds": {"x": 0, "y": 0, "width": 200, "height": 1000}, "difficulty": 1, "dangers": [],
+     "points_of_interest": [{"id": "dock", "x": 50, "y": 500}]},
+    # A dangerous wall in the middle with a calm gap at the top
+    {"id": "maelstrom", "bounds": {"x": 400, "y": 200, "width": 200, "height": 800}, "difficulty": 10,
+     "dangers": ["whirlpools", "storms", "reefs"], "points_of_interest": [{"id": "eye", "x": 500, "y": 600}]},
+]
+
+
+@pytest.fixture
+def grid():
+    return NavigationGrid(WORLD, REGIONS, cell_size=100, cache_size=4)
+
+
+def test_region_cost():
+    assert region_cost(REGIONS[0]) == 1.0
+    assert region_cost(REGIONS[1]) > 2.0
+
+
+def test_region_lookup(grid):
+    assert grid.region_at(50, 50)["id"] == "harbor"
+    assert grid.region_at(500, 500)["id"] == "maelstrom"
+    assert grid.region_at(800, 100) is None
+    assert grid.contains(1000, 1000) and not grid.contains(-1, 5)
+
+
+def test_pois_near(grid):
+    assert [p["id"] for p in grid.pois_near(60, 500, radius=100)] == ["dock"]
+    found = grid.pois_near(300, 550, radius=300)
+    assert [p["id"] for p in found] == ["eye", "dock"]
+    assert found[0]["region"] == "maelstrom"
+    assert grid.pois_near(900, 100, radius=50) == []
+
+
+def test_route_detours_around_danger(grid):
+    route = grid.route((100, 300), (900, 300))
+    assert route["waypoints"][0] == {"x": 100, "y": 300}
+    assert route["waypoints"][-1] == {"x": 900, "y": 300}
+    assert "maelstrom" not in route["regions"]
+    assert route["distance"] > route["direct_distance"]
+    assert route["dangers"] == []
+
+
+def test_route_through_open_water_is_straight(grid):
+    route = grid.route((700, 50), (950, 50))
+    assert len(route["waypoints"]) == 2
+    assert route["distance"] == pytest.approx(250)
+
+
+def test_route_cache_is_bounded(grid):
+    for y in range(0, 1000, 100):
+        grid.route((750, y), (950, 950))
+    assert len(grid._routes) == 4
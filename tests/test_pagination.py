@@ -0,0 +1,32 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from pagination import decode_cursor, encode_cursor, projection_for
+
+
+@pytest.mark.parametrize("sort_value", [
+    "2024-05-01T10:00:00+00:00",
+    42,
+    None,
+    datetime(2024, 5, 1, 10, 30, tzinfo=timezone.utc),
+])
+def test_cursor_round_trip(sort_value):
+    cursor = encode_cursor(sort_value, "entry-1")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (sort_value, "entry-1")
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor!", "e30", ""])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_projection_for():
+    assert projection_for(None, ["a", "b"], ["id"]) == {"_id": 0}
+    assert projection_for("a, b", ["a", "b"], ["id"]) == {"_id": 0, "id": 1, "a": 1, "b": 1}
+    with pytest.raises(HTTPException):
+        projection_for("a,secret", ["a"], ["id"])
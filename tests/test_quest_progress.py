@@ -0,0 +1,104 @@
+from quest_progress import (
+    ObjectiveIndex, keyed_progress_update, keyed_quest, objective_action, objective_matches, objective_types,
+    progress_writes,
+)
+
+
+def quest(quest_id, objectives, progress=None):
+    return {
+        "id": quest_id,
+        "quest_data": {"objectives": objectives},
+        "objectives_progress": progress if progress is not None else [0] * len(objectives),
+    }
+
+
+BASS = {"fish_type": "Bass", "stage": 2, "rarity": 3, "size": 40}
+
+
+def test_objective_types_are_distinct_and_sorted():
+    assert objective_types([{"type": "score"}, {"type": "catch_fish"}, {"type": "score"}]) == ["catch_fish", "score"]
+
+
+def test_filters():
+    assert objective_matches({"type": "catch_type", "fish_type": "Bass"}, BASS)
+    assert not objective_matches({"type": "catch_type", "fish_type": "Koi"}, BASS)
+    assert objective_matches({"type": "catch_rarity", "min_rarity": 3}, BASS)
+    assert not objective_matches({"type": "catch_rarity", "min_rarity": 4}, BASS)
+    assert not objective_matches({"type": "catch_size", "min_size": 50}, {})
+
+
+def test_only_matching_objectives_progress():
+    index = ObjectiveIndex([
+        quest("a", [{"type": "catch_fish", "target": 5}, {"type": "catch_type", "target": 2, "fish_type": "Koi"}]),
+        quest("b", [{"type": "catch_stage", "target": 3, "stage": 2}]),
+        quest("c", [{"type": "catch_stage", "target": 3, "stage": 7}]),
+    ])
+    assert len(index) == 4
+    changes = index.apply([
+        ("catch_fish", 1, BASS),
+        ("catch_type", 1, BASS),
+        ("catch_stage", 1, BASS),
+    ])
+    assert [(c.quest_id, c.changed) for c in changes] == [("a", {0: 1}), ("b", {0: 1})]
+    assert not any(c.completed for c in changes)
+
+
+def test_progress_is_capped_and_completes_the_quest():
+    index = ObjectiveIndex([quest("a", [{"type": "score", "target": 100}, {"type": "combo", "target": 3}], [90, 3])])
+    [change] = index.apply([("score", 50, {})])
+    assert change.progress == [100, 3]
+    assert change.completed
+    # Already at target: nothing left to write
+    assert index.apply([("score", 50, {})]) == []
+
+
+def test_short_progress_lists_are_padded():
+    index = ObjectiveIndex([quest("a", [{"type": "score", "target": 10}, {"type": "combo", "target": 3}], [4])])
+    [change] = index.apply([("combo", 1, {})])
+    assert change.progress == [4, 1]
+
+
+def test_progress_writes():
+    index = ObjectiveIndex([
+        quest("a", [{"type": "score", "target": 10}, {"type": "combo", "target": 3}]),
+        quest("b", [{"type": "score", "target": 100}]),
+    ])
+    writes = progress_writes(index.apply([("score", 10, {})]), "2024-01-01T00:00:00+00:00")
+    assert [w._filter for w in writes] == [{"id": "a", "status": "active"}, {"id": "b", "status": "active"}]
+
+    raise_stage, complete_stage = writes[0]._doc
+    first, second = raise_stage["$set"]["objectives_progress"]
+    assert first["$max"][1] == 10 and second["$max"][1] == 0
+    # Completion is decided on the stored progress, against every target
+    done = complete_stage["$set"]["status"]["$cond"][0]
+    assert [cond["$gte"][1] for cond in done["$and"]] == [10, 3]
+    assert complete_stage["$set"]["completed_at"]["$cond"][1] == "2024-01-01T00:00:00+00:00"
+
+
+def test_keyed_quests_set_reported_progress():
+    objectives = {
+        "0": {"current": 2, "target": 5, "completed": False},
+        "1": {"current": 1, "target": 1, "completed": True},
+    }
+    index = ObjectiveIndex([keyed_quest("q1", objectives)])
+    assert index.apply([(objective_action("0"), 1, {})]) == []  # never moves backwards
+    [change] = index.apply([(objective_action("0"), 9, {})])
+    assert change.progress == [5, 1] and change.completed
+
+    raise_stage, _ = keyed_progress_update(change, list(objectives), "now")
+    assert set(raise_stage["$set"]) == {"objectives_progress.0.current", "objectives_progress.0.completed"}
+
+
+def test_peak_objectives_keep_the_best_event():
+    index = ObjectiveIndex([
+        quest("size", [{"type": "catch_size", "target": 80}]),
+        quest("combo", [{"type": "combo", "target": 10}]),
+    ])
+    changes = index.apply([("catch_size", 30, {}), ("catch_size", 45, {}), ("combo", 4, {}), ("combo", 3, {})])
+    assert [(c.quest_id, c.progress, c.completed) for c in changes] == [
+        ("size", [45], False), ("combo", [4], False),
+    ]
+    # Smaller events never add up to the target
+    assert index.apply([("catch_size", 40, {}), ("combo", 4, {})]) == []
+    [change] = index.apply([("catch_size", 92.5, {})])
+    assert change.progress == [80] and change.completed
@@ -0,0 +1,68 @@
+import asyncio
+
+from pymongo.errors import BulkWriteError
+
+import write_behind
+from write_behind import WriteBehindAggregator
+
+
+class FakeCollection:
+    def __init__(self, fail_indexes=()):
+        self.fail_indexes = set(fail_indexes)
+        self.written = []
+
+    async def bulk_write(self, requests, ordered):
+        self.written.extend(r for i, r in enumerate(requests) if i not in self.fail_indexes)
+        if self.fail_indexes:
+            raise BulkWriteError({"writeErrors": [
+                {"index": i, "code": 2, "errmsg": "conflict"} for i in sorted(self.fail_indexes)
+            ]})
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_overlay_merges_pending_deltas():
+    writer = WriteBehindAggregator()
+    writer.inc("stats", "u1", {"fish": 2, "nested.count": 1})
+    writer.inc("stats", "u1", {"fish": 3})
+    writer.max("stats", "u1", {"best": 7})
+    writer.inc("stats", "u2", {"fish": 100})
+    doc = writer.overlay("stats", "u1", {"fish": 10, "best": 9})
+    assert doc == {"fish": 15, "best": 9, "nested": {"count": 1}}
+
+
+def test_written_ops_leave_the_overlay(monkeypatch):
+    collections = {"a": FakeCollection(), "b": FakeCollection()}
+    seen = {}
+
+    class SlowCollection(FakeCollection):
+        async def bulk_write(self, requests, ordered):
+            # "a" is already written while "b" is still in flight
+            seen["a"] = writer.overlay("a", "u1", {"n": 1})
+            await super().bulk_write(requests, ordered)
+
+    collections["b"] = SlowCollection()
+    monkeypatch.setattr(write_behind, "db", collections)
+    writer = WriteBehindAggregator()
+    writer.inc("a", "u1", {"n": 1})
+    writer.inc("b", "u1", {"n": 1})
+    run(writer.flush())
+    assert seen["a"] == {"n": 1}
+    assert writer.overlay("b", "u1", {"n": 1}) == {"n": 1}
+
+
+def test_rejected_ops_are_requeued_once_then_dead_lettered(monkeypatch):
+    collection = FakeCollection(fail_indexes=[0])
+    monkeypatch.setattr(write_behind, "db", {"stats": collection})
+    monkeypatch.setattr(write_behind, "MAX_WRITE_ATTEMPTS", 2)
+    writer = WriteBehindAggregator()
+    writer.inc("stats", "u1", {"n": 1})
+
+    run(writer.flush())
+    # Re-queued, but counted only once by the overlay
+    assert writer.overlay("stats", "u1", {}) == {"n": 1}
+    run(writer.flush())
+    assert writer.overlay("stats", "u1", {}) == {}
+    assert [d["key"] for d in writer.dead_letters] == ["u1"]